@@ -1,13 +1,16 @@
 from django.contrib import admin
-from .models import ChartOfAccounts, JournalEntry, JournalLine, FinancialStatement
+from .models import (
+    ChartOfAccounts, JournalEntry, JournalLine, AccountBalance, ExchangeRate, FiscalPeriod, ArchivedJournalLine,
+    FinancialStatement, PostingSkip
+)
 
 
 @admin.register(ChartOfAccounts)
 class ChartOfAccountsAdmin(admin.ModelAdmin):
-    list_display = ['code', 'name', 'account_type', 'company', 'is_active', 'created_at']
+    list_display = ['code', 'name', 'account_type', 'company', 'depth', 'is_active', 'created_at']
     list_filter = ['account_type', 'is_active', 'company', 'created_at']
     search_fields = ['code', 'name', 'company__name']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'path', 'depth', 'created_at', 'updated_at']
     raw_id_fields = ['parent', 'company']
 
 
@@ -37,6 +40,45 @@ class JournalLineAdmin(admin.ModelAdmin):
     raw_id_fields = ['journal_entry', 'account']
 
 
+@admin.register(AccountBalance)
+class AccountBalanceAdmin(admin.ModelAdmin):
+    list_display = ['account', 'company', 'period_start', 'debit', 'credit', 'updated_at']
+    list_filter = ['company', 'period_start']
+    search_fields = ['account__code', 'account__name', 'company__name']
+    readonly_fields = ['id', 'company', 'account', 'period_start', 'debit', 'credit', 'updated_at']
+    list_select_related = ['account', 'company']
+    date_hierarchy = 'period_start'
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ['currency', 'date', 'rate', 'source', 'company', 'updated_at']
+    list_filter = ['currency', 'source', 'company']
+    search_fields = ['currency', 'company__name']
+    readonly_fields = ['id', 'created_at', 'updated_at']
+    raw_id_fields = ['company']
+    date_hierarchy = 'date'
+
+
+@admin.register(FiscalPeriod)
+class FiscalPeriodAdmin(admin.ModelAdmin):
+    list_display = ['name', 'company', 'start_date', 'end_date', 'status', 'closed_at']
+    list_filter = ['status', 'company']
+    search_fields = ['name', 'company__name']
+    readonly_fields = ['id', 'status', 'closed_at', 'closed_by', 'created_at', 'updated_at']
+    raw_id_fields = ['company']
+    date_hierarchy = 'start_date'
+
+
+@admin.register(ArchivedJournalLine)
+class ArchivedJournalLineAdmin(admin.ModelAdmin):
+    list_display = ['journal_entry', 'account', 'debit', 'credit', 'period']
+    list_filter = ['period']
+    search_fields = ['journal_entry__entry_number', 'account__code']
+    readonly_fields = ['id', 'journal_entry', 'account', 'debit', 'credit', 'amount_currency', 'description', 'period']
+    list_select_related = ['journal_entry', 'account', 'period']
+
+
 @admin.register(FinancialStatement)
 class FinancialStatementAdmin(admin.ModelAdmin):
     list_display = ['statement_type', 'company', 'period_start', 'period_end', 'generated_at', 'generated_by']
@@ -45,3 +87,11 @@ class FinancialStatementAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'generated_at']
     raw_id_fields = ['company', 'generated_by']
     date_hierarchy = 'period_end'
+
+
+@admin.register(PostingSkip)
+class PostingSkipAdmin(admin.ModelAdmin):
+    list_display = ['source_type', 'source_id', 'reason', 'company', 'created_at']
+    list_filter = ['source_type', 'company']
+    search_fields = ['source_id', 'reason']
+    readonly_fields = ['id', 'company', 'source_type', 'source_id', 'reason', 'created_at']
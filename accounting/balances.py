@@ -0,0 +1,275 @@
+"""
+Account balance snapshots
+Keeps AccountBalance rows (company, account, month) in step with posted journal entries
+so balance queries read the snapshot table instead of scanning every JournalLine.
+
+Only entries in 'posted' status count towards balances. Moving an entry into 'posted'
+adds its lines; moving it out (to 'reversed' or back to 'draft') subtracts them.
+Signal handlers in accounting.signals cover single-object saves; code that writes in
+bulk (bulk_create, queryset.update) must call apply_entries() itself.
+
+Every change sends balances_changed with the (company_id, entry date) pairs it touched,
+which is how cached financial statements covering those dates get invalidated.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import periods
+from .models import AccountBalance, ArchivedJournalLine, JournalEntry, JournalLine
+
+ZERO = Decimal('0.00')
+
+# Sent after snapshots change; kwargs: changes = set of (company_id, date)
+balances_changed = Signal()
+
+
+def period_start(value):
+    """First day of the month containing value"""
+    return value.replace(day=1)
+
+
+def next_period(value):
+    """First day of the month after value"""
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def posted_lines(company=None, archived=False):
+    """
+    Line queryset restricted to posted entries (optionally for one company);
+    archived=True reads the lines of closed fiscal periods instead
+    """
+    model = ArchivedJournalLine if archived else JournalLine
+    lines = model.objects.filter(journal_entry__status='posted')
+    if company is not None:
+        lines = lines.filter(journal_entry__company=company)
+    return lines
+
+
+def aggregate_all_lines(company=None):
+    """aggregate_lines() over live and archived posted lines"""
+    totals = aggregate_lines(posted_lines(company))
+    for key, (debit, credit) in aggregate_lines(posted_lines(company, archived=True)).items():
+        current = totals.setdefault(key, [ZERO, ZERO])
+        current[0] += debit
+        current[1] += credit
+    return totals
+
+
+def aggregate_lines(lines):
+    """
+    Aggregate a JournalLine queryset into {(company_id, account_id, period_start): [debit, credit]}
+    using a single grouped query
+    """
+    rows = (
+        lines.annotate(month=TruncMonth('journal_entry__date'))
+        .values('journal_entry__company_id', 'account_id', 'month')
+        .annotate(debit_total=Sum('debit'), credit_total=Sum('credit'))
+        .order_by()
+    )
+    totals = {}
+    for row in rows:
+        key = (row['journal_entry__company_id'], row['account_id'], row['month'])
+        totals[key] = [row['debit_total'] or ZERO, row['credit_total'] or ZERO]
+    return totals
+
+
+def apply_deltas(deltas, sign=1, changes=None):
+    """
+    Add {(company_id, account_id, period_start): (debit, credit)} to the snapshot table.
+    Existing rows are incremented with F() expressions so concurrent postings don't
+    overwrite each other; missing rows are created.
+    changes is the set of (company_id, date) pairs announced through balances_changed.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for (company_id, account_id, period), (debit, credit) in deltas.items():
+            debit, credit = debit * sign, credit * sign
+            if not debit and not credit:
+                continue
+            lookup = {'company_id': company_id, 'account_id': account_id, 'period_start': period}
+            updated = AccountBalance.objects.filter(**lookup).update(
+                debit=F('debit') + debit,
+                credit=F('credit') + credit,
+                updated_at=now,
+            )
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    AccountBalance.objects.create(debit=debit, credit=credit, **lookup)
+            except IntegrityError:
+                # Another transaction created the row first
+                AccountBalance.objects.filter(**lookup).update(
+                    debit=F('debit') + debit,
+                    credit=F('credit') + credit,
+                    updated_at=now,
+                )
+        if changes:
+            balances_changed.send(sender=AccountBalance, changes=set(changes))
+
+
+def apply_entries(entry_ids, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) the lines of the given journal entries,
+    bucketed by each entry's own date. Used by batch posting code.
+    """
+    entry_ids = list(entry_ids)
+    if not entry_ids:
+        return
+    changes = set(
+        JournalEntry.objects.filter(pk__in=entry_ids)
+        .values_list('company_id', 'date')
+        .distinct()
+        .order_by()
+    )
+    apply_deltas(aggregate_lines(JournalLine.objects.filter(journal_entry_id__in=entry_ids)), sign, changes)
+
+
+def apply_entry(entry_id, company_id, date, sign=1):
+    """
+    Add or remove one entry's lines in the period of the given date.
+    The date/company are passed explicitly so a previous state can be released
+    after the entry itself has already been changed.
+    """
+    rows = (
+        JournalLine.objects.filter(journal_entry_id=entry_id)
+        .values('account_id')
+        .annotate(debit_total=Sum('debit'), credit_total=Sum('credit'))
+        .order_by()
+    )
+    period = period_start(date)
+    deltas = {
+        (company_id, row['account_id'], period): (row['debit_total'] or ZERO, row['credit_total'] or ZERO)
+        for row in rows
+    }
+    apply_deltas(deltas, sign, {(company_id, date)})
+
+
+def get_account_balances(company, date_from=None, date_to=None, account_ids=None):
+    """
+    Debit/credit totals per account for posted entries between date_from and date_to (inclusive).
+
+    Whole months come from AccountBalance; partial months at either end of the range are
+    topped up from journal lines (and archived lines of closed periods), which only touches
+    the lines of those edge months.
+    Returns {account_id: {'debit': Decimal, 'credit': Decimal, 'balance': Decimal}}.
+    """
+    # Months fully covered by the range: [snap_start, snap_end)
+    snap_start = None
+    if date_from is not None:
+        snap_start = date_from if date_from.day == 1 else next_period(date_from)
+    snap_end = None
+    if date_to is not None:
+        snap_end = period_start(date_to + timedelta(days=1))
+
+    line_ranges = []
+    if snap_start is not None and snap_end is not None and snap_start >= snap_end:
+        # Range sits inside a single month
+        snapshots = AccountBalance.objects.none()
+        line_ranges.append(Q(journal_entry__date__gte=date_from, journal_entry__date__lte=date_to))
+    else:
+        snapshots = AccountBalance.objects.filter(company=company)
+        if snap_start is not None:
+            snapshots = snapshots.filter(period_start__gte=snap_start)
+            if date_from < snap_start:
+                line_ranges.append(Q(journal_entry__date__gte=date_from, journal_entry__date__lt=snap_start))
+        if snap_end is not None:
+            snapshots = snapshots.filter(period_start__lt=snap_end)
+            if date_to >= snap_end:
+                line_ranges.append(Q(journal_entry__date__gte=snap_end, journal_entry__date__lte=date_to))
+
+    if account_ids is not None:
+        snapshots = snapshots.filter(account_id__in=account_ids)
+
+    totals = defaultdict(lambda: [ZERO, ZERO])
+    rows = snapshots.values('account_id').annotate(debit_total=Sum('debit'), credit_total=Sum('credit')).order_by()
+    for row in rows:
+        totals[row['account_id']][0] += row['debit_total'] or ZERO
+        totals[row['account_id']][1] += row['credit_total'] or ZERO
+
+    if line_ranges:
+        condition = line_ranges[0]
+        for extra in line_ranges[1:]:
+            condition |= extra
+        sources = [posted_lines(company)]
+        if periods.has_archive(company.pk, date_from, date_to):
+            sources.append(posted_lines(company, archived=True))
+        for lines in sources:
+            lines = lines.filter(condition)
+            if account_ids is not None:
+                lines = lines.filter(account_id__in=account_ids)
+            rows = lines.values('account_id').annotate(debit_total=Sum('debit'), credit_total=Sum('credit')).order_by()
+            for row in rows:
+                totals[row['account_id']][0] += row['debit_total'] or ZERO
+                totals[row['account_id']][1] += row['credit_total'] or ZERO
+
+    return {
+        account_id: {'debit': debit, 'credit': credit, 'balance': debit - credit}
+        for account_id, (debit, credit) in totals.items()
+    }
+
+
+def rebuild_balances(company=None):
+    """
+    Recompute the snapshot table from raw journal lines (live and archived).
+    Returns the number of snapshot rows written.
+    """
+    totals = aggregate_all_lines(company)
+    with transaction.atomic():
+        existing = AccountBalance.objects.all()
+        if company is not None:
+            existing = existing.filter(company=company)
+        existing.delete()
+        AccountBalance.objects.bulk_create(
+            [
+                AccountBalance(
+                    company_id=company_id,
+                    account_id=account_id,
+                    period_start=period,
+                    debit=debit,
+                    credit=credit,
+                )
+                for (company_id, account_id, period), (debit, credit) in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def check_balances(company=None):
+    """
+    Compare the snapshot table with raw journal lines without writing anything.
+    Returns a list of mismatches as dicts with the expected and stored totals.
+    """
+    expected = aggregate_all_lines(company)
+    stored_rows = AccountBalance.objects.all()
+    if company is not None:
+        stored_rows = stored_rows.filter(company=company)
+    stored = {
+        (row['company_id'], row['account_id'], row['period_start']): [row['debit'], row['credit']]
+        for row in stored_rows.values('company_id', 'account_id', 'period_start', 'debit', 'credit')
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=lambda k: (str(k[0]), str(k[1]), k[2])):
+        want = expected.get(key, [ZERO, ZERO])
+        have = stored.get(key, [ZERO, ZERO])
+        if want[0] != have[0] or want[1] != have[1]:
+            company_id, account_id, period = key
+            mismatches.append({
+                'company_id': company_id,
+                'account_id': account_id,
+                'period_start': period,
+                'expected_debit': want[0],
+                'expected_credit': want[1],
+                'stored_debit': have[0],
+                'stored_credit': have[1],
+            })
+    return mismatches
@@ -0,0 +1,294 @@
+"""
+Multi-currency support
+Exchange rate lookup, on-the-fly conversion and period-end revaluation.
+
+Rates are stored per company as units of the company currency per one unit of the
+foreign currency; a rate applies from its date until the next rate of that currency.
+
+- rates_on(company, date): {currency: rate} for one date, cached per company under a
+  version token that changes whenever an ExchangeRate is saved or deleted.
+- RateTable: every rate a report needs loaded with one query; conversions are
+  in-memory lookups, so converting many rows never queries per row.
+- revalue(companies, as_of): unrealized FX gain/loss on the receivable, payable and
+  cash accounts. Posting books foreign documents at the rate of their date and keeps
+  each line's foreign amount (JournalLine.amount_currency), so the open foreign balance
+  and its booked company-currency value are one grouped query per account and currency;
+  the difference to the foreign balance at the closing rate is the adjustment. The
+  adjusting entry and its reversal on the next day are written in bulk for all
+  companies at once.
+
+Revaluation accounts come from Company.settings['posting_accounts'] (see
+accounting.posting): receivable, payable, cash, fx_gain and fx_loss.
+"""
+import bisect
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+
+from core import sequences
+
+from . import balances, periods, posting
+from .models import ArchivedJournalLine, ExchangeRate, JournalEntry, JournalLine
+
+ZERO = balances.ZERO
+ONE = Decimal('1')
+
+RATE_CACHE_TIMEOUT = 86400
+REVALUED_ROLES = ('receivable', 'payable', 'cash')
+# Namespace for the deterministic source ids that make one revaluation per company and date
+REVALUATION_NAMESPACE = uuid.UUID('6f1f4f8e-3c1b-4b7e-9a51-2f7c0c1d8e42')
+
+
+class MissingRateError(Exception):
+    pass
+
+
+def _version_key(company_id):
+    return f"fx_rates_version_{company_id}"
+
+
+def rates_version(company_id):
+    try:
+        version = cache.get(_version_key(company_id))
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(_version_key(company_id), version, None)
+    except Exception:
+        version = None
+    return version
+
+
+def bump_rates_version(company_id):
+    try:
+        cache.set(_version_key(company_id), uuid.uuid4().hex, None)
+    except Exception:
+        pass
+
+
+def _load_rates_on(company, date):
+    """Latest rate on or before date for every currency of the company (one query)"""
+    rates = {}
+    rows = (
+        ExchangeRate.objects.filter(company=company, date__lte=date)
+        .order_by('currency', '-date')
+        .values_list('currency', 'rate')
+    )
+    for currency, rate in rows:
+        rates.setdefault(currency, rate)
+    return rates
+
+
+def rates_on(company, date):
+    """{currency: rate} effective on date, behind the per-company versioned cache"""
+    version = rates_version(company.pk)
+    if version is None:
+        return _load_rates_on(company, date)
+    cache_key = f"fx_rates_{company.pk}_{version}_{date.isoformat()}"
+    try:
+        rates = cache.get(cache_key)
+    except Exception:
+        rates = None
+    if rates is None:
+        rates = _load_rates_on(company, date)
+        try:
+            cache.set(cache_key, rates, RATE_CACHE_TIMEOUT)
+        except Exception:
+            pass
+    return rates
+
+
+def rate_on(company, currency, date):
+    """Rate of one currency on date; raises MissingRateError when there is none"""
+    currency = currency.upper()
+    if currency == company.currency:
+        return ONE
+    rate = rates_on(company, date).get(currency)
+    if rate is None:
+        raise MissingRateError(f'No {currency} rate on or before {date}')
+    return rate
+
+
+class RateTable:
+    """
+    In-memory rate history for a set of currencies up to date_to.
+    rate(), to_base() and from_base() are bisect lookups, no queries.
+    """
+
+    def __init__(self, company, currencies=None, date_to=None):
+        self.base_currency = company.currency
+        rates = ExchangeRate.objects.filter(company=company)
+        if currencies is not None:
+            rates = rates.filter(currency__in=[currency.upper() for currency in currencies])
+        if date_to is not None:
+            rates = rates.filter(date__lte=date_to)
+        self._dates = defaultdict(list)
+        self._rates = defaultdict(list)
+        for currency, date, rate in rates.order_by('currency', 'date').values_list('currency', 'date', 'rate'):
+            self._dates[currency].append(date)
+            self._rates[currency].append(rate)
+
+    def rate(self, currency, date):
+        currency = currency.upper()
+        if currency == self.base_currency:
+            return ONE
+        index = bisect.bisect_right(self._dates.get(currency, []), date) - 1
+        if index < 0:
+            raise MissingRateError(f'No {currency} rate on or before {date}')
+        return self._rates[currency][index]
+
+    def to_base(self, amount, currency, date):
+        """Foreign amount -> company currency"""
+        return (amount * self.rate(currency, date)).quantize(ZERO)
+
+    def from_base(self, amount, currency, date):
+        """Company currency amount -> foreign currency"""
+        return (amount / self.rate(currency, date)).quantize(ZERO)
+
+
+def _foreign_balances(company, account_ids, as_of):
+    """
+    Posted foreign-currency balances of the accounts at as_of (live and archived lines):
+    {(account_id, currency): [foreign amount, booked company-currency amount]}, debit positive
+    """
+    models = [JournalLine]
+    if periods.has_archive(company.pk, date_to=as_of):
+        models.append(ArchivedJournalLine)
+    totals = defaultdict(lambda: [ZERO, ZERO])
+    for model in models:
+        rows = (
+            model.objects.filter(
+                journal_entry__company=company,
+                journal_entry__status='posted',
+                journal_entry__date__lte=as_of,
+                journal_entry__currency__isnull=False,
+                account_id__in=account_ids,
+                amount_currency__isnull=False,
+            )
+            .exclude(journal_entry__currency=company.currency)
+            .values('account_id', 'journal_entry__currency')
+            .annotate(foreign=Sum('amount_currency'), booked=Sum(F('debit') - F('credit')))
+            .order_by()
+        )
+        for row in rows:
+            total = totals[(row['account_id'], row['journal_entry__currency'])]
+            total[0] += row['foreign'] or ZERO
+            total[1] += row['booked'] or ZERO
+    return totals
+
+
+def compute_revaluation(company, as_of, accounts=None):
+    """
+    Unrealized gain (+) / loss (-) per category at as_of:
+    {'receivable': ..., 'payable': ..., 'cash': ...}. Each is the foreign balance of the
+    mapped account at the closing rate less its booked value, so a gain debits the account.
+    """
+    accounts = posting.resolve_accounts(company) if accounts is None else accounts
+    roles = {accounts[role]: role for role in REVALUED_ROLES if role in accounts}
+    totals = _foreign_balances(company, list(roles), as_of)
+    table = RateTable(company, currencies={currency for _, currency in totals}, date_to=as_of)
+    adjustments = {role: ZERO for role in REVALUED_ROLES}
+    for (account_id, currency), (foreign, booked) in totals.items():
+        adjustments[roles[account_id]] += table.to_base(foreign, currency, as_of) - booked
+    return adjustments
+
+
+def _revaluation_lines(adjustments, accounts):
+    """(account_id, debit, credit) lines for the adjusting entry"""
+    lines = []
+    for role in REVALUED_ROLES:
+        amount = adjustments[role]
+        if amount:
+            lines.append((accounts[role], max(amount, ZERO), max(-amount, ZERO)))
+    net = sum(adjustments.values(), ZERO)
+    if net > 0:
+        lines.append((accounts['fx_gain'], ZERO, net))
+    elif net < 0:
+        lines.append((accounts['fx_loss'], -net, ZERO))
+    return lines
+
+
+def revaluation_source_ids(company, as_of):
+    """Deterministic source ids of the adjusting entry and its reversal"""
+    return (
+        uuid.uuid5(REVALUATION_NAMESPACE, f'{company.pk}:{as_of.isoformat()}'),
+        uuid.uuid5(REVALUATION_NAMESPACE, f'{company.pk}:{as_of.isoformat()}:reversal'),
+    )
+
+
+def revalue(companies, as_of, user=None):
+    """
+    Post FX revaluation entries at as_of (reversed on the next day) for each company.
+    Companies already revalued for as_of, with as_of in a closed period, without foreign
+    balances or without FX gain/loss accounts are reported and skipped. Returns {company_id: result}.
+    """
+    results = {}
+    entries, lines = [], []
+    for company in companies:
+        adjusting_id, reversal_id = revaluation_source_ids(company, as_of)
+        if JournalEntry.objects.filter(source_type='fx_revaluation', source_id=adjusting_id).exists():
+            results[str(company.pk)] = {
+                'status': 'already_revalued',
+                'message': f'Already revalued as of {as_of.isoformat()}',
+            }
+            continue
+        try:
+            periods.check_writable(company.pk, [as_of, as_of + timedelta(days=1)])
+        except periods.PeriodClosedError as exc:
+            results[str(company.pk)] = {'status': 'period_closed', 'message': exc.messages[0]}
+            continue
+        accounts = posting.resolve_accounts(company)
+        try:
+            adjustments = compute_revaluation(company, as_of, accounts)
+        except MissingRateError as exc:
+            results[str(company.pk)] = {'status': 'missing_rate', 'message': str(exc)}
+            continue
+        result = {key: str(value) for key, value in adjustments.items()}
+        if not any(adjustments.values()):
+            results[str(company.pk)] = dict(result, status='nothing_to_post')
+            continue
+        missing = [role for role in ('fx_gain', 'fx_loss') if role not in accounts]
+        if missing:
+            results[str(company.pk)] = dict(
+                result, status='missing_accounts', message=f"No posting account mapped for {', '.join(missing)}"
+            )
+            continue
+
+        entry_lines = _revaluation_lines(adjustments, accounts)
+        numbers = sequences.next_numbers(company, 'journal_entry', 2)
+        adjusting = JournalEntry(
+            company=company,
+            entry_number=numbers[0],
+            date=as_of,
+            description=f'FX revaluation {as_of.isoformat()}',
+            source_type='fx_revaluation',
+            source_id=adjusting_id,
+            status='posted',
+            created_by=user,
+        )
+        reversal = JournalEntry(
+            company=company,
+            entry_number=numbers[1],
+            date=as_of + timedelta(days=1),
+            description=f'Reversal of FX revaluation {as_of.isoformat()}',
+            source_type='fx_revaluation',
+            source_id=reversal_id,
+            status='posted',
+            created_by=user,
+        )
+        entries.extend([adjusting, reversal])
+        for account_id, debit, credit in entry_lines:
+            lines.append(JournalLine(journal_entry=adjusting, account_id=account_id, debit=debit, credit=credit))
+            lines.append(JournalLine(journal_entry=reversal, account_id=account_id, debit=credit, credit=debit))
+        results[str(company.pk)] = dict(result, status='posted', entry=str(adjusting.pk), reversal=str(reversal.pk))
+
+    if entries:
+        with transaction.atomic():
+            JournalEntry.objects.bulk_create(entries)
+            JournalLine.objects.bulk_create(lines)
+            balances.apply_entries([entry.pk for entry in entries])
+    return results
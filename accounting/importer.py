@@ -0,0 +1,421 @@
+"""
+Bulk journal entry import
+Streams journal lines from CSV, NDJSON or JSON, validates them a batch at a time and
+writes entries and lines with bulk_create. Invalid entries are skipped and reported
+per row; the rest of the file still imports.
+
+Row format (CSV header / flat JSON object keys):
+    entry_number, date, description, status, account_code, debit, credit, line_description
+Nested JSON entries ({"entry_number": ..., "lines": [{...}]}) are flattened to the same rows.
+A JSON file (an array of entries, or an object with an "entries" array) is decoded one
+entry at a time, so memory holds one entry, not the document.
+Lines of one entry must be contiguous in the input. Row numbers in the error report
+count data rows from 1 (the CSV header is not counted). JSON items that are not objects
+are reported as invalid rows. Input that stops parsing part-way (malformed JSON, bad
+encoding) ends the import: batches already written stay, and the report gives the
+row where reading failed in read_error.
+"""
+import csv
+import io
+import json
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_date
+
+from . import balances, periods
+from .models import ChartOfAccounts, JournalEntry, JournalLine
+
+ZERO = Decimal('0.00')
+
+DEFAULT_BATCH_SIZE = 500
+JSON_CHUNK_SIZE = 64 * 1024
+ALLOWED_STATUSES = ('draft', 'posted')
+# Key of the rows _flatten() yields for JSON items it cannot read
+ROW_ERROR = '_error'
+
+
+class ImportResult:
+    """Counters plus the per-row error report of one import run"""
+
+    def __init__(self, max_errors=None):
+        self.entries_created = 0
+        self.lines_created = 0
+        self.entries_failed = 0
+        self.errors = []
+        self.error_count = 0
+        self.max_errors = max_errors
+        self.read_error = None
+
+    def add_error(self, row, entry_number, message):
+        self.error_count += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'entry_number': entry_number, 'error': message})
+
+    def as_dict(self):
+        return {
+            'entries_created': self.entries_created,
+            'lines_created': self.lines_created,
+            'entries_failed': self.entries_failed,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+            'read_error': self.read_error,
+        }
+
+
+def _text_stream(stream, encoding='utf-8'):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, newline='')
+
+
+def _flatten(item):
+    if not isinstance(item, dict):
+        yield {ROW_ERROR: f'Expected a JSON object, got {type(item).__name__}'}
+        return
+    lines = item.get('lines')
+    if lines is None:
+        yield item
+        return
+    header = {key: value for key, value in item.items() if key != 'lines'}
+    if not isinstance(lines, list):
+        yield dict(header, **{ROW_ERROR: 'lines must be a list'})
+        return
+    for line in lines:
+        row = dict(header)
+        if not isinstance(line, dict):
+            row[ROW_ERROR] = f'Expected a JSON object for the line, got {type(line).__name__}'
+            yield row
+            continue
+        row['line_description'] = line.get('description', line.get('line_description'))
+        for key in ('account_code', 'debit', 'credit'):
+            row[key] = line.get(key)
+        yield row
+
+
+def read_csv(stream):
+    for row in csv.DictReader(_text_stream(stream)):
+        yield row
+
+
+def read_ndjson(stream):
+    for line in _text_stream(stream):
+        line = line.strip()
+        if line:
+            yield from _flatten(json.loads(line))
+
+
+class _JSONScanner:
+    """Decodes the values of one JSON text one at a time from a buffer refilled in chunks"""
+
+    def __init__(self, stream):
+        self.stream = _text_stream(stream)
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+
+    def _fill(self):
+        chunk = self.stream.read(JSON_CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, '' at the end of the input"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected '{char}', found '{found or 'end of input'}'")
+        self.position += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A value that ends the buffer (a number, say) may go on in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.position = end
+            return value
+
+    def array(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() != ',':
+                self.expect(']')
+                return
+            self.position += 1
+
+    def seek_key(self, name):
+        """Move to the value of the top-level object's key name; False when it is missing"""
+        self.expect('{')
+        while self.peek() != '}':
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError('Invalid JSON: object keys must be strings')
+            self.expect(':')
+            if key == name:
+                return True
+            self.value()
+            if self.peek() == ',':
+                self.position += 1
+        return False
+
+
+def read_json(stream):
+    scanner = _JSONScanner(stream)
+    if scanner.peek() == '{' and not scanner.seek_key('entries'):
+        return
+    for item in scanner.array():
+        yield from _flatten(item)
+
+
+def read_entries(items):
+    """Rows from already-parsed JSON entries (API request bodies)"""
+    for item in items:
+        yield from _flatten(item)
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+    'jsonl': read_ndjson,
+    'json': read_json,
+}
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in READERS:
+        raise ValueError(f"Unsupported import format '{extension}'; use csv, ndjson or json")
+    return extension
+
+
+def _text(row, key):
+    value = row.get(key)
+    return str(value).strip() if value is not None else ''
+
+
+def _amount(value):
+    if value in (None, ''):
+        return ZERO
+    amount = Decimal(str(value).strip())
+    if not amount.is_finite() or amount < 0 or amount.as_tuple().exponent < -2:
+        raise InvalidOperation
+    return amount.quantize(ZERO)
+
+
+def _group_entries(rows):
+    """Yield (entry_number, [(row_number, row), ...]) for contiguous rows of each entry"""
+    current, group = None, []
+    for row_number, row in enumerate(rows, start=1):
+        entry_number = _text(row, 'entry_number')
+        if group and entry_number != current:
+            yield current, group
+            group = []
+        current = entry_number
+        group.append((row_number, row))
+    if group:
+        yield current, group
+
+
+class JournalImporter:
+    """
+    Imports journal entries for one company.
+    Account codes are resolved through a single code -> (id, is_active) map.
+    """
+
+    def __init__(self, company, user=None, batch_size=DEFAULT_BATCH_SIZE, max_errors=None):
+        self.company = company
+        self.user = user
+        self.batch_size = batch_size
+        self.result = ImportResult(max_errors=max_errors)
+        self.accounts = {
+            code: (account_id, is_active)
+            for code, account_id, is_active in ChartOfAccounts.objects.filter(company=company).values_list(
+                'code', 'id', 'is_active'
+            )
+        }
+        self.seen_numbers = set()
+        self.rows_read = 0
+
+    def _counted(self, rows):
+        for row in rows:
+            self.rows_read += 1
+            yield row
+
+    def run(self, rows):
+        batch = []
+        groups = _group_entries(self._counted(rows))
+        while True:
+            try:
+                entry_number, group = next(groups)
+            except StopIteration:
+                break
+            except (ValueError, csv.Error) as exc:
+                # Entries read before the failure are complete; the one being read is not imported
+                self.result.read_error = {
+                    'row': self.rows_read + 1,
+                    'error': f'Could not read the input: {exc}; the rest was not imported',
+                }
+                break
+            batch.append((entry_number, group))
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch)
+                batch = []
+        if batch:
+            self._process_batch(batch)
+        return self.result
+
+    def _parse_entry(self, entry_number, group):
+        """Validate one entry's rows; returns (entry_fields, lines) or None after reporting errors"""
+        first_row_number, first = group[0]
+        unreadable = [(row_number, row) for row_number, row in group if row.get(ROW_ERROR)]
+        if unreadable:
+            for row_number, row in unreadable:
+                self.result.add_error(row_number, entry_number or None, row[ROW_ERROR])
+            self.result.entries_failed += 1
+            return None
+        errors = []
+        if not entry_number:
+            errors.append((first_row_number, 'entry_number is required'))
+        elif entry_number in self.seen_numbers:
+            errors.append((first_row_number, 'Duplicate entry_number in file (lines must be contiguous)'))
+        try:
+            entry_date = parse_date(_text(first, 'date'))
+        except ValueError:
+            entry_date = None
+        if entry_date is None:
+            errors.append((first_row_number, 'date is required in YYYY-MM-DD format'))
+        elif periods.closed_period_for(self.company.pk, entry_date) is not None:
+            errors.append((first_row_number, f'{entry_date} falls in a closed fiscal period'))
+        status = (_text(first, 'status') or 'draft').lower()
+        if status not in ALLOWED_STATUSES:
+            errors.append((first_row_number, f"status must be one of {', '.join(ALLOWED_STATUSES)}"))
+
+        lines = []
+        total_debit = total_credit = ZERO
+        for row_number, row in group:
+            code = _text(row, 'account_code')
+            account = self.accounts.get(code)
+            if account is None:
+                errors.append((row_number, f"Unknown account code '{code}'"))
+            elif not account[1]:
+                errors.append((row_number, f"Account '{code}' is inactive"))
+            try:
+                debit, credit = _amount(row.get('debit')), _amount(row.get('credit'))
+            except (InvalidOperation, ValueError):
+                errors.append((row_number, 'debit/credit must be non-negative amounts with at most 2 decimals'))
+                continue
+            if bool(debit) == bool(credit):
+                errors.append((row_number, 'Each line needs either a debit or a credit amount'))
+                continue
+            total_debit += debit
+            total_credit += credit
+            if account is not None:
+                lines.append((account[0], debit, credit, _text(row, 'line_description') or None))
+
+        if not errors:
+            if len(group) < 2:
+                errors.append((first_row_number, 'An entry needs at least two lines'))
+            elif total_debit != total_credit:
+                errors.append((
+                    first_row_number,
+                    f'Entry is unbalanced: debits {total_debit} != credits {total_credit}',
+                ))
+
+        if entry_number:
+            self.seen_numbers.add(entry_number)
+        if errors:
+            for row_number, message in errors:
+                self.result.add_error(row_number, entry_number, message)
+            self.result.entries_failed += 1
+            return None
+        return {
+            'entry_number': entry_number,
+            'date': entry_date,
+            'description': _text(first, 'description'),
+            'status': status,
+            'row': first_row_number,
+        }, lines
+
+    def _process_batch(self, batch):
+        parsed = OrderedDict()
+        for entry_number, group in batch:
+            entry = self._parse_entry(entry_number, group)
+            if entry is not None:
+                parsed[entry_number] = entry
+
+        # entry_number is globally unique: one query for the whole batch
+        existing = set(
+            JournalEntry.objects.filter(entry_number__in=list(parsed)).values_list('entry_number', flat=True)
+        )
+        for entry_number in existing:
+            fields, _ = parsed.pop(entry_number)
+            self.result.add_error(fields['row'], entry_number, 'entry_number already exists')
+            self.result.entries_failed += 1
+        if not parsed:
+            return
+
+        entries, lines = [], []
+        for fields, entry_lines in parsed.values():
+            entry = JournalEntry(
+                company=self.company,
+                entry_number=fields['entry_number'],
+                date=fields['date'],
+                description=fields['description'],
+                status=fields['status'],
+                created_by=self.user,
+            )
+            entries.append(entry)
+            for account_id, debit, credit, description in entry_lines:
+                lines.append(JournalLine(
+                    journal_entry=entry,
+                    account_id=account_id,
+                    debit=debit,
+                    credit=credit,
+                    description=description,
+                ))
+
+        try:
+            with transaction.atomic():
+                JournalEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+                JournalLine.objects.bulk_create(lines, batch_size=self.batch_size * 4)
+                # bulk_create skips signals, so posted entries update the snapshots here
+                balances.apply_entries([entry.pk for entry in entries if entry.status == 'posted'])
+        except DatabaseError as exc:
+            for fields, _ in parsed.values():
+                self.result.add_error(fields['row'], fields['entry_number'], f'Batch failed: {exc}')
+            self.result.entries_failed += len(parsed)
+            return
+
+        self.result.entries_created += len(entries)
+        self.result.lines_created += len(lines)
+
+
+def import_stream(company, stream, file_format, user=None, batch_size=DEFAULT_BATCH_SIZE, max_errors=None):
+    """Import from a file-like object in csv, ndjson or json format"""
+    return JournalImporter(company, user=user, batch_size=batch_size, max_errors=max_errors).run(
+        READERS[file_format](stream)
+    )
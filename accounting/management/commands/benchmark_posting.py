@@ -0,0 +1,86 @@
+"""
+Measure batch posting throughput (entries/second) on generated data
+Everything is created inside a transaction that is rolled back at the end.
+"""
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounting import posting
+from accounting.models import ChartOfAccounts, JournalEntry, JournalLine
+from core.models import Company
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark accounting.posting.post_entries on generated draft entries (nothing is kept)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=5000)
+        parser.add_argument('--lines', type=int, default=4, help='Lines per entry (even number)')
+        parser.add_argument('--batch-size', type=int, default=posting.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--accounts', type=int, default=20)
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also time per-entry validation that iterates entry.lines.all()',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        count, per_entry, batch_size = options['entries'], max(2, options['lines'] // 2 * 2), options['batch_size']
+        company = Company.objects.create(name=f'Posting benchmark {uuid.uuid4().hex[:8]}')
+        accounts = ChartOfAccounts.objects.bulk_create([
+            ChartOfAccounts(company=company, code=f'B{index:04d}', name=f'Account {index}', account_type='asset')
+            for index in range(options['accounts'])
+        ])
+        entries, lines = [], []
+        for index in range(count):
+            entry = JournalEntry(
+                company=company,
+                entry_number=f'BENCH-{company.pk.hex[:8]}-{index}',
+                date=timezone.localdate(),
+                description='benchmark',
+            )
+            entries.append(entry)
+            for line in range(per_entry // 2):
+                amount = Decimal(index % 97 + line + 1)
+                debit_account = accounts[(index + line) % len(accounts)]
+                credit_account = accounts[(index + line + 1) % len(accounts)]
+                lines.append(JournalLine(journal_entry=entry, account=debit_account, debit=amount))
+                lines.append(JournalLine(journal_entry=entry, account=credit_account, credit=amount))
+        JournalEntry.objects.bulk_create(entries, batch_size=1000)
+        JournalLine.objects.bulk_create(lines, batch_size=4000)
+        ids = [entry.pk for entry in entries]
+        self.stdout.write(f'Generated {count} entries with {per_entry} lines each')
+
+        if options['compare']:
+            started = time.perf_counter()
+            for entry in JournalEntry.objects.filter(pk__in=ids):
+                entry_lines = list(entry.lines.all())
+                sum(line.debit for line in entry_lines) == sum(line.credit for line in entry_lines)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'Per-entry validation only: {elapsed:.2f}s ({count / elapsed:,.0f} entries/s)')
+
+        started = time.perf_counter()
+        posted = 0
+        for start in range(0, count, batch_size):
+            posted += len(posting.post_entries(ids[start:start + batch_size])['posted'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Posted {posted} entries in {elapsed:.2f}s ({posted / elapsed:,.0f} entries/s, batch size {batch_size})'
+        ))
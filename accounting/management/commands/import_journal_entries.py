@@ -0,0 +1,66 @@
+"""
+Bulk import journal entries from a CSV, NDJSON or JSON file
+"""
+import csv
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting import importer
+from core.models import Company, User
+
+
+class Command(BaseCommand):
+    help = 'Import journal entries and lines in batches, reporting invalid rows instead of aborting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import (.csv, .ndjson/.jsonl or .json)')
+        parser.add_argument('--company', required=True, help='Company id')
+        parser.add_argument('--user', help='Email of the user recorded as creator')
+        parser.add_argument('--format', choices=sorted(importer.READERS), help='Override format detection')
+        parser.add_argument('--batch-size', type=int, default=importer.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--errors', help='Write the per-row error report to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+        except (Company.DoesNotExist, ValidationError):
+            raise CommandError(f"Company {options['company']} not found")
+
+        user = None
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']} not found")
+
+        try:
+            file_format = options['format'] or importer.detect_format(options['path'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = importer.import_stream(
+                    company, stream, file_format, user=user, batch_size=options['batch_size']
+                )
+        except (OSError, ValueError, UnicodeDecodeError) as exc:
+            raise CommandError(f'Could not read {options["path"]}: {exc}')
+
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as report:
+                writer = csv.DictWriter(report, fieldnames=['row', 'entry_number', 'error'])
+                writer.writeheader()
+                writer.writerows(result.errors)
+        else:
+            for error in result.errors:
+                self.stdout.write(f"row {error['row']} [{error['entry_number']}]: {error['error']}")
+
+        if result.read_error:
+            self.stdout.write(self.style.ERROR(f"row {result.read_error['row']}: {result.read_error['error']}"))
+
+        summary = (
+            f'Imported {result.entries_created} entries ({result.lines_created} lines); '
+            f'{result.entries_failed} entries failed'
+        )
+        failed = result.entries_failed or result.read_error
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
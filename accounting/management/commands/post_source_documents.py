@@ -0,0 +1,43 @@
+"""
+Generate journal entries for sales, purchases and payments without running a Celery worker
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting import posting
+from core.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Post pending sales invoices, received purchase orders and completed payments to the ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Limit to one company id')
+        parser.add_argument('--source', action='append', choices=list(posting.SOURCES), help='Source type (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=posting.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--draft', action='store_true', help='Create draft entries instead of posting them')
+        parser.add_argument(
+            '--retry-skipped', action='store_true', help='Try documents skipped by earlier runs again (e.g. after mapping accounts)'
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except (Company.DoesNotExist, ValidationError):
+                raise CommandError(f"Company {options['company']} not found")
+
+        summary = posting.post_pending(
+            company=company,
+            source_types=options['source'],
+            batch_size=options['batch_size'],
+            post=not options['draft'],
+            retry_skipped=options['retry_skipped'],
+        )
+        created = 0
+        for company_id, results in summary.items():
+            for source_type, result in results.items():
+                created += result['created']
+                self.stdout.write(f"{company_id} {source_type}: {result['created']} created, {result['skipped']} skipped")
+        self.stdout.write(self.style.SUCCESS(f'Created {created} journal entr{"y" if created == 1 else "ies"}'))
@@ -0,0 +1,44 @@
+"""
+Rebuild or verify AccountBalance snapshots from raw journal lines
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting import balances
+from core.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Rebuild account balance snapshots from journal lines, or check them with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Limit to one company id')
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Compare snapshots against journal lines without writing; exits non-zero on mismatch',
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except (Company.DoesNotExist, ValidationError):
+                raise CommandError(f"Company {options['company']} not found")
+
+        if options['check']:
+            mismatches = balances.check_balances(company)
+            for row in mismatches:
+                self.stdout.write(
+                    f"{row['company_id']} {row['account_id']} {row['period_start']:%Y-%m}: "
+                    f"expected {row['expected_debit']}/{row['expected_credit']}, "
+                    f"stored {row['stored_debit']}/{row['stored_credit']}"
+                )
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} account balance snapshot(s) out of sync')
+            self.stdout.write(self.style.SUCCESS('Account balance snapshots match journal lines'))
+            return
+
+        count = balances.rebuild_balances(company)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} account balance snapshot(s)'))
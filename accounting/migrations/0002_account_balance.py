@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:19
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_user_password_reset_otp_and_more'),
+        ('accounting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period_start', models.DateField(help_text='First day of the month')),
+                ('debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='accounting.chartofaccounts')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_balances', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Account Balance',
+                'verbose_name_plural': 'Account Balances',
+                'db_table': 'account_balances',
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['company', 'period_start'], name='account_bal_company_bf331f_idx')],
+                'unique_together': {('company', 'account', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_account_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialstatement',
+            name='is_stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:21
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    ChartOfAccounts = apps.get_model('accounting', 'ChartOfAccounts')
+    rows = list(ChartOfAccounts.objects.values_list('id', 'parent_id'))
+    parents = dict(rows)
+    paths = {}
+
+    def resolve(account_id):
+        if account_id not in paths:
+            parent_id = parents.get(account_id)
+            prefix = resolve(parent_id)[0] if parent_id else ''
+            paths[account_id] = (prefix + account_id.hex + '/', prefix.count('/'))
+        return paths[account_id]
+
+    updated = []
+    for account_id, _ in rows:
+        path, depth = resolve(account_id)
+        updated.append(ChartOfAccounts(id=account_id, path=path, depth=depth))
+    ChartOfAccounts.objects.bulk_update(updated, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_financial_statement_is_stale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chartofaccounts',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='chartofaccounts',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='chartofaccounts',
+            index=models.Index(fields=['path'], name='chart_of_accounts_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_chart_of_accounts_path'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_id__isnull', False), models.Q(('source_type__in', ['manual', 'ai_generated']), _negated=True)), fields=('source_type', 'source_id'), name='journal_entries_unique_source'),
+        ),
+    ]
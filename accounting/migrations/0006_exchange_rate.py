@@ -0,0 +1,44 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:30
+
+from decimal import Decimal
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_document_sequence'),
+        ('accounting', '0005_journal_entry_unique_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalentry',
+            name='source_type',
+            field=models.CharField(choices=[('manual', 'Manual'), ('sale', 'Sale'), ('purchase', 'Purchase'), ('payment', 'Payment'), ('fx_revaluation', 'FX Revaluation'), ('ai_generated', 'AI Generated')], default='manual', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('currency', models.CharField(max_length=3)),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18, validators=[django.core.validators.MinValueValidator(Decimal('1E-8'))])),
+                ('source', models.CharField(default='manual', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exchange_rates', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Exchange Rate',
+                'verbose_name_plural': 'Exchange Rates',
+                'db_table': 'exchange_rates',
+                'ordering': ['-date', 'currency'],
+                'indexes': [models.Index(fields=['company', 'date'], name='exchange_ra_company_f095ed_idx')],
+                'unique_together': {('company', 'currency', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:33
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_document_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounting', '0006_exchange_rate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedJournalLine',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('description', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Journal Line',
+                'verbose_name_plural': 'Archived Journal Lines',
+                'db_table': 'journal_lines_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='FiscalPeriod',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('closed', 'Closed'), ('locked', 'Locked')], default='open', max_length=20)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Fiscal Period',
+                'verbose_name_plural': 'Fiscal Periods',
+                'db_table': 'fiscal_periods',
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='is_archived',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['company', 'is_archived', 'date'], name='journal_ent_company_86b5e9_idx'),
+        ),
+        migrations.AddField(
+            model_name='fiscalperiod',
+            name='closed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fiscal_periods_closed', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='fiscalperiod',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fiscal_periods', to='core.company'),
+        ),
+        migrations.AddField(
+            model_name='archivedjournalline',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_journal_lines', to='accounting.chartofaccounts'),
+        ),
+        migrations.AddField(
+            model_name='archivedjournalline',
+            name='journal_entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_lines', to='accounting.journalentry'),
+        ),
+        migrations.AddField(
+            model_name='archivedjournalline',
+            name='period',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_lines', to='accounting.fiscalperiod'),
+        ),
+        migrations.AddIndex(
+            model_name='fiscalperiod',
+            index=models.Index(fields=['company', 'status'], name='fiscal_peri_company_1e1cf1_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='fiscalperiod',
+            unique_together={('company', 'start_date')},
+        ),
+        migrations.AddIndex(
+            model_name='archivedjournalline',
+            index=models.Index(fields=['journal_entry'], name='journal_lin_journal_704b88_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedjournalline',
+            index=models.Index(fields=['account'], name='journal_lin_account_5f4170_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedjournalline',
+            index=models.Index(fields=['period'], name='journal_lin_period__32cacf_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0007_fiscal_period_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='journalentry',
+            name='journal_ent_company_86b5e9_idx',
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['company', 'is_archived', 'date', 'created_at', 'id'], name='journal_ent_company_034cd9_idx'),
+        ),
+    ]
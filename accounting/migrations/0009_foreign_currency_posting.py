@@ -0,0 +1,55 @@
+# Generated by Django 4.2.27 on 2026-10-17 21:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_audit_log_keyset_indexes'),
+        ('accounting', '0008_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedjournalline',
+            name='amount_currency',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='currency',
+            field=models.CharField(blank=True, max_length=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='exchange_rate',
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalline',
+            name='amount_currency',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True),
+        ),
+        migrations.CreateModel(
+            name='PostingSkip',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('source_type', models.CharField(choices=[('manual', 'Manual'), ('sale', 'Sale'), ('purchase', 'Purchase'), ('payment', 'Payment'), ('fx_revaluation', 'FX Revaluation'), ('ai_generated', 'AI Generated')], max_length=20)),
+                ('source_id', models.UUIDField()),
+                ('reason', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posting_skips', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Posting Skip',
+                'verbose_name_plural': 'Posting Skips',
+                'db_table': 'posting_skips',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['company', 'source_type'], name='posting_ski_company_045405_idx')],
+                'unique_together': {('source_type', 'source_id')},
+            },
+        ),
+    ]
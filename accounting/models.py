@@ -1,9 +1,12 @@
 """
 Accounting module models
-Chart of Accounts, Journal Entries, Financial Statements
+Chart of Accounts, Journal Entries, Account Balances, Financial Statements
 """
 import uuid
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from core.models import Company, Branch, User
@@ -36,6 +39,11 @@ class ChartOfAccounts(models.Model):
     is_active = models.BooleanField(default=True)
     ai_classification_tags = models.JSONField(default=list, blank=True)
     
+    # Materialized path: ancestor ids (hex) from the root down to this account, each followed by '/'.
+    # Maintained by save(); a subtree is every account whose path starts with the root's path.
+    path = models.CharField(max_length=1024, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -48,10 +56,50 @@ class ChartOfAccounts(models.Model):
             models.Index(fields=['company', 'code']),
             models.Index(fields=['company', 'account_type']),
             models.Index(fields=['parent']),
+            models.Index(fields=['path'], name='chart_of_accounts_path_idx', opclasses=['varchar_pattern_ops']),
         ]
     
     def __str__(self):
         return f"{self.code} - {self.name}"
+    
+    def build_path(self):
+        """Compute (path, depth) from the parent's stored path"""
+        segment = f"{self.id.hex}/"
+        if self.parent_id is None:
+            return segment, 0
+        # Read the parent from the database: an in-memory instance may predate a move
+        parent = ChartOfAccounts.objects.filter(pk=self.parent_id).values('path', 'depth', 'company_id').first()
+        if parent is None:
+            raise ValueError('Parent account does not exist')
+        if self.parent_id == self.pk or segment in parent['path']:
+            raise ValueError('An account cannot be moved under itself or one of its descendants')
+        if parent['company_id'] != self.company_id:
+            raise ValueError('Parent account belongs to a different company')
+        return parent['path'] + segment, parent['depth'] + 1
+    
+    def clean(self):
+        try:
+            self.build_path()
+        except ValueError as exc:
+            raise ValidationError({'parent': str(exc)})
+    
+    def save(self, *args, **kwargs):
+        old_path, old_depth = self.path, self.depth
+        self.path, self.depth = self.build_path()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and (self.path != old_path or self.depth != old_depth):
+            kwargs['update_fields'] = set(update_fields) | {'path', 'depth'}
+        super().save(*args, **kwargs)
+        
+        if old_path and old_path != self.path:
+            # Moved: rewrite the prefix of every descendant in one statement
+            ChartOfAccounts.objects.filter(
+                company_id=self.company_id,
+                path__startswith=old_path,
+            ).exclude(pk=self.pk).update(
+                path=Concat(Value(self.path), Substr('path', len(old_path) + 1), output_field=models.CharField()),
+                depth=F('depth') + (self.depth - old_depth),
+            )
 
 
 class JournalEntry(models.Model):
@@ -70,6 +118,7 @@ class JournalEntry(models.Model):
         ('sale', 'Sale'),
         ('purchase', 'Purchase'),
         ('payment', 'Payment'),
+        ('fx_revaluation', 'FX Revaluation'),
         ('ai_generated', 'AI Generated'),
     ]
     
@@ -83,6 +132,9 @@ class JournalEntry(models.Model):
     # Source tracking
     source_type = models.CharField(max_length=20, choices=SOURCE_TYPES, default='manual')
     source_id = models.UUIDField(null=True, blank=True, help_text="Reference to source entity")
+    # Foreign-currency source documents: their currency and the rate they were booked at
+    currency = models.CharField(max_length=3, null=True, blank=True)
+    exchange_rate = models.DecimalField(max_digits=18, decimal_places=8, null=True, blank=True)
     
     # Approval
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='journal_entries_created')
@@ -103,6 +155,8 @@ class JournalEntry(models.Model):
     )
     
     status = models.CharField(max_length=20, choices=ENTRY_STATUS, default='draft')
+    # Lines live in journal_lines_archive while the entry's fiscal period is closed
+    is_archived = models.BooleanField(default=False, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -114,8 +168,17 @@ class JournalEntry(models.Model):
         indexes = [
             models.Index(fields=['company', 'date']),
             models.Index(fields=['company', 'status']),
+            models.Index(fields=['company', 'is_archived', 'date', 'created_at', 'id']),
             models.Index(fields=['source_type', 'source_id']),
         ]
+        constraints = [
+            # One generated entry per source document (keeps the posting pipeline idempotent)
+            models.UniqueConstraint(
+                fields=['source_type', 'source_id'],
+                condition=models.Q(source_id__isnull=False) & ~models.Q(source_type__in=['manual', 'ai_generated']),
+                name='journal_entries_unique_source',
+            ),
+        ]
         ordering = ['-date', '-created_at']
     
     def __str__(self):
@@ -131,6 +194,8 @@ class JournalLine(models.Model):
     account = models.ForeignKey(ChartOfAccounts, on_delete=models.PROTECT, related_name='journal_lines')
     debit = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'), validators=[MinValueValidator(0)])
     credit = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'), validators=[MinValueValidator(0)])
+    # Signed amount in the entry's currency (debit positive) when the entry has one
+    amount_currency = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     
     class Meta:
@@ -146,6 +211,148 @@ class JournalLine(models.Model):
         return f"{self.account.code} - Debit: {self.debit}, Credit: {self.credit}"
 
 
+class FiscalPeriod(models.Model):
+    """
+    Fiscal Period - Date range whose journal data can be closed or locked
+    Closed periods reject writes and have their lines archived; they can be reopened.
+    Locked periods are closed for good.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('closed', 'Closed'),
+        ('locked', 'Locked'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='fiscal_periods')
+    name = models.CharField(max_length=50)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    
+    closed_at = models.DateTimeField(null=True, blank=True)
+    closed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='fiscal_periods_closed')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'fiscal_periods'
+        verbose_name = 'Fiscal Period'
+        verbose_name_plural = 'Fiscal Periods'
+        unique_together = [['company', 'start_date']]
+        indexes = [
+            models.Index(fields=['company', 'status']),
+        ]
+        ordering = ['-start_date']
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+    
+    def clean(self):
+        if self.start_date and self.end_date:
+            if self.start_date > self.end_date:
+                raise ValidationError({'end_date': 'end_date must be on or after start_date'})
+            overlapping = FiscalPeriod.objects.filter(
+                company_id=self.company_id, start_date__lte=self.end_date, end_date__gte=self.start_date
+            ).exclude(pk=self.pk)
+            if overlapping.exists():
+                raise ValidationError('Fiscal periods of a company cannot overlap')
+
+
+class ArchivedJournalLine(models.Model):
+    """
+    Archived Journal Line - Lines of closed fiscal periods, moved out of journal_lines
+    so live queries skip them (see accounting.periods). Ids are kept from the original line.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    journal_entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='archived_lines')
+    account = models.ForeignKey(ChartOfAccounts, on_delete=models.PROTECT, related_name='archived_journal_lines')
+    debit = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    credit = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    amount_currency = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    description = models.TextField(null=True, blank=True)
+    period = models.ForeignKey(FiscalPeriod, on_delete=models.PROTECT, related_name='archived_lines')
+    
+    class Meta:
+        db_table = 'journal_lines_archive'
+        verbose_name = 'Archived Journal Line'
+        verbose_name_plural = 'Archived Journal Lines'
+        indexes = [
+            models.Index(fields=['journal_entry']),
+            models.Index(fields=['account']),
+            models.Index(fields=['period']),
+        ]
+    
+    def __str__(self):
+        return f"{self.account_id} - Debit: {self.debit}, Credit: {self.credit}"
+
+
+class AccountBalance(models.Model):
+    """
+    Account Balance - Materialized debit/credit totals per account per month
+    Maintained incrementally as journal entries are posted or reversed (see accounting.balances)
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='account_balances')
+    account = models.ForeignKey(ChartOfAccounts, on_delete=models.CASCADE, related_name='balances')
+    period_start = models.DateField(help_text="First day of the month")
+    debit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    credit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'account_balances'
+        verbose_name = 'Account Balance'
+        verbose_name_plural = 'Account Balances'
+        unique_together = [['company', 'account', 'period_start']]
+        indexes = [
+            models.Index(fields=['company', 'period_start']),
+        ]
+        ordering = ['-period_start']
+    
+    def __str__(self):
+        return f"{self.account_id} {self.period_start:%Y-%m}: {self.balance}"
+    
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+
+class ExchangeRate(models.Model):
+    """
+    Exchange Rate - Units of the company currency per one unit of a foreign currency
+    A rate applies from its date until the next rate of the same currency (see accounting.fx)
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='exchange_rates')
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=8, validators=[MinValueValidator(Decimal('0.00000001'))])
+    source = models.CharField(max_length=50, default='manual')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'exchange_rates'
+        verbose_name = 'Exchange Rate'
+        verbose_name_plural = 'Exchange Rates'
+        unique_together = [['company', 'currency', 'date']]
+        indexes = [
+            models.Index(fields=['company', 'date']),
+        ]
+        ordering = ['-date', 'currency']
+    
+    def __str__(self):
+        return f"{self.currency} {self.date}: {self.rate}"
+    
+    def save(self, *args, **kwargs):
+        self.currency = self.currency.upper()
+        super().save(*args, **kwargs)
+
+
 class FinancialStatement(models.Model):
     """
     Financial Statements - Generated by AI or manually
@@ -169,6 +376,9 @@ class FinancialStatement(models.Model):
     # AI analysis and insights
     ai_analysis = models.JSONField(default=dict, blank=True, help_text="Insights, warnings, recommendations")
     
+    # Set when an entry is posted into the covered period; stale statements are recomputed on request
+    is_stale = models.BooleanField(default=False)
+    
     generated_at = models.DateTimeField(auto_now_add=True)
     generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='financial_statements_generated')
     
@@ -183,3 +393,31 @@ class FinancialStatement(models.Model):
     
     def __str__(self):
         return f"{self.statement_type} - {self.company.name} ({self.period_start} to {self.period_end})"
+
+
+class PostingSkip(models.Model):
+    """
+    Posting Skip - a source document the posting pipeline could not turn into an entry
+    (unmapped account, missing exchange rate, closed period). Skipped documents are left
+    out of later scans until they are retried (see accounting.posting).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='posting_skips')
+    source_type = models.CharField(max_length=20, choices=JournalEntry.SOURCE_TYPES)
+    source_id = models.UUIDField()
+    reason = models.TextField()
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'posting_skips'
+        verbose_name = 'Posting Skip'
+        verbose_name_plural = 'Posting Skips'
+        unique_together = [['source_type', 'source_id']]
+        indexes = [
+            models.Index(fields=['company', 'source_type']),
+        ]
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.source_type} {self.source_id}: {self.reason[:50]}"
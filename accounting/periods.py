@@ -0,0 +1,190 @@
+"""
+Fiscal periods
+Write protection for closed/locked periods and the archive of their journal lines.
+
+Journal entries dated inside a closed or locked FiscalPeriod cannot be created, edited
+or deleted. Single-object writes are checked in accounting.signals; bulk writers
+(importer, posting, fx) call writable_dates()/check_writable() themselves.
+
+Closing a period moves its lines from journal_lines to journal_lines_archive with two
+set-based statements and flags the entries is_archived, so live line queries and the
+default entry listing no longer touch them. AccountBalance snapshots are untouched, so
+balances and statements keep working; reports that read lines include the archive.
+Periods close in date order and reopen in reverse order, which keeps the archive a
+contiguous block of history.
+"""
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedJournalLine, FiscalPeriod, JournalEntry, JournalLine
+
+CLOSED_STATUSES = ('closed', 'locked')
+
+
+class PeriodClosedError(ValidationError):
+    pass
+
+
+def _cache_key(company_id):
+    return f"fiscal_periods_closed_{company_id}"
+
+
+def closed_periods(company_id):
+    """[(start_date, end_date, name, status)] of the company's closed and locked periods"""
+    try:
+        periods = cache.get(_cache_key(company_id))
+    except Exception:
+        periods = None
+    if periods is None:
+        periods = list(
+            FiscalPeriod.objects.filter(company_id=company_id, status__in=CLOSED_STATUSES)
+            .order_by('start_date')
+            .values_list('start_date', 'end_date', 'name', 'status')
+        )
+        try:
+            cache.set(_cache_key(company_id), periods, None)
+        except Exception:
+            pass
+    return periods
+
+
+def forget_periods(company_id):
+    try:
+        cache.delete(_cache_key(company_id))
+    except Exception:
+        pass
+
+
+def closed_period_for(company_id, date):
+    for start, end, name, status in closed_periods(company_id):
+        if start <= date <= end:
+            return name, status
+    return None
+
+
+def writable_dates(company_id, dates):
+    """The subset of dates that fall in open (or no) periods"""
+    periods = closed_periods(company_id)
+    return {date for date in dates if not any(start <= date <= end for start, end, _, _ in periods)}
+
+
+def check_writable(company_id, dates):
+    """Raise PeriodClosedError if any date falls in a closed or locked period"""
+    for date in dates:
+        if date is None:
+            continue
+        period = closed_period_for(company_id, date)
+        if period is not None:
+            raise PeriodClosedError(f'{date} falls in {period[1]} fiscal period {period[0]}')
+
+
+def has_archive(company_id, date_from=None, date_to=None):
+    """Whether archived lines can fall between date_from and date_to"""
+    return any(
+        (date_to is None or start <= date_to) and (date_from is None or end >= date_from)
+        for start, end, _, _ in closed_periods(company_id)
+    )
+
+
+def _db_value(model, field_name, value):
+    return model._meta.get_field(field_name).get_db_prep_value(value, connection)
+
+
+def _move_lines(period, to_archive):
+    """Move the period's lines between the live and archive tables; returns the number moved"""
+    entries = JournalEntry._meta.db_table
+    live = JournalLine._meta.db_table
+    archive = ArchivedJournalLine._meta.db_table
+    params = [
+        _db_value(JournalEntry, 'company', period.company_id),
+        _db_value(JournalEntry, 'date', period.start_date),
+        _db_value(JournalEntry, 'date', period.end_date),
+    ]
+    in_period = (
+        f"journal_entry_id IN (SELECT id FROM {entries} WHERE company_id = %s AND date >= %s AND date <= %s)"
+    )
+    with connection.cursor() as cursor:
+        if to_archive:
+            cursor.execute(
+                f"INSERT INTO {archive} "
+                f"(id, journal_entry_id, account_id, debit, credit, amount_currency, description, period_id) "
+                f"SELECT id, journal_entry_id, account_id, debit, credit, amount_currency, description, %s FROM {live} "
+                f"WHERE {in_period}",
+                [_db_value(ArchivedJournalLine, 'period', period.pk)] + params,
+            )
+            moved = cursor.rowcount
+            cursor.execute(f"DELETE FROM {live} WHERE {in_period}", params)
+        else:
+            cursor.execute(
+                f"INSERT INTO {live} (id, journal_entry_id, account_id, debit, credit, amount_currency, description) "
+                f"SELECT id, journal_entry_id, account_id, debit, credit, amount_currency, description FROM {archive} "
+                f"WHERE period_id = %s",
+                [_db_value(ArchivedJournalLine, 'period', period.pk)],
+            )
+            moved = cursor.rowcount
+            cursor.execute(
+                f"DELETE FROM {archive} WHERE period_id = %s", [_db_value(ArchivedJournalLine, 'period', period.pk)]
+            )
+    JournalEntry.objects.filter(
+        company_id=period.company_id, date__gte=period.start_date, date__lte=period.end_date
+    ).update(is_archived=to_archive)
+    return moved
+
+
+def close_period(period, user=None, lock=False):
+    """
+    Close (or lock) an open period and archive its lines.
+    Every earlier period of the company must already be closed.
+    Returns the number of lines archived.
+    """
+    with transaction.atomic():
+        period = FiscalPeriod.objects.select_for_update().get(pk=period.pk)
+        if period.status != 'open':
+            raise ValidationError(f'Fiscal period {period.name} is already {period.status}')
+        earlier_open = FiscalPeriod.objects.filter(
+            company_id=period.company_id, status='open', start_date__lt=period.start_date
+        )
+        if earlier_open.exists():
+            raise ValidationError('Close earlier fiscal periods first')
+        moved = _move_lines(period, to_archive=True)
+        period.status = 'locked' if lock else 'closed'
+        period.closed_at = timezone.now()
+        period.closed_by = user
+        period.save(update_fields=['status', 'closed_at', 'closed_by', 'updated_at'])
+    return moved
+
+
+def lock_period(period, user=None):
+    """Lock a period for good, closing it first if it is still open"""
+    with transaction.atomic():
+        period = FiscalPeriod.objects.select_for_update().get(pk=period.pk)
+        if period.status == 'open':
+            close_period(period, user=user, lock=True)
+        elif period.status == 'closed':
+            period.status = 'locked'
+            period.save(update_fields=['status', 'updated_at'])
+
+
+def reopen_period(period):
+    """
+    Reopen a closed (not locked) period and restore its lines.
+    Only the latest closed period of the company can be reopened.
+    Returns the number of lines restored.
+    """
+    with transaction.atomic():
+        period = FiscalPeriod.objects.select_for_update().get(pk=period.pk)
+        if period.status != 'closed':
+            raise ValidationError(f'Only closed fiscal periods can be reopened ({period.name} is {period.status})')
+        later_closed = FiscalPeriod.objects.filter(
+            company_id=period.company_id, status__in=CLOSED_STATUSES, start_date__gt=period.start_date
+        )
+        if later_closed.exists():
+            raise ValidationError('Reopen later fiscal periods first')
+        moved = _move_lines(period, to_archive=False)
+        period.status = 'open'
+        period.closed_at = None
+        period.closed_by = None
+        period.save(update_fields=['status', 'closed_at', 'closed_by', 'updated_at'])
+    return moved
@@ -0,0 +1,357 @@
+"""
+Ledger posting
+post_entries() moves draft journal entries to 'posted' in batches. The whole batch is
+validated with one grouped aggregate over its lines (balance, line count, inactive or
+foreign accounts); closed fiscal periods are checked against the cached period map.
+Valid entries are transitioned with one UPDATE and their lines added to the balance
+snapshots in the same transaction.
+
+post_documents() / post_pending() generate balanced journal entries for sales invoices,
+received purchase orders and completed payments, in batches and with bulk writes.
+
+Accounts come from Company.settings['posting_accounts'], a map of role -> account code:
+    receivable, revenue, tax_payable      (sales)
+    payable, purchases, tax_receivable    (purchases)
+    cash, receivable                      (payments)
+    fx_gain, fx_loss                      (foreign payments settled at another rate)
+tax_payable / tax_receivable are only needed when a document carries tax.
+
+Foreign-currency documents are booked in the company currency at the rate of their
+date; the entry keeps the currency and rate and each line its foreign amount
+(amount_currency), which FX revaluation reads back. A payment of an invoice settles the
+receivable at the rate the invoice was booked at and books the difference as a realized
+gain or loss. Payments are booked on their value date.
+
+Entries are tagged with (source_type, source_id); documents that already have an entry
+are skipped, and a unique constraint on that pair keeps concurrent runs idempotent.
+Documents that cannot be posted (unmapped account, missing rate, closed period) are
+recorded in PostingSkip so later runs scan past them; post_documents(retry_skipped=True)
+tries them again.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from core import sequences
+from core.models import Company
+from payments.models import Payment
+from purchases.models import PurchaseOrder
+from sales.models import Invoice
+
+from . import balances, fx, periods
+from .models import ChartOfAccounts, JournalEntry, JournalLine, PostingSkip
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+DEFAULT_BATCH_SIZE = 500
+
+
+def validate_entries(entries):
+    """
+    Check a JournalEntry queryset for posting with one grouped aggregate.
+    Returns {entry_id: [error, ...]} for every entry that cannot be posted.
+    """
+    rows = (
+        entries.values('id', 'company_id', 'date', 'status')
+        .annotate(
+            line_count=Count('lines'),
+            total_debit=Sum('lines__debit'),
+            total_credit=Sum('lines__credit'),
+            inactive_lines=Count('lines', filter=Q(lines__account__is_active=False)),
+            foreign_lines=Count('lines', filter=~Q(lines__account__company_id=F('company_id'))),
+        )
+        .order_by()
+    )
+    errors = {}
+    for row in rows:
+        problems = []
+        if row['status'] != 'draft':
+            problems.append(f"Entry is {row['status']}, only draft entries can be posted")
+        if row['line_count'] < 2:
+            problems.append('An entry needs at least two lines')
+        debit = (row['total_debit'] or ZERO).quantize(ZERO)
+        credit = (row['total_credit'] or ZERO).quantize(ZERO)
+        if debit != credit:
+            problems.append(f'Entry is unbalanced: debits {debit} != credits {credit}')
+        elif not debit and row['line_count']:
+            problems.append('Entry has no amounts')
+        if row['inactive_lines']:
+            problems.append('Entry uses inactive accounts')
+        if row['foreign_lines']:
+            problems.append("Entry uses accounts of another company")
+        period = periods.closed_period_for(row['company_id'], row['date'])
+        if period is not None:
+            problems.append(f"{row['date']} falls in {period[1]} fiscal period {period[0]}")
+        if problems:
+            errors[row['id']] = problems
+    return errors
+
+
+def post_entries(entry_ids, user=None, all_or_nothing=False, company=None):
+    """
+    Validate and post draft entries in one transaction.
+    The entries are locked first so lines cannot change between validation and posting.
+    With company, ids of other companies are reported as not found.
+    With all_or_nothing nothing is posted when any entry fails.
+    Returns {'posted': [ids], 'errors': {id: [messages]}}.
+    """
+    entry_ids = list(entry_ids)
+    with transaction.atomic():
+        entries = JournalEntry.objects.select_for_update().filter(pk__in=entry_ids)
+        if company is not None:
+            entries = entries.filter(company=company)
+        locked = set(entries.values_list('pk', flat=True))
+        errors = {entry_id: ['Entry not found'] for entry_id in entry_ids if entry_id not in locked}
+        errors.update(validate_entries(JournalEntry.objects.filter(pk__in=locked)))
+        valid = [entry_id for entry_id in locked if entry_id not in errors]
+        if not valid or (errors and all_or_nothing):
+            return {'posted': [], 'errors': errors}
+        changes = {'status': 'posted', 'updated_at': timezone.now()}
+        if user is not None:
+            changes['approved_by'] = user
+        JournalEntry.objects.filter(pk__in=valid).update(**changes)
+        # queryset.update skips signals, so the snapshots are updated here
+        balances.apply_entries(valid)
+    return {'posted': valid, 'errors': errors}
+
+
+def _base(amount, rate):
+    return (amount * rate).quantize(ZERO)
+
+
+def _sale_lines(doc, rate):
+    exchange_rate = rate(doc['currency'], doc['date'])
+    total, tax = doc['total'], doc['tax'] or ZERO
+    base_total, base_tax = _base(total, exchange_rate), _base(tax, exchange_rate)
+    lines = [('receivable', base_total, ZERO, total), ('revenue', ZERO, base_total - base_tax, tax - total)]
+    if tax:
+        lines.append(('tax_payable', ZERO, base_tax, -tax))
+    if doc['invoice_type'] == 'credit_note':
+        lines = [(role, credit, debit, -amount) for role, debit, credit, amount in lines]
+    return lines
+
+
+def _purchase_lines(doc, rate):
+    exchange_rate = rate(doc['currency'], doc['date'])
+    total, tax = doc['total'], doc['tax'] or ZERO
+    base_total, base_tax = _base(total, exchange_rate), _base(tax, exchange_rate)
+    lines = [('purchases', base_total - base_tax, ZERO, total - tax), ('payable', ZERO, base_total, -total)]
+    if tax:
+        lines.append(('tax_receivable', base_tax, ZERO, tax))
+    return lines
+
+
+def _payment_lines(doc, rate):
+    # Cash comes in at the payment-date rate and settles the receivable at the rate its
+    # invoice was booked at; the difference is a realized FX gain or loss
+    amount = doc['amount']
+    cash = _base(amount, rate(doc['currency'], doc['date']))
+    settled = cash
+    if doc['invoice_rate'] is not None and (doc['invoice__currency'] or '').upper() == doc['currency'].upper():
+        settled = _base(amount, doc['invoice_rate'])
+    lines = [('cash', cash, ZERO, amount), ('receivable', ZERO, settled, -amount)]
+    if cash > settled:
+        lines.append(('fx_gain', ZERO, cash - settled, ZERO))
+    elif cash < settled:
+        lines.append(('fx_loss', settled - cash, ZERO, ZERO))
+    return lines
+
+
+def _payments():
+    invoice_rate = JournalEntry.objects.filter(source_type='sale', source_id=OuterRef('invoice_id')).values('exchange_rate')
+    return Payment.objects.filter(status='completed').annotate(invoice_rate=Subquery(invoice_rate[:1]))
+
+
+SOURCES = {
+    'sale': {
+        'queryset': lambda: Invoice.objects.filter(status__in=['sent', 'paid', 'overdue']),
+        'fields': ['id', 'branch_id', 'invoice_number', 'invoice_type', 'date', 'currency', 'total', 'tax'],
+        'lines': _sale_lines,
+        'date': lambda doc: doc['date'],
+        'branch': lambda doc: doc['branch_id'],
+        'description': lambda doc: f"Invoice {doc['invoice_number']}",
+    },
+    'purchase': {
+        'queryset': lambda: PurchaseOrder.objects.filter(status='received'),
+        'fields': ['id', 'branch_id', 'order_number', 'date', 'currency', 'total', 'tax'],
+        'lines': _purchase_lines,
+        'date': lambda doc: doc['date'],
+        'branch': lambda doc: doc['branch_id'],
+        'description': lambda doc: f"Purchase order {doc['order_number']}",
+    },
+    'payment': {
+        'queryset': _payments,
+        'fields': ['id', 'amount', 'date', 'currency', 'transaction_reference', 'invoice__currency', 'invoice_rate'],
+        'lines': _payment_lines,
+        'date': lambda doc: doc['date'],
+        'branch': lambda doc: None,
+        'description': lambda doc: f"Payment {doc['transaction_reference'] or doc['id']}",
+    },
+}
+
+
+def resolve_accounts(company):
+    """role -> ChartOfAccounts id for the company's active posting accounts (one query)"""
+    mapping = (company.settings or {}).get('posting_accounts', {})
+    ids_by_code = dict(
+        ChartOfAccounts.objects.filter(company=company, code__in=list(mapping.values()), is_active=True)
+        .values_list('code', 'id')
+    )
+    return {role: ids_by_code[code] for role, code in mapping.items() if code in ids_by_code}
+
+
+def pending_documents(source_type, company):
+    """Source documents of the company that have no generated journal entry yet and were not skipped"""
+    posted = JournalEntry.objects.filter(source_type=source_type, source_id__isnull=False).values('source_id')
+    skipped = PostingSkip.objects.filter(source_type=source_type).values('source_id')
+    return SOURCES[source_type]['queryset']().filter(company=company).exclude(id__in=posted).exclude(id__in=skipped)
+
+
+def _skip_reason(doc_lines, accounts, company, entry_date):
+    """Why the document's lines cannot be posted, or None"""
+    missing = [line[0] for line in doc_lines if line[0] not in accounts]
+    if missing:
+        return f"No account mapped for {', '.join(missing)}"
+    closed = periods.closed_period_for(company.pk, entry_date)
+    if closed:
+        return f'{entry_date} is in closed period {closed[0]}'
+    if not doc_lines:
+        return 'Nothing to post'
+    if sum((line[1] for line in doc_lines), ZERO) != sum((line[2] for line in doc_lines), ZERO):
+        return 'Unbalanced document'
+    return None
+
+
+def _build(source, docs, accounts, company):
+    """
+    Build unsaved entries and lines, converting foreign documents to the company currency
+    (one rate query per batch); returns (entries, lines, {skipped document id: reason})
+    """
+    if not docs:
+        return [], [], {}
+    foreign = {doc['currency'].upper() for doc in docs} - {company.currency}
+    table = fx.RateTable(company, currencies=foreign, date_to=max(source['date'](doc) for doc in docs))
+    entries, lines, skipped = [], [], {}
+    for doc in docs:
+        entry_date = source['date'](doc)
+        currency = doc['currency'].upper()
+        try:
+            doc_lines = [line for line in source['lines'](doc, table.rate) if line[1] or line[2]]
+            reason = _skip_reason(doc_lines, accounts, company, entry_date)
+        except fx.MissingRateError as exc:
+            reason = str(exc)
+        if reason is not None:
+            logger.warning('Cannot post %s for %s: %s', doc['id'], company.pk, reason)
+            skipped[doc['id']] = reason
+            continue
+        is_foreign = currency != company.currency
+        entry = JournalEntry(
+            company=company,
+            branch_id=source['branch'](doc),
+            date=entry_date,
+            description=source['description'](doc),
+            source_id=doc['id'],
+            currency=currency if is_foreign else None,
+            exchange_rate=table.rate(currency, entry_date) if is_foreign else None,
+        )
+        entries.append(entry)
+        for role, debit, credit, amount in doc_lines:
+            lines.append(JournalLine(
+                journal_entry=entry,
+                account_id=accounts[role],
+                debit=debit,
+                credit=credit,
+                amount_currency=amount if is_foreign else None,
+            ))
+    return entries, lines, skipped
+
+
+def _record_skips(source_type, company, skipped):
+    PostingSkip.objects.bulk_create(
+        [
+            PostingSkip(company=company, source_type=source_type, source_id=source_id, reason=reason)
+            for source_id, reason in skipped.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _write(source_type, company, entries, lines, post):
+    status = 'posted' if post else 'draft'
+    numbers = sequences.next_numbers(company, 'journal_entry', len(entries))
+    for entry, number in zip(entries, numbers):
+        entry.entry_number = number
+        entry.source_type = source_type
+        entry.status = status
+    with transaction.atomic():
+        JournalEntry.objects.bulk_create(entries)
+        JournalLine.objects.bulk_create(lines)
+        if post:
+            balances.apply_entries([entry.pk for entry in entries])
+
+
+def post_documents(source_type, company, batch_size=DEFAULT_BATCH_SIZE, post=True, retry_skipped=False):
+    """
+    Generate entries for every pending document of one type for one company.
+    Documents that cannot be posted are recorded as PostingSkip rows and left out of
+    later runs; retry_skipped clears them first.
+    Returns {'created': n, 'skipped': n}.
+    """
+    source = SOURCES[source_type]
+    accounts = resolve_accounts(company)
+    if retry_skipped:
+        PostingSkip.objects.filter(company=company, source_type=source_type).delete()
+    result = {'created': 0, 'skipped': 0}
+    last_id = None
+    while True:
+        docs = pending_documents(source_type, company).order_by('id')
+        if last_id is not None:
+            docs = docs.filter(id__gt=last_id)
+        docs = list(docs.values(*source['fields'])[:batch_size])
+        if not docs:
+            break
+        last_id = docs[-1]['id']
+
+        entries, lines, skipped = _build(source, docs, accounts, company)
+        _record_skips(source_type, company, skipped)
+        result['skipped'] += len(skipped)
+        if not entries:
+            continue
+        try:
+            _write(source_type, company, entries, lines, post)
+        except IntegrityError:
+            # Another worker posted some of these documents first: drop them and retry once
+            done = set(
+                JournalEntry.objects.filter(
+                    source_type=source_type, source_id__in=[entry.source_id for entry in entries]
+                ).values_list('source_id', flat=True)
+            )
+            docs = [doc for doc in docs if doc['id'] not in done]
+            entries, lines, _ = _build(source, docs, accounts, company)
+            if entries:
+                _write(source_type, company, entries, lines, post)
+        result['created'] += len(entries)
+    return result
+
+
+def post_pending(company=None, source_types=None, batch_size=DEFAULT_BATCH_SIZE, post=True, retry_skipped=False):
+    """
+    Run post_documents for every active company (or one) and source type.
+    Returns {company_id: {source_type: {'created': n, 'skipped': n}}} for companies with work.
+    """
+    companies = [company] if company is not None else Company.objects.filter(is_active=True)
+    summary = {}
+    for current in companies:
+        if not (current.settings or {}).get('posting_accounts'):
+            continue
+        for source_type in source_types or SOURCES:
+            result = post_documents(
+                source_type, current, batch_size=batch_size, post=post, retry_skipped=retry_skipped
+            )
+            if result['created'] or result['skipped']:
+                summary.setdefault(str(current.pk), {})[source_type] = result
+    return summary
@@ -0,0 +1,295 @@
+"""
+Ledger reports
+Trial balance and general ledger computed straight from JournalLine joined to
+JournalEntry, filtered by company, date range, branch and entry status.
+
+The trial balance is one grouped aggregate query per line table. The general ledger is produced by a
+generator over a server-side iterator so large ledgers can be streamed as CSV or NDJSON
+without being held in memory.
+
+Lines of closed fiscal periods live in the archive table (accounting.periods); when the
+requested range reaches a closed period the same queries also run against the archive
+and the results are merged.
+"""
+import csv
+import heapq
+import json
+
+from django.db.models import Case, DecimalField, Min, Sum, Value, When
+from django.utils import timezone
+
+from . import balances, fx, periods
+from .models import ArchivedJournalLine, JournalEntry, JournalLine
+
+ZERO = balances.ZERO
+
+# status filter value that includes every entry status
+ALL_STATUSES = 'all'
+STREAM_CHUNK_SIZE = 2000
+
+GENERAL_LEDGER_FIELDS = [
+    'account_code', 'account_name', 'date', 'entry_number', 'entry_id', 'description',
+    'line_description', 'debit', 'credit', 'balance',
+]
+
+
+def conversion_table(company, currency, date_from=None, date_to=None, branch=None, status='posted',
+                     account_ids=None):
+    """
+    RateTable for presenting the general ledger in another currency, or None for the
+    company currency. Raises fx.MissingRateError unless rates cover the dates the ledger
+    converts: date_from when there are opening balances, otherwise the first line's date.
+    """
+    if not currency or currency.upper() == company.currency:
+        return None
+    table = fx.RateTable(company, currencies=[currency], date_to=date_to)
+    sources = report_sources(company, date_to, branch, status)
+    if account_ids is not None:
+        sources = [lines.filter(account_id__in=account_ids) for lines in sources]
+    if date_from is not None:
+        if any(lines.filter(journal_entry__date__lt=date_from).exists() for lines in sources):
+            table.rate(currency, date_from)
+            return table
+        sources = [lines.filter(journal_entry__date__gte=date_from) for lines in sources]
+    firsts = [lines.aggregate(first=Min('journal_entry__date'))['first'] for lines in sources]
+    earliest = min((first for first in firsts if first is not None), default=None)
+    if earliest is not None:
+        table.rate(currency, earliest)
+    return table
+
+
+def report_lines(company, date_to=None, branch=None, status='posted', archived=False):
+    """
+    Line queryset of the company up to date_to, filtered by branch and entry status;
+    archived=True reads the archive of closed periods
+    """
+    model = ArchivedJournalLine if archived else JournalLine
+    lines = model.objects.filter(journal_entry__company=company)
+    if status != ALL_STATUSES:
+        lines = lines.filter(journal_entry__status=status)
+    if branch is not None:
+        lines = lines.filter(journal_entry__branch=branch)
+    if date_to is not None:
+        lines = lines.filter(journal_entry__date__lte=date_to)
+    return lines
+
+
+def report_sources(company, date_to=None, branch=None, status='posted'):
+    """Live lines plus, when closed periods start on or before date_to, archived lines"""
+    sources = [report_lines(company, date_to, branch, status)]
+    if periods.has_archive(company.pk, date_to=date_to):
+        sources.append(report_lines(company, date_to, branch, status, archived=True))
+    return sources
+
+
+def _sum_before(field, date_from):
+    return Sum(
+        Case(
+            When(journal_entry__date__lt=date_from, then=field),
+            default=Value(ZERO),
+            output_field=DecimalField(max_digits=18, decimal_places=2),
+        )
+    )
+
+
+def trial_balance(company, date_from=None, date_to=None, branch=None, status='posted', currency=None):
+    """
+    Opening, period and closing debit/credit per account in one grouped query per line table.
+    Opening amounts are everything dated before date_from (zero without date_from).
+    With currency, amounts are translated at the rate effective on date_to (today when open-ended).
+    """
+    rate_date = date_to or timezone.localdate()
+    rate = None
+    if currency and currency.upper() != company.currency:
+        rate = fx.rate_on(company, currency, rate_date)
+
+    def convert(amount):
+        return (amount / rate).quantize(ZERO) if rate is not None else amount
+
+    grouped = {}
+    for lines in report_sources(company, date_to, branch, status):
+        rows = (
+            lines.values('account_id', 'account__code', 'account__name', 'account__account_type')
+            .annotate(total_debit=Sum('debit'), total_credit=Sum('credit'))
+            .order_by()
+        )
+        if date_from is not None:
+            rows = rows.annotate(
+                opening_debit=_sum_before('debit', date_from),
+                opening_credit=_sum_before('credit', date_from),
+            )
+        for row in rows:
+            current = grouped.get(row['account_id'])
+            if current is None:
+                grouped[row['account_id']] = row
+                continue
+            for key in ('total_debit', 'total_credit', 'opening_debit', 'opening_credit'):
+                if key in row:
+                    current[key] = (current[key] or ZERO) + (row[key] or ZERO)
+
+    accounts = []
+    totals = {'opening': ZERO, 'debit': ZERO, 'credit': ZERO, 'closing_debit': ZERO, 'closing_credit': ZERO}
+    for row in sorted(grouped.values(), key=lambda row: row['account__code']):
+        opening_debit = row.get('opening_debit') or ZERO
+        opening_credit = row.get('opening_credit') or ZERO
+        opening = convert((opening_debit - opening_credit).quantize(ZERO))
+        debit = convert(((row['total_debit'] or ZERO) - opening_debit).quantize(ZERO))
+        credit = convert(((row['total_credit'] or ZERO) - opening_credit).quantize(ZERO))
+        closing = opening + debit - credit
+        closing_debit, closing_credit = (closing, ZERO) if closing >= 0 else (ZERO, -closing)
+        totals['opening'] += opening
+        totals['debit'] += debit
+        totals['credit'] += credit
+        totals['closing_debit'] += closing_debit
+        totals['closing_credit'] += closing_credit
+        accounts.append({
+            'account': str(row['account_id']),
+            'code': row['account__code'],
+            'name': row['account__name'],
+            'account_type': row['account__account_type'],
+            'opening_balance': str(opening),
+            'debit': str(debit),
+            'credit': str(credit),
+            'closing_debit': str(closing_debit),
+            'closing_credit': str(closing_credit),
+        })
+
+    return {
+        'date_from': date_from.isoformat() if date_from else None,
+        'date_to': date_to.isoformat() if date_to else None,
+        'status': status,
+        'currency': company.currency if rate is None else currency.upper(),
+        'accounts': accounts,
+        'totals': {key: str(value) for key, value in totals.items()},
+        'is_balanced': totals['closing_debit'] == totals['closing_credit'],
+    }
+
+
+def _opening_row(account, date_from):
+    return {
+        'account_code': account['account__code'],
+        'account_name': account['account__name'],
+        'date': date_from.isoformat(),
+        'entry_number': '',
+        'entry_id': '',
+        'description': 'Opening balance',
+        'line_description': '',
+        'debit': '',
+        'credit': '',
+        'balance': str(account['balance']),
+    }
+
+
+def general_ledger(company, date_from=None, date_to=None, branch=None, status='posted', account_ids=None,
+                   currency=None, rates=None):
+    """
+    Yield one dict per journal line, grouped by account code and ordered by date, with a
+    running balance. When date_from is given every account with activity before or
+    during the period starts with an opening balance row.
+    With currency and rates (conversion_table()), each line is translated at the rate of
+    its date and openings at the rate of date_from.
+    """
+    def convert(amount, date):
+        return amount if rates is None else rates.from_base(amount, currency, date)
+
+    sources = report_sources(company, date_to, branch, status)
+    if account_ids is not None:
+        sources = [lines.filter(account_id__in=account_ids) for lines in sources]
+
+    # Accounts with an opening balance, in code order, merged into the line stream below
+    openings = []
+    if date_from is not None:
+        opening_totals = {}
+        for lines in sources:
+            for row in (
+                lines.filter(journal_entry__date__lt=date_from)
+                .values('account_id', 'account__code', 'account__name')
+                .annotate(debit=Sum('debit'), credit=Sum('credit'))
+                .order_by()
+            ):
+                amount = (row['debit'] or ZERO) - (row['credit'] or ZERO)
+                if row['account_id'] in opening_totals:
+                    opening_totals[row['account_id']]['balance'] += amount
+                else:
+                    opening_totals[row['account_id']] = dict(row, balance=amount)
+        openings = sorted(opening_totals.values(), key=lambda row: row['account__code'])
+        for row in openings:
+            row['balance'] = convert(row['balance'].quantize(ZERO), date_from)
+        sources = [lines.filter(journal_entry__date__gte=date_from) for lines in sources]
+    opening_by_account = {row['account_id']: row['balance'] for row in openings}
+    pending = iter(openings)
+    next_opening = next(pending, None)
+
+    order = ('account__code', 'journal_entry__date', 'journal_entry__entry_number', 'id')
+    streams = [
+        lines.values(
+            'id', 'account_id', 'account__code', 'account__name', 'journal_entry_id', 'journal_entry__entry_number',
+            'journal_entry__date', 'journal_entry__description', 'description', 'debit', 'credit',
+        ).order_by(*order).iterator(chunk_size=STREAM_CHUNK_SIZE)
+        for lines in sources
+    ]
+    rows = streams[0] if len(streams) == 1 else heapq.merge(
+        *streams, key=lambda row: (row['account__code'], row['journal_entry__date'],
+                                   row['journal_entry__entry_number'], str(row['id']))
+    )
+
+    current, balance = None, ZERO
+    for row in rows:
+        if row['account_id'] != current:
+            current = row['account_id']
+            # Accounts that only have an opening balance come before this one
+            while next_opening is not None and next_opening['account__code'] < row['account__code']:
+                yield _opening_row(next_opening, date_from)
+                next_opening = next(pending, None)
+            if next_opening is not None and next_opening['account_id'] == current:
+                next_opening = next(pending, None)
+            balance = opening_by_account.get(current, ZERO)
+            if date_from is not None:
+                yield _opening_row(dict(row, balance=balance), date_from)
+        debit = convert(row['debit'], row['journal_entry__date'])
+        credit = convert(row['credit'], row['journal_entry__date'])
+        balance += debit - credit
+        yield {
+            'account_code': row['account__code'],
+            'account_name': row['account__name'],
+            'date': row['journal_entry__date'].isoformat(),
+            'entry_number': row['journal_entry__entry_number'],
+            'entry_id': str(row['journal_entry_id']),
+            'description': row['journal_entry__description'],
+            'line_description': row['description'] or '',
+            'debit': str(debit),
+            'credit': str(credit),
+            'balance': str(balance),
+        }
+    while next_opening is not None:
+        yield _opening_row(next_opening, date_from)
+        next_opening = next(pending, None)
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer in a generator"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, fields=GENERAL_LEDGER_FIELDS):
+    writer = csv.DictWriter(_Echo(), fieldnames=fields)
+    yield writer.writerow(dict(zip(fields, fields)))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+STREAM_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+
+def is_valid_status(value):
+    return value == ALL_STATUSES or value in dict(JournalEntry.ENTRY_STATUS)
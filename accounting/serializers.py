@@ -1,15 +1,37 @@
 """
 Accounting module serializers
 """
+import copy
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import ChartOfAccounts, JournalEntry, JournalLine, FinancialStatement
+
+from core.serializers import TENANT_COMPANY, tenant_company
+
+from . import periods
+from .models import (
+    ChartOfAccounts, JournalEntry, JournalLine, FinancialStatement, ExchangeRate, FiscalPeriod, ArchivedJournalLine
+)
 
 
 class ChartOfAccountsSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChartOfAccounts
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'path', 'depth', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
+    
+    def validate(self, attrs):
+        parent = attrs.get('parent', getattr(self.instance, 'parent', None))
+        company = tenant_company(self)
+        if parent is not None:
+            if company is not None and parent.company_id != company.pk:
+                raise serializers.ValidationError({'parent': 'Parent account belongs to a different company'})
+            if self.instance is not None and (
+                parent.pk == self.instance.pk or f"{self.instance.pk.hex}/" in parent.path
+            ):
+                raise serializers.ValidationError({'parent': 'An account cannot be moved under itself or one of its descendants'})
+        return attrs
 
 
 class JournalLineSerializer(serializers.ModelSerializer):
@@ -18,17 +40,99 @@ class JournalLineSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class ArchivedJournalLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedJournalLine
+        fields = '__all__'
+
+
 class JournalEntrySerializer(serializers.ModelSerializer):
     lines = JournalLineSerializer(many=True, read_only=True)
+    archived_lines = ArchivedJournalLineSerializer(many=True, read_only=True)
     
     class Meta:
         model = JournalEntry
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        # Allocated from the company's journal_entry sequence when omitted
+        extra_kwargs = {'company': TENANT_COMPANY, 'entry_number': {'required': False}}
+    
+    def validate(self, attrs):
+        if self.instance is None and attrs.get('status') == 'posted':
+            raise serializers.ValidationError({'status': 'Create the entry as draft and post it once its lines balance'})
+        company = tenant_company(self)
+        dates = [attrs.get('date', getattr(self.instance, 'date', None))]
+        if self.instance is not None:
+            dates.append(self.instance.date)
+        if company is not None:
+            try:
+                periods.check_writable(company.pk, dates)
+            except periods.PeriodClosedError as exc:
+                raise serializers.ValidationError({'date': exc.messages})
+        return attrs
 
 
 class FinancialStatementSerializer(serializers.ModelSerializer):
     class Meta:
         model = FinancialStatement
         fields = '__all__'
-        read_only_fields = ['id', 'generated_at']
+        read_only_fields = ['id', 'company', 'generated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
+
+
+class GenerateStatementSerializer(serializers.Serializer):
+    statement_type = serializers.ChoiceField(choices=FinancialStatement.STATEMENT_TYPES)
+    period_start = serializers.DateField()
+    period_end = serializers.DateField()
+    refresh = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, attrs):
+        if attrs['period_start'] > attrs['period_end']:
+            raise serializers.ValidationError('period_start must be on or before period_end')
+        return attrs
+
+
+class ExchangeRateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExchangeRate
+        fields = '__all__'
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
+    
+    def validate(self, attrs):
+        company = tenant_company(self)
+        currency = (attrs.get('currency') or getattr(self.instance, 'currency', '')).upper()
+        if company is not None and currency == company.currency:
+            raise serializers.ValidationError({'currency': 'Rates are only needed for foreign currencies'})
+        if 'currency' in attrs:
+            attrs['currency'] = currency
+        return attrs
+
+
+class RevaluationSerializer(serializers.Serializer):
+    as_of = serializers.DateField()
+
+
+class FiscalPeriodSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FiscalPeriod
+        fields = '__all__'
+        read_only_fields = ['id', 'company', 'status', 'closed_at', 'closed_by', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
+    
+    def validate(self, attrs):
+        if self.instance is not None and self.instance.status != 'open':
+            raise serializers.ValidationError(f'Fiscal period is {self.instance.status}; reopen it before editing')
+        period = copy.copy(self.instance) if self.instance is not None else FiscalPeriod(company=tenant_company(self))
+        for field, value in attrs.items():
+            setattr(period, field, value)
+        try:
+            period.clean()
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.message_dict if hasattr(exc, 'error_dict') else exc.messages)
+        return attrs
+
+
+class PostEntriesSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=5000)
+    all_or_nothing = serializers.BooleanField(required=False, default=False)
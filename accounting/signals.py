@@ -0,0 +1,179 @@
+"""
+Accounting module signals
+Keeps AccountBalance snapshots in sync with single-object journal entry/line changes
+and invalidates cached financial statements, account trees and exchange rates.
+Journal writes dated inside closed or locked fiscal periods are rejected here.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import balances, fx, periods, posting, statements, tree
+from .models import ChartOfAccounts, ExchangeRate, FiscalPeriod, JournalEntry, JournalLine
+
+
+@receiver(pre_save, sender=JournalEntry)
+def capture_entry_state(sender, instance, raw=False, **kwargs):
+    """Remember the stored status/date so post_save can tell what changed"""
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = (
+        JournalEntry.objects.filter(pk=instance.pk)
+        .values('status', 'date', 'company_id')
+        .first()
+    )
+
+
+@receiver(pre_save, sender=JournalEntry)
+def protect_closed_period_entries(sender, instance, raw=False, **kwargs):
+    """Reject saves that touch a closed period, both at the stored and at the new date"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        periods.check_writable(previous['company_id'], [previous['date']])
+    periods.check_writable(instance.company_id, [instance.date])
+
+
+@receiver(pre_save, sender=JournalEntry)
+def validate_posting(sender, instance, raw=False, **kwargs):
+    """An existing entry only moves to 'posted' when its stored lines pass the posting checks"""
+    previous = getattr(instance, '_previous_state', None)
+    if raw or previous is None or previous['status'] == 'posted' or instance.status != 'posted':
+        return
+    errors = posting.validate_entries(JournalEntry.objects.filter(pk=instance.pk))
+    if errors:
+        raise ValidationError({'status': errors[instance.pk]})
+
+
+@receiver(pre_delete, sender=JournalEntry)
+def protect_closed_period_entry_deletes(sender, instance, **kwargs):
+    periods.check_writable(instance.company_id, [instance.date])
+
+
+@receiver(post_save, sender=JournalEntry)
+def sync_entry_balances(sender, instance, raw=False, **kwargs):
+    """Post or release an entry's lines when it moves into or out of 'posted'"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    was_posted = previous is not None and previous['status'] == 'posted'
+    is_posted = instance.status == 'posted'
+    moved = was_posted and is_posted and (
+        previous['date'] != instance.date or previous['company_id'] != instance.company_id
+    )
+    
+    if was_posted and (not is_posted or moved):
+        balances.apply_entry(instance.pk, previous['company_id'], previous['date'], sign=-1)
+    if is_posted and (not was_posted or moved):
+        balances.apply_entry(instance.pk, instance.company_id, instance.date, sign=1)
+    instance._previous_state = None
+
+
+def _posted_entry(entry_id):
+    return (
+        JournalEntry.objects.filter(pk=entry_id, status='posted')
+        .values('company_id', 'date')
+        .first()
+    )
+
+
+@receiver(pre_save, sender=JournalLine)
+def capture_line_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_state = (
+        JournalLine.objects.filter(pk=instance.pk)
+        .values('journal_entry_id', 'account_id', 'debit', 'credit')
+        .first()
+    )
+
+
+@receiver(pre_save, sender=JournalLine)
+@receiver(pre_delete, sender=JournalLine)
+def protect_closed_period_lines(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    entry_ids = {instance.journal_entry_id}
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        entry_ids.add(previous['journal_entry_id'])
+    for entry in JournalEntry.objects.filter(pk__in=entry_ids).values('company_id', 'date'):
+        periods.check_writable(entry['company_id'], [entry['date']])
+
+
+@receiver(post_save, sender=JournalLine)
+def sync_line_balances(sender, instance, raw=False, **kwargs):
+    """Lines added to or edited on an already posted entry"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    instance._previous_state = None
+    
+    deltas = {}
+    changes = set()
+    if previous is not None:
+        entry = _posted_entry(previous['journal_entry_id'])
+        if entry is not None:
+            key = (entry['company_id'], previous['account_id'], balances.period_start(entry['date']))
+            deltas[key] = [-previous['debit'], -previous['credit']]
+            changes.add((entry['company_id'], entry['date']))
+    
+    entry = _posted_entry(instance.journal_entry_id)
+    if entry is not None:
+        key = (entry['company_id'], instance.account_id, balances.period_start(entry['date']))
+        debit, credit = deltas.get(key, [balances.ZERO, balances.ZERO])
+        deltas[key] = [debit + instance.debit, credit + instance.credit]
+        changes.add((entry['company_id'], entry['date']))
+    
+    if deltas:
+        balances.apply_deltas(deltas, changes=changes)
+
+
+@receiver(pre_delete, sender=JournalLine)
+def release_line_balances(sender, instance, **kwargs):
+    """Lines removed from a posted entry (including cascades from entry deletes)"""
+    entry = _posted_entry(instance.journal_entry_id)
+    if entry is None:
+        return
+    key = (entry['company_id'], instance.account_id, balances.period_start(entry['date']))
+    balances.apply_deltas(
+        {key: (instance.debit, instance.credit)},
+        sign=-1,
+        changes={(entry['company_id'], entry['date'])},
+    )
+
+
+@receiver(balances.balances_changed)
+def invalidate_financial_statements(sender, changes, **kwargs):
+    """Mark cached statements covering the changed dates as stale"""
+    statements.invalidate_statements(changes)
+
+
+@receiver(balances.balances_changed)
+def invalidate_account_trees_on_posting(sender, changes, **kwargs):
+    for company_id in {company_id for company_id, _ in changes}:
+        tree.bump_tree_version(company_id)
+
+
+@receiver(post_save, sender=ChartOfAccounts)
+@receiver(post_delete, sender=ChartOfAccounts)
+def invalidate_account_trees(sender, instance, **kwargs):
+    tree.bump_tree_version(instance.company_id)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def invalidate_exchange_rates(sender, instance, **kwargs):
+    fx.bump_rates_version(instance.company_id)
+
+
+@receiver(post_save, sender=FiscalPeriod)
+@receiver(post_delete, sender=FiscalPeriod)
+def forget_fiscal_periods(sender, instance, **kwargs):
+    periods.forget_periods(instance.company_id)
+    # Drop anything cached by a concurrent reader before this change committed
+    transaction.on_commit(lambda: periods.forget_periods(instance.company_id))
@@ -0,0 +1,317 @@
+"""
+Financial statement engine
+Builds balance sheet, income statement and cash flow data for FinancialStatement.
+
+Generated statements are stored and reused: a request for a period that already has a
+fresh (not stale) statement returns the stored data without touching the ledger.
+Otherwise the engine starts from the closest fresh statement that ends earlier
+(same period_start for flow statements, any balance sheet for the cumulative balance
+sheet) and only aggregates the remaining days. Posting into a covered date marks the
+statement stale through accounting.signals.
+"""
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Q
+from django.utils import timezone
+
+from . import balances
+from .models import ChartOfAccounts, FinancialStatement
+
+ZERO = balances.ZERO
+
+# Tags in ChartOfAccounts.ai_classification_tags that drive the cash flow layout
+CASH_TAG = 'cash'
+INVESTING_TAG = 'investing'
+FINANCING_TAG = 'financing'
+
+# Beyond this many distinct dates invalidation falls back to a single date-range overlap
+MAX_EXACT_INVALIDATION_DATES = 100
+
+
+def _decimal(value):
+    return Decimal(str(value)) if value is not None else ZERO
+
+
+def _account_index(company):
+    """Metadata for every account of the company (one query, no ledger access)"""
+    return {
+        row['id']: row
+        for row in ChartOfAccounts.objects.filter(company=company).values(
+            'id', 'code', 'name', 'account_type', 'ai_classification_tags'
+        )
+    }
+
+
+def _natural_amount(account_type, debit, credit):
+    """Signed amount in the account's natural direction"""
+    if account_type in ('asset', 'expense'):
+        return debit - credit
+    return credit - debit
+
+
+def _has_tag(account, tag):
+    return tag in (account.get('ai_classification_tags') or [])
+
+
+def _line(account, amount):
+    return {
+        'account': str(account['id']),
+        'code': account['code'],
+        'name': account['name'],
+        'amount': str(amount),
+    }
+
+
+def _sorted_lines(items):
+    return [_line(account, amount) for account, amount in sorted(items, key=lambda item: item[0]['code'])]
+
+
+def _balance_sheet_sections(index, movements):
+    sections = defaultdict(list)
+    totals = defaultdict(lambda: ZERO)
+    for account_id, (debit, credit) in movements.items():
+        account = index.get(account_id)
+        if account is None:
+            continue
+        amount = _natural_amount(account['account_type'], debit, credit)
+        totals[account['account_type']] += amount
+        if account['account_type'] in ('asset', 'liability', 'equity') and amount:
+            sections[account['account_type']].append((account, amount))
+
+    current_earnings = totals['income'] - totals['expense']
+    total_equity = totals['equity'] + current_earnings
+    return {
+        'sections': {
+            'assets': _sorted_lines(sections['asset']),
+            'liabilities': _sorted_lines(sections['liability']),
+            'equity': _sorted_lines(sections['equity']),
+        },
+        'totals': {
+            'total_assets': str(totals['asset']),
+            'total_liabilities': str(totals['liability']),
+            'current_earnings': str(current_earnings),
+            'total_equity': str(total_equity),
+            'liabilities_and_equity': str(totals['liability'] + total_equity),
+            'is_balanced': totals['asset'] == totals['liability'] + total_equity,
+        },
+    }
+
+
+def _income_statement_sections(index, movements):
+    sections = defaultdict(list)
+    totals = defaultdict(lambda: ZERO)
+    for account_id, (debit, credit) in movements.items():
+        account = index.get(account_id)
+        if account is None or account['account_type'] not in ('income', 'expense'):
+            continue
+        amount = _natural_amount(account['account_type'], debit, credit)
+        totals[account['account_type']] += amount
+        if amount:
+            sections[account['account_type']].append((account, amount))
+
+    return {
+        'sections': {
+            'income': _sorted_lines(sections['income']),
+            'expenses': _sorted_lines(sections['expense']),
+        },
+        'totals': {
+            'total_income': str(totals['income']),
+            'total_expenses': str(totals['expense']),
+            'net_income': str(totals['income'] - totals['expense']),
+        },
+    }
+
+
+def _cash_flow_sections(index, movements, opening_cash):
+    """
+    Indirect method: net income adjusted by the period movement of every non-cash
+    balance sheet account. Accounts are placed by their classification tags
+    (investing / financing); untagged equity counts as financing, everything else
+    as operating.
+    """
+    sections = defaultdict(list)
+    totals = defaultdict(lambda: ZERO)
+    net_income = ZERO
+    cash_change = ZERO
+    for account_id, (debit, credit) in movements.items():
+        account = index.get(account_id)
+        if account is None:
+            continue
+        account_type = account['account_type']
+        if account_type in ('income', 'expense'):
+            net_income += credit - debit
+            continue
+        if _has_tag(account, CASH_TAG):
+            cash_change += debit - credit
+            continue
+        # A debit to a non-cash balance sheet account uses cash, a credit provides it
+        effect = credit - debit
+        if not effect:
+            continue
+        if _has_tag(account, INVESTING_TAG):
+            activity = 'investing'
+        elif _has_tag(account, FINANCING_TAG) or account_type == 'equity':
+            activity = 'financing'
+        else:
+            activity = 'operating'
+        sections[activity].append((account, effect))
+        totals[activity] += effect
+
+    net_operating = net_income + totals['operating']
+    return {
+        'sections': {
+            'operating': _sorted_lines(sections['operating']),
+            'investing': _sorted_lines(sections['investing']),
+            'financing': _sorted_lines(sections['financing']),
+        },
+        'totals': {
+            'net_income': str(net_income),
+            'net_operating': str(net_operating),
+            'net_investing': str(totals['investing']),
+            'net_financing': str(totals['financing']),
+            'net_change_in_cash': str(cash_change),
+            'opening_cash': str(opening_cash),
+            'closing_cash': str(opening_cash + cash_change),
+        },
+    }
+
+
+def _movements_from_data(data):
+    return {
+        uuid.UUID(account_id): [_decimal(values.get('debit')), _decimal(values.get('credit'))]
+        for account_id, values in (data.get('accounts') or {}).items()
+    }
+
+
+def _merge(movements, extra):
+    merged = {account_id: list(values) for account_id, values in movements.items()}
+    for account_id, values in extra.items():
+        current = merged.setdefault(account_id, [ZERO, ZERO])
+        current[0] += values['debit']
+        current[1] += values['credit']
+    return merged
+
+
+def _find_base(company, statement_type, period_start, period_end):
+    """Closest fresh statement this one can be extended from"""
+    candidates = FinancialStatement.objects.filter(
+        company=company,
+        statement_type=statement_type,
+        is_stale=False,
+        period_end__lt=period_end,
+    )
+    if statement_type != 'balance_sheet':
+        candidates = candidates.filter(period_start=period_start)
+    return candidates.filter(data__has_key='accounts').order_by('-period_end', '-generated_at').first()
+
+
+def build_statement_data(company, statement_type, period_start, period_end, base=None):
+    """
+    Compute statement data, extending base (a fresh FinancialStatement ending before
+    period_end) when given so only the remaining days are aggregated.
+    """
+    index = _account_index(company)
+    if base is not None:
+        movements = _movements_from_data(base.data)
+        delta_from = base.period_end + timedelta(days=1)
+    else:
+        movements = {}
+        delta_from = None if statement_type == 'balance_sheet' else period_start
+
+    delta = balances.get_account_balances(company, date_from=delta_from, date_to=period_end)
+    movements = _merge(movements, delta)
+
+    if statement_type == 'balance_sheet':
+        body = _balance_sheet_sections(index, movements)
+    elif statement_type == 'income_statement':
+        body = _income_statement_sections(index, movements)
+    else:
+        if base is not None:
+            opening_cash = _decimal(base.data.get('totals', {}).get('opening_cash'))
+        else:
+            cash_ids = [account_id for account_id, account in index.items() if _has_tag(account, CASH_TAG)]
+            opening = balances.get_account_balances(
+                company, date_to=period_start - timedelta(days=1), account_ids=cash_ids
+            ) if cash_ids else {}
+            opening_cash = sum((values['balance'] for values in opening.values()), ZERO)
+        body = _cash_flow_sections(index, movements, opening_cash)
+
+    return {
+        'statement_type': statement_type,
+        'currency': company.currency,
+        'period_start': period_start.isoformat(),
+        'period_end': period_end.isoformat(),
+        'extended_from': str(base.id) if base is not None else None,
+        'accounts': {
+            str(account_id): {'debit': str(debit), 'credit': str(credit)}
+            for account_id, (debit, credit) in movements.items()
+        },
+        **body,
+    }
+
+
+def generate_statement(company, statement_type, period_start, period_end, user=None, refresh=False):
+    """
+    Return the FinancialStatement for the period, computing it only when there is no
+    fresh stored copy (or refresh is requested).
+    """
+    if statement_type not in dict(FinancialStatement.STATEMENT_TYPES):
+        raise ValueError(f'Unknown statement type: {statement_type}')
+    if period_start > period_end:
+        raise ValueError('period_start must be on or before period_end')
+
+    statement = (
+        FinancialStatement.objects.filter(
+            company=company,
+            statement_type=statement_type,
+            period_start=period_start,
+            period_end=period_end,
+        )
+        .order_by('-generated_at')
+        .first()
+    )
+    if statement is not None and not statement.is_stale and 'accounts' in statement.data and not refresh:
+        return statement
+
+    base = None if refresh else _find_base(company, statement_type, period_start, period_end)
+    data = build_statement_data(company, statement_type, period_start, period_end, base=base)
+
+    if statement is None:
+        statement = FinancialStatement(
+            company=company,
+            statement_type=statement_type,
+            period_start=period_start,
+            period_end=period_end,
+        )
+    statement.data = data
+    statement.is_stale = False
+    statement.generated_by = user
+    statement.generated_at = timezone.now()
+    statement.save()
+    return statement
+
+
+def invalidate_statements(changes):
+    """
+    Mark stored statements stale for a set of (company_id, date) pairs.
+    Flow statements are hit when the date falls inside their period; balance sheets are
+    cumulative, so any balance sheet ending on or after the date is hit.
+    """
+    dates_by_company = defaultdict(set)
+    for company_id, date in changes:
+        dates_by_company[company_id].add(date)
+
+    for company_id, dates in dates_by_company.items():
+        earliest = min(dates)
+        condition = Q(statement_type='balance_sheet', period_end__gte=earliest)
+        if len(dates) > MAX_EXACT_INVALIDATION_DATES:
+            flows = Q(period_start__lte=max(dates), period_end__gte=earliest)
+        else:
+            flows = Q()
+            for date in dates:
+                flows |= Q(period_start__lte=date, period_end__gte=date)
+        condition |= Q(flows, ~Q(statement_type='balance_sheet'))
+        FinancialStatement.objects.filter(condition, company_id=company_id, is_stale=False).update(is_stale=True)
@@ -0,0 +1,33 @@
+"""
+Accounting background tasks
+"""
+from datetime import date, timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from core.models import Company
+
+from . import fx, posting
+
+
+@shared_task
+def post_source_documents(company_id=None, source_types=None, batch_size=posting.DEFAULT_BATCH_SIZE, retry_skipped=False):
+    """Generate ledger entries for sales, purchases and payments that have none yet"""
+    company = Company.objects.get(pk=company_id) if company_id else None
+    return posting.post_pending(
+        company=company, source_types=source_types, batch_size=batch_size, retry_skipped=retry_skipped
+    )
+
+
+@shared_task
+def revalue_currencies(as_of=None):
+    """
+    Month-end FX revaluation for every active company.
+    as_of is an ISO date; defaults to the last day of the previous month.
+    """
+    if as_of:
+        as_of = date.fromisoformat(as_of)
+    else:
+        as_of = timezone.localdate().replace(day=1) - timedelta(days=1)
+    return fx.revalue(Company.objects.filter(is_active=True), as_of)
@@ -0,0 +1,145 @@
+"""
+Accounting tests: batch posting validation and tenant-bound writes
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from core.authentication import issue_tokens
+from core.models import Company, CompanyUser, Role, User
+from core.rbac import FULL_ACCESS
+
+from . import periods, posting
+from .models import ChartOfAccounts, ExchangeRate, FiscalPeriod, JournalEntry, JournalLine
+
+
+def make_entry(company, number, lines, entry_date=date(2026, 1, 15)):
+    """A draft entry with lines [(account, debit, credit)]"""
+    entry = JournalEntry.objects.create(company=company, entry_number=number, date=entry_date, description=number)
+    JournalLine.objects.bulk_create([
+        JournalLine(journal_entry=entry, account=account, debit=Decimal(debit), credit=Decimal(credit))
+        for account, debit, credit in lines
+    ])
+    return entry
+
+
+class PostEntriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Posting Co')
+        cls.cash = ChartOfAccounts.objects.create(company=cls.company, code='1', name='Cash', account_type='asset')
+        cls.revenue = ChartOfAccounts.objects.create(company=cls.company, code='4', name='Revenue', account_type='income')
+        cls.other = Company.objects.create(name='Other Co')
+        cls.other_cash = ChartOfAccounts.objects.create(company=cls.other, code='1', name='Cash', account_type='asset')
+
+    def tearDown(self):
+        periods.forget_periods(self.company.pk)
+
+    def test_posts_balanced_entries(self):
+        entry = make_entry(self.company, 'P-1', [(self.cash, '10.00', '0'), (self.revenue, '0', '10.00')])
+        result = posting.post_entries([entry.pk])
+        self.assertEqual(result, {'posted': [entry.pk], 'errors': {}})
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'posted')
+
+    def test_rejects_unbalanced_entry(self):
+        entry = make_entry(self.company, 'P-2', [(self.cash, '10.00', '0'), (self.revenue, '0', '9.99')])
+        result = posting.post_entries([entry.pk])
+        self.assertEqual(result['posted'], [])
+        self.assertIn('Entry is unbalanced: debits 10.00 != credits 9.99', result['errors'][entry.pk])
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'draft')
+
+    def test_rejects_entry_in_closed_period(self):
+        # A draft left behind when its period was closed
+        entry = make_entry(self.company, 'P-3', [(self.cash, '5.00', '0'), (self.revenue, '0', '5.00')])
+        FiscalPeriod.objects.create(
+            company=self.company, name='2026-01', start_date=date(2026, 1, 1), end_date=date(2026, 1, 31), status='closed'
+        )
+        periods.forget_periods(self.company.pk)
+        result = posting.post_entries([entry.pk])
+        self.assertEqual(result['posted'], [])
+        self.assertEqual(result['errors'][entry.pk], ['2026-01-15 falls in closed fiscal period 2026-01'])
+        with self.assertRaises(periods.PeriodClosedError):
+            make_entry(self.company, 'P-3b', [(self.cash, '5.00', '0'), (self.revenue, '0', '5.00')])
+
+    def test_rejects_inactive_and_foreign_accounts(self):
+        inactive = ChartOfAccounts.objects.create(
+            company=self.company, code='9', name='Old', account_type='asset', is_active=False
+        )
+        entries = [
+            make_entry(self.company, 'P-4', [(inactive, '1.00', '0'), (self.revenue, '0', '1.00')]),
+            make_entry(self.company, 'P-5', [(self.other_cash, '1.00', '0'), (self.revenue, '0', '1.00')]),
+        ]
+        errors = posting.post_entries([entry.pk for entry in entries])['errors']
+        self.assertEqual(errors[entries[0].pk], ['Entry uses inactive accounts'])
+        self.assertEqual(errors[entries[1].pk], ['Entry uses accounts of another company'])
+
+    def test_all_or_nothing_posts_nothing_on_error(self):
+        good = make_entry(self.company, 'P-6', [(self.cash, '1.00', '0'), (self.revenue, '0', '1.00')])
+        bad = make_entry(self.company, 'P-7', [(self.cash, '1.00', '0')])
+        result = posting.post_entries([good.pk, bad.pk], all_or_nothing=True)
+        self.assertEqual(result['posted'], [])
+        self.assertEqual(list(result['errors']), [bad.pk])
+        good.refresh_from_db()
+        self.assertEqual(good.status, 'draft')
+
+    def test_other_company_entries_are_not_found(self):
+        entry = make_entry(self.other, 'P-8', [(self.other_cash, '1.00', '0'), (self.other_cash, '0', '1.00')])
+        result = posting.post_entries([entry.pk], company=self.company)
+        self.assertEqual(result['errors'], {entry.pk: ['Entry not found']})
+
+
+class TenantWriteTests(APITestCase):
+    """Writes land in the active company whatever company the body names"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Tenant A')
+        cls.other = Company.objects.create(name='Tenant B')
+        cls.user = User.objects.create_user(email='owner@tenant-a.test', password='secret')
+        owner, _ = Role.objects.get_or_create(
+            name='Company Owner', defaults={'is_system_role': True, 'permissions': FULL_ACCESS}
+        )
+        CompanyUser.objects.create(company=cls.company, user=cls.user, role=owner)
+
+    def setUp(self):
+        token = issue_tokens(self.user, self.company.pk)[0].access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def post(self, path, data):
+        return self.client.post(f'/api/v1/accounting/{path}/', data, format='json', HTTP_HOST='localhost')
+
+    def test_account_is_created_in_active_company(self):
+        response = self.post('accounts', {'company': str(self.other.pk), 'code': '1', 'name': 'Cash', 'account_type': 'asset'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ChartOfAccounts.objects.filter(company=self.company, code='1').exists())
+        self.assertFalse(ChartOfAccounts.objects.filter(company=self.other).exists())
+
+    def test_duplicate_account_code_is_rejected(self):
+        ChartOfAccounts.objects.create(company=self.company, code='1', name='Cash', account_type='asset')
+        response = self.post('accounts', {'code': '1', 'name': 'Cash again', 'account_type': 'asset'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_exchange_rate_is_created_in_active_company(self):
+        response = self.post('exchange-rates', {
+            'company': str(self.other.pk), 'currency': 'EUR', 'date': '2026-01-15', 'rate': '1.1',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ExchangeRate.objects.get().company_id, self.company.pk)
+
+    def test_fiscal_period_is_created_in_active_company(self):
+        response = self.post('fiscal-periods', {
+            'company': str(self.other.pk), 'name': '2026-01', 'start_date': '2026-01-01', 'end_date': '2026-01-31',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FiscalPeriod.objects.get().company_id, self.company.pk)
+
+    def test_journal_entry_is_created_in_active_company(self):
+        response = self.post('journal-entries', {
+            'company': str(self.other.pk), 'date': '2026-01-15', 'description': 'Opening',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(JournalEntry.objects.get().company_id, self.company.pk)
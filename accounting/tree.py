@@ -0,0 +1,142 @@
+"""
+Chart of accounts tree
+Builds the account hierarchy (or one subtree) with balances rolled up from every
+descendant, using the materialized path instead of recursive parent lookups.
+
+Built trees are cached per company under a version token; the token is replaced
+whenever an account is saved/deleted or posted balances change (accounting.signals),
+so stale trees are never served and no explicit key cleanup is needed.
+"""
+import uuid
+
+from django.core.cache import cache
+
+from . import balances
+from .models import ChartOfAccounts
+
+ZERO = balances.ZERO
+
+TREE_CACHE_TIMEOUT = 3600
+
+
+def _version_key(company_id):
+    return f"coa_tree_version_{company_id}"
+
+
+def tree_version(company_id):
+    try:
+        version = cache.get(_version_key(company_id))
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(_version_key(company_id), version, None)
+    except Exception:
+        version = None
+    return version
+
+
+def bump_tree_version(company_id):
+    try:
+        cache.set(_version_key(company_id), uuid.uuid4().hex, None)
+    except Exception:
+        pass
+
+
+def resolve_root(company, root):
+    """Find the subtree root by id or by account code; None if not found"""
+    accounts = ChartOfAccounts.objects.filter(company=company)
+    try:
+        return accounts.get(pk=uuid.UUID(str(root)))
+    except (ValueError, ChartOfAccounts.DoesNotExist):
+        return accounts.filter(code=root).first()
+
+
+def build_tree(company, root=None, date_from=None, date_to=None):
+    """
+    Nested list of accounts with their own and rolled-up posted balances.
+    Two queries whatever the size of the tree: the accounts and their balances.
+    """
+    accounts = ChartOfAccounts.objects.filter(company=company)
+    if root is not None:
+        accounts = accounts.filter(path__startswith=root.path)
+    rows = list(accounts.values('id', 'code', 'name', 'account_type', 'is_active', 'path', 'depth', 'parent_id'))
+
+    account_ids = accounts.values('id') if root is not None else None
+    totals = balances.get_account_balances(company, date_from=date_from, date_to=date_to, account_ids=account_ids)
+
+    nodes = {}
+    for row in rows:
+        own = totals.get(row['id'], {'debit': ZERO, 'credit': ZERO})
+        nodes[row['id'].hex] = {
+            'id': str(row['id']),
+            'code': row['code'],
+            'name': row['name'],
+            'account_type': row['account_type'],
+            'is_active': row['is_active'],
+            'depth': row['depth'],
+            'debit': own['debit'],
+            'credit': own['credit'],
+            'total_debit': ZERO,
+            'total_credit': ZERO,
+            'children': [],
+            '_path': row['path'],
+            '_parent': row['parent_id'].hex if row['parent_id'] else None,
+        }
+
+    # Roll each account's own amounts up into itself and every ancestor in its path
+    for node in nodes.values():
+        for segment in node['_path'].rstrip('/').split('/'):
+            ancestor = nodes.get(segment)
+            if ancestor is not None:
+                ancestor['total_debit'] += node['debit']
+                ancestor['total_credit'] += node['credit']
+
+    roots = []
+    root_key = root.id.hex if root is not None else None
+    for key, node in nodes.items():
+        parent = nodes.get(node['_parent'])
+        if key == root_key or parent is None:
+            roots.append(node)
+        else:
+            parent['children'].append(node)
+
+    def finish(node):
+        node.pop('_path')
+        node.pop('_parent')
+        node['balance'] = node['debit'] - node['credit']
+        node['total_balance'] = node['total_debit'] - node['total_credit']
+        for key in ('debit', 'credit', 'balance', 'total_debit', 'total_credit', 'total_balance'):
+            node[key] = str(node[key])
+        node['children'].sort(key=lambda child: child['code'])
+        for child in node['children']:
+            finish(child)
+
+    roots.sort(key=lambda node: node['code'])
+    for node in roots:
+        finish(node)
+    return roots
+
+
+def get_tree(company, root=None, date_from=None, date_to=None):
+    """build_tree() behind the per-company versioned cache"""
+    version = tree_version(company.pk)
+    if version is None:
+        return build_tree(company, root, date_from, date_to)
+
+    cache_key = 'coa_tree_{}_{}_{}_{}_{}'.format(
+        company.pk,
+        version,
+        root.pk if root is not None else 'all',
+        date_from.isoformat() if date_from else '',
+        date_to.isoformat() if date_to else '',
+    )
+    try:
+        tree = cache.get(cache_key)
+    except Exception:
+        tree = None
+    if tree is None:
+        tree = build_tree(company, root, date_from, date_to)
+        try:
+            cache.set(cache_key, tree, TREE_CACHE_TIMEOUT)
+        except Exception:
+            pass
+    return tree
@@ -9,5 +9,8 @@ router = SimpleRouter()
 router.register(r'accounts', views.ChartOfAccountsViewSet, basename='account')
 router.register(r'journal-entries', views.JournalEntryViewSet, basename='journal-entry')
 router.register(r'financial-statements', views.FinancialStatementViewSet, basename='financial-statement')
+router.register(r'exchange-rates', views.ExchangeRateViewSet, basename='exchange-rate')
+router.register(r'fiscal-periods', views.FiscalPeriodViewSet, basename='fiscal-period')
+router.register(r'reports', views.ReportViewSet, basename='report')
 
 urlpatterns = router.urls
@@ -1,36 +1,398 @@
 """
 Accounting module views
 """
-from rest_framework import viewsets, permissions
-from .models import ChartOfAccounts, JournalEntry, FinancialStatement
-from .serializers import ChartOfAccountsSerializer, JournalEntrySerializer, FinancialStatementSerializer
+import uuid
 
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from core import sequences
+from core.models import Branch
+from core.audit import AuditMixin
+from core.pagination import KeysetPagination
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
+from . import balances, fx, importer, periods, posting, reports, statements, tree
+from .models import ChartOfAccounts, JournalEntry, FinancialStatement, ExchangeRate, FiscalPeriod
+from .serializers import (
+    ChartOfAccountsSerializer, JournalEntrySerializer, FinancialStatementSerializer,
+    GenerateStatementSerializer, ExchangeRateSerializer, RevaluationSerializer, FiscalPeriodSerializer,
+    PostEntriesSerializer
+)
 
-class ChartOfAccountsViewSet(viewsets.ModelViewSet):
+
+# Error rows returned inline by the import endpoint; the management command reports all of them
+IMPORT_MAX_ERRORS = 1000
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def parse_date_param(request, name):
+    """Read an optional YYYY-MM-DD query parameter"""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Use YYYY-MM-DD format'})
+    return parsed
+
+
+class ChartOfAccountsViewSet(TenantModelViewSet):
+    model = ChartOfAccounts
     serializer_class = ChartOfAccountsSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return ChartOfAccounts.objects.filter(company=self.request.tenant)
-        return ChartOfAccounts.objects.none()
+    @action(detail=False, methods=['get'])
+    def balances(self, request):
+        """
+        Posted debit/credit totals per account, read from the account balance snapshots
+        Optional filters: date_from, date_to (YYYY-MM-DD)
+        """
+        date_from = parse_date_param(request, 'date_from')
+        date_to = parse_date_param(request, 'date_to')
+        accounts = self.get_queryset().values('id', 'code', 'name', 'account_type').order_by('code')
+        totals = {}
+        if getattr(request, 'tenant', None):
+            totals = balances.get_account_balances(request.tenant, date_from=date_from, date_to=date_to)
+        
+        data = []
+        for account in accounts:
+            total = totals.get(account['id'])
+            if total is None:
+                continue
+            data.append({
+                'account': str(account['id']),
+                'code': account['code'],
+                'name': account['name'],
+                'account_type': account['account_type'],
+                'debit': total['debit'],
+                'credit': total['credit'],
+                'balance': total['balance'],
+            })
+        return Response({
+            'success': True,
+            'data': data
+        })
+    
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Account hierarchy with balances rolled up from all descendants
+        Optional filters: root (account id or code), date_from, date_to (YYYY-MM-DD)
+        """
+        date_from = parse_date_param(request, 'date_from')
+        date_to = parse_date_param(request, 'date_to')
+        if not getattr(request, 'tenant', None):
+            return Response({'success': True, 'data': []})
+        
+        root = None
+        if request.query_params.get('root'):
+            root = tree.resolve_root(request.tenant, request.query_params['root'])
+            if root is None:
+                raise NotFound('Root account not found')
+        return Response({
+            'success': True,
+            'data': tree.get_tree(request.tenant, root=root, date_from=date_from, date_to=date_to)
+        })
 
 
-class JournalEntryViewSet(viewsets.ModelViewSet):
+class JournalEntryViewSet(TenantModelViewSet):
+    model = JournalEntry
     serializer_class = JournalEntrySerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    rbac_actions = {'post_entry': 'post', 'post_batch': 'post', 'import_entries': 'import'}
+    audit_actions = {'post_entry': 'update', 'post_batch': 'update', 'import_entries': 'import'}
+    pagination_class = KeysetPagination
+    query_plans = {'default': {'prefetch_related': ['lines', 'archived_lines']}}
     
     def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return JournalEntry.objects.filter(company=self.request.tenant)
-        return JournalEntry.objects.none()
+        queryset = super().get_queryset()
+        # Entries of closed fiscal periods are listed only on request (?include_archived=true)
+        if self.action == 'list' and self.request.query_params.get('include_archived') != 'true':
+            queryset = queryset.filter(is_archived=False)
+        return queryset
+    
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        with transaction.atomic():
+            entry_number = data.get('entry_number') or sequences.next_number(
+                self.request.tenant, 'journal_entry', branch=data.get('branch'), date=data.get('date')
+            )
+            serializer.save(company=self.request.tenant, entry_number=entry_number)
+    
+    @action(detail=True, methods=['post'], url_path='post')
+    def post_entry(self, request, pk=None):
+        """Validate and post one draft entry"""
+        entry = self.get_object()
+        result = posting.post_entries([entry.pk], user=request.user, company=entry.company)
+        if result['errors']:
+            return Response({
+                'success': False,
+                'error': {'message': result['errors'][entry.pk][0], 'details': {'errors': result['errors'][entry.pk]}}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        entry.refresh_from_db()
+        return Response({'success': True, 'data': JournalEntrySerializer(entry).data})
+    
+    @action(detail=False, methods=['post'], url_path='post', serializer_class=PostEntriesSerializer)
+    def post_batch(self, request):
+        """
+        Validate and post many draft entries at once
+        Body: ids (list), all_or_nothing (optional). Entries that fail are listed with their errors.
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        params = PostEntriesSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        result = posting.post_entries(
+            params.validated_data['ids'],
+            user=request.user,
+            all_or_nothing=params.validated_data['all_or_nothing'],
+            company=request.tenant,
+        )
+        return Response({
+            'success': not result['errors'],
+            'data': {
+                'posted': [str(entry_id) for entry_id in result['posted']],
+                'errors': {str(entry_id): messages for entry_id, messages in result['errors'].items()},
+            }
+        })
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_entries(self, request):
+        """
+        Bulk import journal entries
+        Upload a csv/ndjson/json `file`, or post {"entries": [...]} with nested lines.
+        Invalid entries are skipped and listed in the per-row error report.
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                file_format = request.data.get('format') or importer.detect_format(upload.name)
+                if file_format not in importer.READERS:
+                    raise ValueError(f"Unsupported import format '{file_format}'")
+                result = importer.import_stream(
+                    request.tenant, upload, file_format, user=request.user, max_errors=IMPORT_MAX_ERRORS
+                )
+            elif isinstance(request.data.get('entries'), list):
+                result = importer.JournalImporter(
+                    request.tenant, user=request.user, max_errors=IMPORT_MAX_ERRORS
+                ).run(importer.read_entries(request.data['entries']))
+            else:
+                raise ValueError('Upload a file or send an "entries" list')
+        except (ValueError, UnicodeDecodeError) as exc:
+            return Response({
+                'success': False,
+                'error': {'message': str(exc)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': not result.entries_failed and result.read_error is None,
+            'data': result.as_dict()
+        }, status=status.HTTP_200_OK)
 
 
-class FinancialStatementViewSet(viewsets.ModelViewSet):
+class FinancialStatementViewSet(TenantModelViewSet):
+    model = FinancialStatement
     serializer_class = FinancialStatementSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return FinancialStatement.objects.filter(company=self.request.tenant)
-        return FinancialStatement.objects.none()
+    @action(detail=False, methods=['post'], serializer_class=GenerateStatementSerializer)
+    def generate(self, request):
+        """
+        Build (or return the cached) statement for a period
+        Body: statement_type, period_start, period_end, refresh (optional)
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        params = GenerateStatementSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        statement = statements.generate_statement(
+            request.tenant,
+            params.validated_data['statement_type'],
+            params.validated_data['period_start'],
+            params.validated_data['period_end'],
+            user=request.user,
+            refresh=params.validated_data['refresh'],
+        )
+        return Response({
+            'success': True,
+            'data': FinancialStatementSerializer(statement).data
+        })
+
+
+class ExchangeRateViewSet(TenantModelViewSet):
+    model = ExchangeRate
+    serializer_class = ExchangeRateSerializer
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    audit_actions = {'revalue': 'create'}
+    
+    @action(detail=False, methods=['post'], serializer_class=RevaluationSerializer)
+    def revalue(self, request):
+        """
+        Post the unrealized FX gain/loss on the foreign balances of the receivable, payable and cash accounts
+        Body: as_of (period end date). The adjusting entry is reversed on the next day.
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        params = RevaluationSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        result = fx.revalue([request.tenant], params.validated_data['as_of'], user=request.user)[str(request.tenant.pk)]
+        if 'message' in result:
+            return Response({
+                'success': False,
+                'error': {'message': result['message']}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True, 'data': result})
+
+
+class FiscalPeriodViewSet(TenantModelViewSet):
+    model = FiscalPeriod
+    serializer_class = FiscalPeriodSerializer
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    
+    def perform_destroy(self, instance):
+        if instance.status != 'open':
+            raise ValidationError(f'Fiscal period is {instance.status}; reopen it before deleting')
+        instance.delete()
+    
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        """Close the period: reject further writes and archive its journal lines"""
+        moved = periods.close_period(self.get_object(), user=request.user)
+        return Response({
+            'success': True,
+            'data': {'period': FiscalPeriodSerializer(self.get_object()).data, 'lines_archived': moved}
+        })
+    
+    @action(detail=True, methods=['post'])
+    def lock(self, request, pk=None):
+        """Lock the period for good (closing it first if needed)"""
+        periods.lock_period(self.get_object(), user=request.user)
+        return Response({'success': True, 'data': FiscalPeriodSerializer(self.get_object()).data})
+    
+    @action(detail=True, methods=['post'])
+    def reopen(self, request, pk=None):
+        """Reopen the latest closed period and restore its journal lines"""
+        moved = periods.reopen_period(self.get_object())
+        return Response({
+            'success': True,
+            'data': {'period': FiscalPeriodSerializer(self.get_object()).data, 'lines_restored': moved}
+        })
+
+
+class ReportViewSet(AuditMixin, viewsets.ViewSet):
+    """
+    Ledger reports for the active company
+    Common filters: date_from, date_to (YYYY-MM-DD), branch (id), status (posted by default, or all)
+    """
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    audit_actions = {'trial_balance': 'view', 'general_ledger': 'export'}
+    audit_entity_type = 'LedgerReport'
+    
+    def _filters(self, request):
+        status_filter = request.query_params.get('status') or 'posted'
+        if not reports.is_valid_status(status_filter):
+            raise ValidationError({'status': f"Unknown status '{status_filter}'"})
+        branch = None
+        branch_id = request.query_params.get('branch')
+        if branch_id:
+            if _is_uuid(branch_id):
+                branch = Branch.objects.filter(company=request.tenant, pk=branch_id).first()
+            if branch is None:
+                raise NotFound('Branch not found')
+        return {
+            'date_from': parse_date_param(request, 'date_from'),
+            'date_to': parse_date_param(request, 'date_to'),
+            'branch': branch,
+            'status': status_filter,
+        }
+    
+    @action(detail=False, methods=['get'], url_path='trial-balance')
+    def trial_balance(self, request):
+        """Opening, period and closing debit/credit per account"""
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            data = reports.trial_balance(
+                request.tenant, currency=request.query_params.get('currency'), **self._filters(request)
+            )
+        except fx.MissingRateError as exc:
+            return Response({
+                'success': False,
+                'error': {'message': str(exc)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True, 'data': data})
+    
+    @action(detail=False, methods=['get'], url_path='general-ledger')
+    def general_ledger(self, request):
+        """
+        Every journal line with a running balance per account, streamed
+        Extra parameters: output (csv or ndjson, default csv), account (id, repeatable),
+        currency (translate each line at the rate of its date)
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        output = request.query_params.get('output') or 'csv'
+        if output not in reports.STREAM_FORMATS:
+            raise ValidationError({'output': 'Use csv or ndjson'})
+        account_ids = request.query_params.getlist('account') or None
+        if account_ids and not all(_is_uuid(account_id) for account_id in account_ids):
+            raise ValidationError({'account': 'Use account ids'})
+        
+        filters = self._filters(request)
+        currency = request.query_params.get('currency')
+        try:
+            rates = reports.conversion_table(request.tenant, currency, account_ids=account_ids, **filters)
+        except fx.MissingRateError as exc:
+            return Response({
+                'success': False,
+                'error': {'message': str(exc)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = reports.general_ledger(
+            request.tenant, account_ids=account_ids, currency=currency, rates=rates, **filters
+        )
+        writer, content_type = reports.STREAM_FORMATS[output]
+        response = StreamingHttpResponse(writer(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="general-ledger.{output}"'
+        return response
@@ -2,6 +2,9 @@
 AI Engine module serializers
 """
 from rest_framework import serializers
+
+from core.serializers import TENANT_COMPANY
+
 from .models import AIModel, AIPrediction, AIRecommendation
 
 
@@ -16,11 +19,13 @@ class AIPredictionSerializer(serializers.ModelSerializer):
     class Meta:
         model = AIPrediction
         fields = '__all__'
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'company', 'created_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class AIRecommendationSerializer(serializers.ModelSerializer):
     class Meta:
         model = AIRecommendation
         fields = '__all__'
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'company', 'created_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
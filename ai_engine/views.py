@@ -2,31 +2,26 @@
 AI Engine module views
 """
 from rest_framework import viewsets, permissions
+from core.audit import AuditMixin
+from core.permissions import HasModulePermission
+from core.viewsets import SparseFieldsMixin, TenantModelViewSet
 from .models import AIModel, AIPrediction, AIRecommendation
 from .serializers import AIModelSerializer, AIPredictionSerializer, AIRecommendationSerializer
 
 
-class AIModelViewSet(viewsets.ModelViewSet):
+class AIModelViewSet(SparseFieldsMixin, AuditMixin, viewsets.ModelViewSet):
     serializer_class = AIModelSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     queryset = AIModel.objects.all()
 
 
-class AIPredictionViewSet(viewsets.ModelViewSet):
+class AIPredictionViewSet(TenantModelViewSet):
+    model = AIPrediction
     serializer_class = AIPredictionSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return AIPrediction.objects.filter(company=self.request.tenant)
-        return AIPrediction.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class AIRecommendationViewSet(viewsets.ModelViewSet):
+class AIRecommendationViewSet(TenantModelViewSet):
+    model = AIRecommendation
     serializer_class = AIRecommendationSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return AIRecommendation.objects.filter(company=self.request.tenant)
-        return AIRecommendation.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
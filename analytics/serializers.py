@@ -2,6 +2,9 @@
 Analytics module serializers
 """
 from rest_framework import serializers
+
+from core.serializers import TENANT_COMPANY
+
 from .models import Dashboard, KPI
 
 
@@ -9,11 +12,13 @@ class DashboardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dashboard
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class KPISerializer(serializers.ModelSerializer):
     class Meta:
         model = KPI
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
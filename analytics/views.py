@@ -1,26 +1,20 @@
 """
 Analytics module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import Dashboard, KPI
 from .serializers import DashboardSerializer, KPISerializer
 
 
-class DashboardViewSet(viewsets.ModelViewSet):
+class DashboardViewSet(TenantModelViewSet):
+    model = Dashboard
     serializer_class = DashboardSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Dashboard.objects.filter(company=self.request.tenant)
-        return Dashboard.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class KPIViewSet(viewsets.ModelViewSet):
+class KPIViewSet(TenantModelViewSet):
+    model = KPI
     serializer_class = KPISerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return KPI.objects.filter(company=self.request.tenant)
-        return KPI.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
@@ -4,6 +4,8 @@ Custom exception handlers for API
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 import logging
 import uuid
@@ -15,6 +17,10 @@ def custom_exception_handler(exc, context):
     """
     Custom exception handler that returns consistent error format
     """
+    # Model-level validation (e.g. writes into a closed fiscal period) is a client error
+    if isinstance(exc, DjangoValidationError):
+        exc = ValidationError(exc.message_dict if hasattr(exc, 'error_dict') else {'non_field_errors': exc.messages})
+    
     # Call REST framework's default exception handler first
     response = exception_handler(exc, context)
     
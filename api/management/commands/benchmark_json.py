@@ -0,0 +1,109 @@
+"""
+Compare DRF's JSON renderer/parser with the configured fast ones on generated API payloads
+"""
+import time
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+
+def _invoice_page(rows):
+    """An invoice list page as serializers produce it (Decimals already strings)"""
+    results = []
+    for index in range(rows):
+        results.append({
+            'id': str(uuid.uuid4()),
+            'invoice_number': f'INV-{index:06d}',
+            'customer': str(uuid.uuid4()),
+            'date': '2026-01-15',
+            'due_date': '2026-02-14',
+            'status': 'sent',
+            'currency': 'USD',
+            'subtotal': f'{index * 7 % 9000 + 100}.00',
+            'tax_amount': f'{index % 90}.50',
+            'total': f'{index * 7 % 9000 + 190}.50',
+            'items': [
+                {
+                    'id': str(uuid.uuid4()),
+                    'description': f'Line {line} of invoice {index}',
+                    'quantity': '2.00',
+                    'unit_price': f'{line * 13 + 5}.25',
+                    'total': f'{(line * 13 + 5) * 2}.50',
+                }
+                for line in range(4)
+            ],
+            'created_at': '2026-01-15T09:30:00.000000Z',
+        })
+    return {'count': rows, 'next': None, 'previous': None, 'results': results}
+
+
+def _report(rows):
+    """Report rows with raw Decimal, UUID and datetime values"""
+    now = datetime.now(timezone.utc)
+    return {
+        'success': True,
+        'data': [
+            {
+                'account_id': uuid.uuid4(),
+                'code': f'{1000 + index}',
+                'debit': Decimal(index * 37 % 100000) / 100,
+                'credit': Decimal(index * 53 % 100000) / 100,
+                'balance': Decimal(index * 16 % 100000) / 100,
+                'as_of': date(2026, 1, 31),
+                'generated_at': now,
+            }
+            for index in range(rows)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering and parsing: DRF JSONRenderer/JSONParser vs FastJSONRenderer/FastJSONParser'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per payload')
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed: the fast classes fall back to DRF'))
+        rows, iterations = options['rows'], options['iterations']
+        payloads = {'invoice list': _invoice_page(rows), 'report': _report(rows)}
+        stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        stock_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        for name, payload in payloads.items():
+            body = stock_renderer.render(payload)
+            self.stdout.write(f'{name}: {rows} rows, {len(body) / 1024:,.0f} KiB')
+            render = self._compare(
+                lambda: stock_renderer.render(payload), lambda: fast_renderer.render(payload), iterations
+            )
+            parse = self._compare(
+                lambda: stock_parser.parse(BytesIO(body)), lambda: fast_parser.parse(BytesIO(body)), iterations
+            )
+            self.stdout.write(f'  render: {render}')
+            self.stdout.write(f'  parse:  {parse}')
+        self.stdout.write(self.style.SUCCESS(f'Done ({iterations} iterations per measurement)'))
+
+    def _compare(self, stock, fast, iterations):
+        stock_elapsed, fast_elapsed = self._time(stock, iterations), self._time(fast, iterations)
+        return (
+            f'DRF {iterations / stock_elapsed:,.0f} ops/s, fast {iterations / fast_elapsed:,.0f} ops/s '
+            f'({stock_elapsed / fast_elapsed:.1f}x)'
+        )
+
+    def _time(self, call, iterations):
+        call()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        return time.perf_counter() - started
@@ -0,0 +1,100 @@
+"""
+Fast JSON rendering
+FastJSONRenderer renders responses with orjson when it is installed and with DRF's
+JSONRenderer otherwise, producing the same JSON: UUIDs as strings, dates and times
+through DRF's encoder, U+2028/U+2029 escaped, indented (2 spaces) when the
+Accept header asks for it.
+
+Decimals that reach the renderer unserialized (report rows, balances) are written
+according to settings.API_JSON_DECIMAL:
+- 'string' (default): "1234.50", exact and what DRF serializers produce already;
+- 'number': 1234.50 as an exact JSON number, never rounded through float.
+"""
+import decimal
+import re
+import secrets
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency; DRF's stdlib renderer is used instead
+    orjson = None
+
+DECIMAL_STRING = 'string'
+DECIMAL_NUMBER = 'number'
+
+# Decimals in 'number' mode are written as marked strings and unquoted afterwards; the
+# per-process token keeps user text from ever matching the marker
+_TOKEN = secrets.token_hex(8)
+_MARK = f'\ue000{_TOKEN}:'
+# Raw UTF-8, or \u-escaped when UNICODE_JSON is off
+_MARKED = re.compile(rb'"(?:\xee\x80\x80|\\ue000)' + _TOKEN.encode() + rb':(-?[0-9.]+(?:E[+-]?[0-9]+)?)"')
+
+
+def decimal_mode():
+    mode = getattr(settings, 'API_JSON_DECIMAL', DECIMAL_STRING)
+    return mode if mode in (DECIMAL_STRING, DECIMAL_NUMBER) else DECIMAL_STRING
+
+
+class _DecimalJSONEncoder(JSONEncoder):
+    """DRF's encoder, but Decimals are exact strings instead of floats"""
+
+    def default(self, obj):
+        if isinstance(obj, decimal.Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    encoder_class = _DecimalJSONEncoder
+
+    def _default(self, as_number):
+        fallback = self.encoder_class()
+
+        def default(obj):
+            if isinstance(obj, decimal.Decimal):
+                return _MARK + str(obj) if as_number and obj.is_finite() else str(obj)
+            return fallback.default(obj)
+        return default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None:
+            return self._render_stdlib(data, accepted_media_type, renderer_context)
+
+        as_number = decimal_mode() == DECIMAL_NUMBER
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        try:
+            rendered = orjson.dumps(data, default=self._default(as_number), option=options)
+        except orjson.JSONEncodeError:
+            # Values orjson cannot take (e.g. integers beyond 64 bits) go through the stdlib
+            return self._render_stdlib(data, accepted_media_type, renderer_context)
+
+        if as_number:
+            rendered = _MARKED.sub(rb'\1', rendered)
+        # As DRF does, so the output can be embedded in JavaScript
+        if b'\xe2\x80\xa8' in rendered or b'\xe2\x80\xa9' in rendered:
+            rendered = rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return rendered
+
+    def _render_stdlib(self, data, accepted_media_type, renderer_context):
+        if decimal_mode() == DECIMAL_NUMBER:
+            data = _mark_decimals(data)
+            return _MARKED.sub(rb'\1', super().render(data, accepted_media_type, renderer_context))
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def _mark_decimals(value):
+    if isinstance(value, decimal.Decimal):
+        return _MARK + str(value) if value.is_finite() else str(value)
+    if isinstance(value, dict):
+        return {key: _mark_decimals(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_mark_decimals(item) for item in value]
+    return value
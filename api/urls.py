@@ -2,7 +2,6 @@
 API URL Configuration
 """
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import auth_views
 
 urlpatterns = [
@@ -11,7 +10,8 @@ urlpatterns = [
     path('auth/register/', auth_views.RegisterView.as_view(), name='register'),
     path('auth/verify-email/', auth_views.VerifyEmailOTPView.as_view(), name='verify-email'),
     path('auth/resend-otp/', auth_views.ResendOTPView.as_view(), name='resend-otp'),
-    path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/refresh/', auth_views.TenantTokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/switch-company/', auth_views.SwitchCompanyView.as_view(), name='switch-company'),
     path('auth/verify-2fa/', auth_views.Verify2FAView.as_view(), name='verify-2fa'),
     path('auth/setup-2fa/', auth_views.Setup2FAView.as_view(), name='setup-2fa'),
     path('auth/enable-2fa/', auth_views.Enable2FAView.as_view(), name='enable-2fa'),
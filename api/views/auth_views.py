@@ -3,10 +3,11 @@ Authentication views
 """
 from rest_framework import status, generics, permissions, serializers
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import authenticate
+from core.authentication import TenantTokenRefreshSerializer, issue_tokens
 from core.models import User, Company, CompanyUser, Role
+from core.rbac import FULL_ACCESS
 from django.utils import timezone
 import pyotp
 import qrcode
@@ -19,6 +20,11 @@ class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
     two_factor_code = serializers.CharField(required=False, allow_blank=True)
+    company_id = serializers.UUIDField(required=False)
+
+
+class SwitchCompanySerializer(serializers.Serializer):
+    company_id = serializers.UUIDField()
 
 
 class RegisterSerializer(serializers.Serializer):
@@ -108,11 +114,11 @@ class LoginView(TokenObtainPairView):
                     'error': {'message': 'Invalid 2FA code'}
                 }, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        # Generate tokens carrying the active company claims
+        refresh, context = issue_tokens(user, request.data.get('company_id'), fallback=True)
         
         # Get user's companies
-        company_users = CompanyUser.objects.filter(user=user, is_active=True)
+        company_users = CompanyUser.objects.filter(user=user, is_active=True).select_related('company')
         companies = [cu.company for cu in company_users]
         
         return Response({
@@ -132,7 +138,49 @@ class LoginView(TokenObtainPairView):
                         'id': str(c.id),
                         'name': c.name,
                     } for c in companies
-                ]
+                ],
+                'active_company': str(context.company_id) if context else None,
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class TenantTokenRefreshView(TokenRefreshView):
+    """
+    Token refresh that re-issues the company, role and permission claims
+    """
+    serializer_class = TenantTokenRefreshSerializer
+
+
+class SwitchCompanyView(generics.GenericAPIView):
+    """
+    Issue tokens for another company the user belongs to
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SwitchCompanySerializer
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'error': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        refresh, context = issue_tokens(request.user, serializer.validated_data['company_id'])
+        if context is None:
+            return Response({
+                'success': False,
+                'error': {'message': 'You are not an active member of this company'}
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        return Response({
+            'success': True,
+            'data': {
+                'tokens': {
+                    'access': str(refresh.access_token),
+                    'refresh': str(refresh),
+                },
+                'active_company': str(context.company_id),
             }
         }, status=status.HTTP_200_OK)
 
@@ -179,7 +227,7 @@ class RegisterView(generics.CreateAPIView):
             # Get or create default role
             owner_role, _ = Role.objects.get_or_create(
                 name='Company Owner',
-                defaults={'is_system_role': True}
+                defaults={'is_system_role': True, 'permissions': FULL_ACCESS}
             )
             
             # Link user to company
@@ -191,7 +239,7 @@ class RegisterView(generics.CreateAPIView):
             )
         
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh, _ = issue_tokens(user, company.pk if company else None)
         
         return Response({
             'success': True,
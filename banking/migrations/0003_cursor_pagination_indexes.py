@@ -0,0 +1,25 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='banktransaction',
+            name='bank_transa_bank_ac_eb7cf6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='banktransaction',
+            index=models.Index(fields=['bank_account', 'date', 'id'], name='bank_transa_bank_ac_7f90da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='banktransaction',
+            index=models.Index(fields=['date', 'id'], name='bank_transa_date_ea9ac1_idx'),
+        ),
+    ]
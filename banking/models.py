@@ -64,7 +64,8 @@ class BankTransaction(models.Model):
         verbose_name = 'Bank Transaction'
         verbose_name_plural = 'Bank Transactions'
         indexes = [
-            models.Index(fields=['bank_account', 'date']),
+            models.Index(fields=['bank_account', 'date', 'id']),
+            models.Index(fields=['date', 'id']),
             models.Index(fields=['is_reconciled']),
         ]
         ordering = ['-date']
@@ -2,6 +2,9 @@
 Banking module serializers
 """
 from rest_framework import serializers
+
+from core.serializers import TENANT_COMPANY
+
 from .models import BankAccount, BankTransaction
 
 
@@ -9,7 +12,8 @@ class BankAccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = BankAccount
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class BankTransactionSerializer(serializers.ModelSerializer):
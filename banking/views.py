@@ -1,26 +1,23 @@
 """
 Banking module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from core.pagination import KeysetPagination
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import BankAccount, BankTransaction
 from .serializers import BankAccountSerializer, BankTransactionSerializer
 
 
-class BankAccountViewSet(viewsets.ModelViewSet):
+class BankAccountViewSet(TenantModelViewSet):
+    model = BankAccount
     serializer_class = BankAccountSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return BankAccount.objects.filter(company=self.request.tenant)
-        return BankAccount.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class BankTransactionViewSet(viewsets.ModelViewSet):
+class BankTransactionViewSet(TenantModelViewSet):
+    model = BankTransaction
+    tenant_field = 'bank_account__company'
     serializer_class = BankTransactionSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return BankTransaction.objects.filter(bank_account__company=self.request.tenant)
-        return BankTransaction.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    pagination_class = KeysetPagination
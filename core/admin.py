@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserChangeForm as BaseUserChangeForm, UserCreationForm as BaseUserCreationForm
-from .models import User, Company, Branch, Role, CompanyUser, AuditLog
+from .models import User, Company, Branch, Role, CompanyUser, AuditLog, AuditArchive, DocumentSequence
 
 
 class UserCreationForm(BaseUserCreationForm):
@@ -71,6 +71,7 @@ class RoleAdmin(admin.ModelAdmin):
 @admin.register(CompanyUser)
 class CompanyUserAdmin(admin.ModelAdmin):
     list_display = ['user', 'company', 'role', 'branch', 'is_active', 'created_at']
+    list_select_related = ['user', 'company', 'role', 'branch__company']
     list_filter = ['is_active', 'role', 'company', 'created_at']
     search_fields = ['user__email', 'company__name']
     readonly_fields = ['id', 'created_at', 'updated_at']
@@ -85,3 +86,22 @@ class AuditLogAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'timestamp']
     raw_id_fields = ['user', 'company']
     date_hierarchy = 'timestamp'
+
+
+@admin.register(AuditArchive)
+class AuditArchiveAdmin(admin.ModelAdmin):
+    list_display = ['source', 'company', 'month', 'record_count', 'size_bytes', 'created_at']
+    list_filter = ['source', 'month']
+    search_fields = ['company__name', 'path']
+    readonly_fields = ['id', 'path', 'record_count', 'first_timestamp', 'last_timestamp', 'size_bytes', 'created_at']
+    raw_id_fields = ['company']
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ['document_type', 'company', 'branch', 'fiscal_year', 'prefix', 'next_value', 'gap_free']
+    list_select_related = ['company', 'branch__company']
+    list_filter = ['document_type', 'gap_free', 'company']
+    search_fields = ['company__name', 'prefix']
+    readonly_fields = ['id', 'scope', 'created_at', 'updated_at']
+    raw_id_fields = ['company', 'branch']
@@ -0,0 +1,440 @@
+"""
+Audit trail
+Asynchronous, batched AuditLog writer and the viewset mixin that feeds it.
+
+AuditMixin marks a viewset request as audited. While it runs, model saves and deletes
+are captured by core.signals: creates and deletes store the full row, updates only the
+changed fields (old values come from the object get_object() loaded, so no extra
+query). retrieve is recorded as 'view' and custom actions listed in audit_actions as
+the given action. Records are queued on transaction commit and never written in the
+request.
+
+Buffers (AUDIT_BUFFER_BACKEND):
+- 'memory': an in-process queue drained by a daemon thread with bulk_create every
+  AUDIT_FLUSH_INTERVAL seconds or AUDIT_BATCH_SIZE records. When the queue is full the
+  producer writes a batch itself (backpressure, nothing is dropped); whatever is left
+  is flushed at interpreter exit.
+- 'redis': records are pushed to a Redis list and drained by the
+  core.tasks.flush_audit_buffer beat task. Falls back to the memory buffer when Redis
+  cannot be reached. A flush moves each batch atomically to its own claim list and
+  deletes it only after the rows are written; a batch whose write fails on the
+  database connection goes back to the buffer, and claims older than
+  AUDIT_CLAIM_TIMEOUT (left by a flusher that died) are requeued by the next flush.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import InterfaceError, OperationalError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'AUDIT_BATCH_SIZE', 500)
+FLUSH_INTERVAL = getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0)
+MAX_BUFFERED = getattr(settings, 'AUDIT_BUFFER_MAX', 10000)
+CLAIM_TIMEOUT = getattr(settings, 'AUDIT_CLAIM_TIMEOUT', 300)  # seconds
+REDIS_KEY = 'finory_audit_buffer'
+# Sorted set of claim lists (batches being written) scored by claim time
+REDIS_CLAIMS_KEY = 'finory_audit_buffer:claims'
+
+# KEYS: buffer, claim list, claims; ARGV: batch size, now
+CLAIM_SCRIPT = """
+local rows = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #rows > 0 then
+    redis.call('LTRIM', KEYS[1], #rows, -1)
+    redis.call('RPUSH', KEYS[2], unpack(rows))
+    redis.call('ZADD', KEYS[3], ARGV[2], KEYS[2])
+end
+return rows
+"""
+# KEYS: claim list, buffer, claims; puts the claimed rows back at the head of the buffer
+REQUEUE_SCRIPT = """
+local rows = redis.call('LRANGE', KEYS[1], 0, -1)
+for index = #rows, 1, -1 do
+    redis.call('LPUSH', KEYS[2], rows[index])
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[3], KEYS[1])
+return #rows
+"""
+
+# Never stored in old/new values
+REDACTED_FIELDS = {'password', 'two_factor_secret', 'otp_code', 'password_reset_otp', 'biometric_data'}
+# Changes to these alone are not worth an update record
+IGNORED_FIELDS = {'updated_at'}
+# Audit storage itself is never audited, nor snapshots rebuilt from audited records
+UNAUDITED_MODELS = {'core.AuditLog', 'core.AuditArchive', 'ai_engine.AIAuditLog', 'inventory.StockSnapshot'}
+
+_current = contextvars.ContextVar('audit_context', default=None)
+
+
+class AuditContext:
+    """Request metadata of an audited view and the snapshots of objects it loaded"""
+
+    __slots__ = ('user_id', 'company_id', 'ip_address', 'user_agent', 'request_path', 'request_method', 'snapshots')
+
+    def __init__(self, request):
+        user = getattr(request, 'user', None)
+        context = getattr(request, 'tenant_context', None)
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        self.user_id = user.pk if user is not None and user.is_authenticated else None
+        self.company_id = context.company_id if context is not None else None
+        self.ip_address = forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR')
+        self.user_agent = request.META.get('HTTP_USER_AGENT', '')
+        self.request_path = request.path[:500]
+        self.request_method = request.method
+        self.snapshots = {}
+
+
+def is_audited(model):
+    """Models of the project's own apps (no dotted app path), except audit storage"""
+    return '.' not in model._meta.app_config.name and model._meta.label not in UNAUDITED_MODELS
+
+
+def snapshot(instance):
+    """JSON-safe {column: value} of a model instance, without secrets"""
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname not in REDACTED_FIELDS
+    }
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def _snapshot_key(instance):
+    return (instance._meta.label, instance.pk)
+
+
+def _entity_id(value):
+    try:
+        return uuid.UUID(str(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _record(context, action, entity_type, entity_id=None, old_value=None, new_value=None, company_id=None):
+    return {
+        'user_id': context.user_id,
+        'company_id': context.company_id or company_id,
+        'action': action,
+        'entity_type': entity_type,
+        'entity_id': _entity_id(entity_id),
+        'old_value': old_value,
+        'new_value': new_value,
+        'ip_address': context.ip_address,
+        'user_agent': context.user_agent,
+        'request_path': context.request_path,
+        'request_method': context.request_method,
+        'timestamp': timezone.now(),
+    }
+
+
+def _enqueue(record):
+    transaction.on_commit(lambda: get_buffer().put(record))
+
+
+def capture_save(sender, instance, created, raw=False, **kwargs):
+    context = _current.get()
+    if context is None or raw:
+        return
+    new_value = snapshot(instance)
+    old_value = None
+    if not created:
+        previous = context.snapshots.pop(_snapshot_key(instance), None)
+        if previous is not None:
+            changed = [key for key, value in new_value.items() if previous.get(key) != value]
+            if not set(changed) - IGNORED_FIELDS:
+                return
+            old_value = {key: previous.get(key) for key in changed}
+            new_value = {key: new_value[key] for key in changed}
+    _enqueue(_record(
+        context, 'create' if created else 'update', sender.__name__, instance.pk, old_value, new_value,
+        company_id=getattr(instance, 'company_id', None),
+    ))
+
+
+def capture_delete(sender, instance, **kwargs):
+    context = _current.get()
+    if context is None:
+        return
+    old_value = context.snapshots.pop(_snapshot_key(instance), None) or snapshot(instance)
+    _enqueue(_record(
+        context, 'delete', sender.__name__, instance.pk, old_value=old_value,
+        company_id=getattr(instance, 'company_id', None),
+    ))
+
+
+def capture_bulk_create(model, instances):
+    """Create records for rows written with bulk_create, which sends no signals"""
+    for instance in instances:
+        capture_save(model, instance, created=True)
+
+
+def field_changes(record):
+    """
+    [{'field', 'old', 'new'}] of one audit record: every stored column of a create or
+    delete, the changed columns of an update
+    """
+    old_value = record.get('old_value') or {}
+    new_value = record.get('new_value') or {}
+    fields = sorted(set(old_value) | set(new_value))
+    return [
+        {'field': field, 'old': old_value.get(field), 'new': new_value.get(field)}
+        for field in fields
+        if old_value.get(field) != new_value.get(field)
+    ]
+
+
+class AuditMixin:
+    """
+    Audit trail for module viewsets (see module docstring).
+    audit_actions maps custom action names to AuditLog actions, e.g. {'general_ledger': 'export'}.
+    """
+
+    audit_actions = {}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._audit_token = _current.set(AuditContext(request))
+
+    def get_object(self):
+        instance = super().get_object()
+        context = _current.get()
+        if context is not None and self.request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            context.snapshots[_snapshot_key(instance)] = snapshot(instance)
+        return instance
+
+    def _audit_entity_type(self):
+        if hasattr(self, 'get_queryset'):
+            try:
+                return self.get_queryset().model.__name__
+            except Exception:
+                pass
+        return getattr(self, 'audit_entity_type', None) or self.basename
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = getattr(self, '_audit_token', None)
+        if token is None:
+            return response
+        try:
+            action = 'view' if self.action == 'retrieve' else self.audit_actions.get(self.action)
+            if action is not None and 200 <= response.status_code < 300:
+                _enqueue(_record(_current.get(), action, self._audit_entity_type(), self.kwargs.get('pk')))
+        finally:
+            _current.reset(token)
+            self._audit_token = None
+        return response
+
+
+def _build(record):
+    if isinstance(record.get('timestamp'), str):
+        record = dict(record, timestamp=parse_datetime(record['timestamp']))
+    return AuditLog(**record)
+
+
+def write(records, requeue=False):
+    """
+    bulk_create records; a failing batch is retried row by row so one bad row loses only itself.
+    With requeue, connection errors are raised instead so the caller can keep the batch.
+    """
+    if not records:
+        return 0
+    try:
+        AuditLog.objects.bulk_create([_build(record) for record in records], batch_size=BATCH_SIZE)
+        return len(records)
+    except Exception as exc:
+        if requeue and isinstance(exc, (OperationalError, InterfaceError)):
+            raise
+        logger.exception('Audit batch of %s failed, writing rows one by one', len(records))
+    written = 0
+    for record in records:
+        try:
+            _build(record).save(force_insert=True)
+            written += 1
+        except Exception:
+            logger.exception('Dropping audit record %s %s', record.get('action'), record.get('entity_type'))
+    return written
+
+
+class MemoryAuditBuffer:
+    """In-process queue flushed by a daemon thread"""
+
+    def __init__(self, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL, max_size=MAX_BUFFERED):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def put(self, record):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Backpressure: the producer writes a batch itself instead of dropping records
+            self.flush(limit=self.batch_size)
+            self._queue.put(record)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, limit=None):
+        """Write queued records (at most limit); returns the number written"""
+        written = 0
+        with self._flush_lock:
+            while limit is None or written < limit:
+                size = self.batch_size if limit is None else min(self.batch_size, limit - written)
+                batch = self._drain(size)
+                if not batch:
+                    break
+                written += write(batch)
+        return written
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Audit writer flush failed')
+            finally:
+                close_old_connections()
+
+    def stop(self, timeout=5):
+        """Stop the writer thread and flush everything still queued"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.flush()
+
+
+class RedisAuditBuffer:
+    """Redis list drained by core.tasks.flush_audit_buffer"""
+
+    def __init__(self, url, batch_size=BATCH_SIZE, max_size=MAX_BUFFERED, fallback=None, claim_timeout=CLAIM_TIMEOUT):
+        self.url = url
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.fallback = fallback
+        self.claim_timeout = claim_timeout
+        self._client = None
+        self._claim = None
+        self._requeue = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.from_url(self.url, socket_timeout=1)
+            self._claim = self._client.register_script(CLAIM_SCRIPT)
+            self._requeue = self._client.register_script(REQUEUE_SCRIPT)
+        return self._client
+
+    def put(self, record):
+        try:
+            length = self.client.rpush(REDIS_KEY, json.dumps(record, cls=DjangoJSONEncoder))
+        except Exception:
+            logger.warning('Redis audit buffer unavailable, buffering in memory', exc_info=True)
+            self.fallback.put(record)
+            return
+        if length > self.max_size:
+            # Backpressure, as in the memory buffer
+            try:
+                self.flush(limit=self.batch_size)
+            except Exception:
+                logger.exception('Audit backpressure flush failed, records stay buffered')
+
+    def pending(self):
+        return self.client.llen(REDIS_KEY)
+
+    def requeue_stale(self):
+        """Put back batches claimed more than claim_timeout seconds ago; returns the rows requeued"""
+        stale = self.client.zrangebyscore(REDIS_CLAIMS_KEY, 0, time.time() - self.claim_timeout)
+        return sum(self._requeue(keys=[claim, REDIS_KEY, REDIS_CLAIMS_KEY]) for claim in stale)
+
+    def flush(self, limit=None):
+        requeued = self.requeue_stale()
+        if requeued:
+            logger.warning('Requeued %s audit records of an interrupted flush', requeued)
+        written = 0
+        while limit is None or written < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - written)
+            claim = f'{REDIS_KEY}:claim:{uuid.uuid4().hex}'
+            rows = self._claim(keys=[REDIS_KEY, claim, REDIS_CLAIMS_KEY], args=[size, time.time()])
+            if not rows:
+                break
+            try:
+                written += write([json.loads(row) for row in rows], requeue=True)
+            except Exception:
+                self._requeue(keys=[claim, REDIS_KEY, REDIS_CLAIMS_KEY])
+                raise
+            pipe = self.client.pipeline()
+            pipe.delete(claim)
+            pipe.zrem(REDIS_CLAIMS_KEY, claim)
+            pipe.execute()
+        return written
+
+    def stop(self, timeout=5):
+        return self.fallback.stop(timeout)
+
+
+_memory_buffer = MemoryAuditBuffer()
+_buffer = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        if getattr(settings, 'AUDIT_BUFFER_BACKEND', 'memory') == 'redis':
+            _buffer = RedisAuditBuffer(settings.REDIS_URL, fallback=_memory_buffer)
+        else:
+            _buffer = _memory_buffer
+    return _buffer
+
+
+def flush():
+    """Write everything buffered in this process (and, with Redis, the shared list)"""
+    written = _memory_buffer.flush()
+    if get_buffer() is not _memory_buffer:
+        written += get_buffer().flush()
+    return written
+
+
+atexit.register(_memory_buffer.stop)
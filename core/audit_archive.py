@@ -0,0 +1,265 @@
+"""
+Audit log retention
+Moves audit rows past a company's retention window out of the database into gzip
+NDJSON files, one or more per (source, company, month), and searches hot and cold
+rows together.
+
+Retention is Company.settings['audit_retention_days'] (AUDIT_RETENTION_DAYS by
+default). Only whole months older than the window are archived, so the table keeps a
+bounded number of months and its indexes stay small. Every file is listed in
+AuditArchive with its company, month and time range; search() opens only the files
+whose range overlaps the request.
+
+Rows are exported in (timestamp, id) order to a temporary file that is renamed when
+complete, and only the exported ids are deleted afterwards, so rows arriving during an
+export stay in the table for the next run.
+"""
+import base64
+import binascii
+import gzip
+import heapq
+import itertools
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditArchive, Company
+
+SOURCES = {
+    'audit': {'model': 'core.AuditLog', 'time_field': 'timestamp'},
+    'ai_audit': {'model': 'ai_engine.AIAuditLog', 'time_field': 'created_at'},
+}
+DEFAULT_RETENTION_DAYS = getattr(settings, 'AUDIT_RETENTION_DAYS', 365)
+DELETE_CHUNK_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+
+
+def archive_dir():
+    return Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', settings.BASE_DIR / 'audit_archive'))
+
+
+def _source(source):
+    config = SOURCES[source]
+    return apps.get_model(config['model']), config['time_field']
+
+
+def retention_days(company_settings):
+    try:
+        return int((company_settings or {}).get('audit_retention_days', DEFAULT_RETENTION_DAYS))
+    except (TypeError, ValueError):
+        return DEFAULT_RETENTION_DAYS
+
+
+def cutoff(days, today=None):
+    """Start of the month containing today - days; rows before it are expired"""
+    day = (today or timezone.localdate()) - timedelta(days=days)
+    return timezone.make_aware(datetime(day.year, day.month, 1))
+
+
+def _next_month(start):
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+def _relative_path(source, company_id, month, part):
+    owner = str(company_id) if company_id else 'system'
+    return Path(source) / owner / f"{month:%Y-%m}.{part}.ndjson.gz"
+
+
+def archive_month(source, company_id, month_start):
+    """Export and delete the rows of one company and month; returns the AuditArchive or None"""
+    model, time_field = _source(source)
+    month_end = _next_month(month_start)
+    rows = (
+        model.objects.filter(company_id=company_id, **{f'{time_field}__gte': month_start, f'{time_field}__lt': month_end})
+        .order_by(time_field, 'id')
+        .values()
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    month = month_start.date()
+    part = AuditArchive.objects.filter(source=source, company_id=company_id, month=month).count() + 1
+    relative = _relative_path(source, company_id, month, part)
+    path = archive_dir() / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+
+    ids, first, last = [], None, None
+    with gzip.open(temporary, 'wt', encoding='utf-8') as handle:
+        for row in rows:
+            handle.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            ids.append(row['id'])
+            first = first or row[time_field]
+            last = row[time_field]
+    if not ids:
+        temporary.unlink()
+        return None
+    os.replace(temporary, path)
+
+    with transaction.atomic():
+        archive = AuditArchive.objects.create(
+            company_id=company_id,
+            source=source,
+            month=month,
+            path=str(relative),
+            record_count=len(ids),
+            first_timestamp=first,
+            last_timestamp=last,
+            size_bytes=path.stat().st_size,
+        )
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            model.objects.filter(pk__in=ids[start:start + DELETE_CHUNK_SIZE]).delete()
+    return archive
+
+
+def archive_expired(today=None, company_ids=None, sources=None):
+    """
+    Archive every expired month of every company (and of rows without a company).
+    Returns {source: {company_id or 'system': rows archived}} for what was moved.
+    """
+    owners = Company.objects.all()
+    if company_ids is not None:
+        owners = owners.filter(pk__in=company_ids)
+    owners = list(owners.values_list('id', 'settings'))
+    if company_ids is None:
+        owners.append((None, {}))
+
+    summary = {}
+    for source in sources or SOURCES:
+        model, time_field = _source(source)
+        for company_id, company_settings in owners:
+            expired_before = cutoff(retention_days(company_settings), today)
+            months = (
+                model.objects.filter(company_id=company_id, **{f'{time_field}__lt': expired_before})
+                .annotate(month=TruncMonth(time_field))
+                .values_list('month', flat=True)
+                .distinct()
+                .order_by('month')
+            )
+            for month_start in list(months):
+                archive = archive_month(source, company_id, timezone.localtime(month_start))
+                if archive is not None:
+                    owner = str(company_id) if company_id else 'system'
+                    counts = summary.setdefault(source, {})
+                    counts[owner] = counts.get(owner, 0) + archive.record_count
+    return summary
+
+
+def read_archive(archive):
+    """Rows of one archive file, with the time field parsed"""
+    _, time_field = _source(archive.source)
+    with gzip.open(archive_dir() / archive.path, 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            row = json.loads(line)
+            row[time_field] = parse_datetime(row[time_field])
+            yield row
+
+
+def _matches(row, filters):
+    return all(
+        str(row.get(field)) in {str(item) for item in value} if isinstance(value, (list, tuple, set))
+        else str(row.get(field)) == str(value)
+        for field, value in filters.items()
+    )
+
+
+def _before(row, time_field, before):
+    timestamp, row_id = before
+    return (row[time_field], str(row['id'])) < (timestamp, str(row_id))
+
+
+def _cold_rows(source, company_id, date_from, date_to, filters, before):
+    """
+    Archived rows newest first, reading only the files whose range overlaps the query.
+    Files are opened newest first and only when the next row could come from them, so a
+    limited search stops reading once it has enough rows.
+    """
+    _, time_field = _source(source)
+    archives = AuditArchive.objects.filter(source=source, company_id=company_id)
+    if date_from is not None:
+        archives = archives.filter(last_timestamp__gte=date_from)
+    if date_to is not None:
+        archives = archives.filter(first_timestamp__lt=date_to)
+    if before is not None:
+        archives = archives.filter(first_timestamp__lte=before[0])
+    archives = list(archives.order_by('-last_timestamp'))
+
+    buffered = []
+    for index, archive in enumerate(archives):
+        buffered.extend(
+            row for row in read_archive(archive)
+            if (date_from is None or row[time_field] >= date_from)
+            and (date_to is None or row[time_field] < date_to)
+            and (before is None or _before(row, time_field, before))
+            and _matches(row, filters)
+        )
+        buffered.sort(key=lambda row: (row[time_field], str(row['id'])), reverse=True)
+        # Rows newer than everything in the remaining files are final
+        bound = archives[index + 1].last_timestamp if index + 1 < len(archives) else None
+        ready = 0
+        while ready < len(buffered) and (bound is None or buffered[ready][time_field] > bound):
+            ready += 1
+        yield from buffered[:ready]
+        del buffered[:ready]
+
+
+def search(source='audit', company_id=None, date_from=None, date_to=None, filters=None, before=None,
+           include_archived=True, limit=None):
+    """
+    Rows of one source and company, newest first, from the table and (optionally) the
+    archive files. date_from is inclusive, date_to exclusive. filters are exact column
+    matches ({'entity_id': ...}), or any-of matches for lists ({'action': ['create',
+    'update']}). before=(timestamp, id) continues after the last row of a previous
+    page; with limit at most that many rows are returned and only that many table rows
+    are read, so a page costs the same wherever it is in the table.
+    """
+    model, time_field = _source(source)
+    filters = filters or {}
+    hot = model.objects.filter(company_id=company_id, **{
+        f'{field}__in' if isinstance(value, (list, tuple, set)) else field: value
+        for field, value in filters.items()
+    })
+    if date_from is not None:
+        hot = hot.filter(**{f'{time_field}__gte': date_from})
+    if date_to is not None:
+        hot = hot.filter(**{f'{time_field}__lt': date_to})
+    if before is not None:
+        hot = hot.filter(
+            Q(**{f'{time_field}__lt': before[0]}) | Q(**{time_field: before[0], 'id__lt': before[1]})
+        )
+    hot = hot.order_by(f'-{time_field}', '-id').values()
+    hot = iter(hot[:limit]) if limit is not None else hot.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if not include_archived:
+        return hot
+    cold = _cold_rows(source, company_id, date_from, date_to, filters, before)
+    rows = heapq.merge(hot, cold, key=lambda row: (row[time_field], str(row['id'])), reverse=True)
+    return itertools.islice(rows, limit) if limit is not None else rows
+
+
+def encode_cursor(row, source='audit'):
+    """Opaque cursor of a row, for search(before=decode_cursor(cursor))"""
+    _, time_field = _source(source)
+    value = f"{row[time_field].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) of a cursor; raises ValueError when it is malformed"""
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = value.split('|')
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    parsed = parse_datetime(timestamp)
+    if parsed is None:
+        raise ValueError('Invalid cursor')
+    return parsed, uuid.UUID(row_id)
@@ -0,0 +1,63 @@
+"""
+DRF authentication
+JWT authentication that resolves the tenant context from the token claims, and the
+helpers that issue tokens carrying those claims
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import tenancy
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that sets request.tenant / request.tenant_context from the
+    'company_id' claim (or the user's default company when the token has none).
+    Tokens with tenant claims are rejected once the membership, role or permissions
+    they describe have changed; checking costs one cache read of the version tokens.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None:
+            return None
+        user, token = result
+        context = tenancy.resolve(user.pk, token.get(tenancy.COMPANY_CLAIM))
+        if token.get(tenancy.COMPANY_USER_CLAIM) is not None and not tenancy.claims_match(context, token):
+            raise InvalidToken('Company membership changed, refresh the token')
+        tenancy.attach(request._request, context)
+        return result
+
+
+def issue_tokens(user, company_id=None, fallback=False):
+    """
+    Refresh token (and its access token) for user acting in company_id, or in the
+    default company when company_id is None or, with fallback, not one of theirs.
+    Returns (refresh, context); context is None when no membership matched.
+    """
+    context = tenancy.resolve(user.pk, company_id)
+    if context is None and company_id is not None and fallback:
+        context = tenancy.resolve(user.pk)
+    refresh = RefreshToken.for_user(user)
+    tenancy.set_claims(refresh, context)
+    return refresh, context
+
+
+class TenantTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that re-reads the tenant claims instead of copying stale ones"""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user_id = access[api_settings.USER_ID_CLAIM]
+        context = tenancy.resolve(user_id, access.get(tenancy.COMPANY_CLAIM)) or tenancy.resolve(user_id)
+        tenancy.set_claims(access, context)
+        data['access'] = str(access)
+        if 'refresh' in data:
+            refresh = RefreshToken(data['refresh'])
+            tenancy.set_claims(refresh, context)
+            data['refresh'] = str(refresh)
+        return data
@@ -0,0 +1,27 @@
+"""
+Move audit rows past the retention window to gzip NDJSON files without running a Celery worker
+"""
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from core import audit_archive
+
+
+class Command(BaseCommand):
+    help = 'Archive audit log months older than each company\'s retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', action='append', help='Limit to a company id (repeatable)')
+        parser.add_argument('--source', action='append', choices=list(audit_archive.SOURCES), help='Audit source (repeatable)')
+        parser.add_argument('--today', type=parse_date, help='Reference date (YYYY-MM-DD), default today')
+
+    def handle(self, *args, **options):
+        summary = audit_archive.archive_expired(
+            today=options['today'], company_ids=options['company'], sources=options['source']
+        )
+        archived = 0
+        for source, counts in summary.items():
+            for owner, count in counts.items():
+                archived += count
+                self.stdout.write(f"{source} {owner}: {count} archived")
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} audit record{"" if archived == 1 else "s"}'))
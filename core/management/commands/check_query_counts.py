@@ -0,0 +1,70 @@
+"""
+Fail when a tenant-scoped endpoint's query count grows with its rows (N+1) or exceeds its query plan
+"""
+from importlib import import_module
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core import querycount
+from core.models import Company, CompanyUser
+from core.viewsets import TenantModelViewSet
+
+
+def _viewsets():
+    for app_config in apps.get_app_configs():
+        if '.' not in app_config.name:
+            try:
+                import_module(f'{app_config.name}.views')
+            except ImportError:
+                continue
+    pending, found = list(TenantModelViewSet.__subclasses__()), []
+    while pending:
+        viewset_class = pending.pop()
+        pending.extend(viewset_class.__subclasses__())
+        if viewset_class.model is not None:
+            found.append(viewset_class)
+    return sorted(found, key=lambda viewset_class: (viewset_class.__module__, viewset_class.__name__))
+
+
+class Command(BaseCommand):
+    help = 'Measure list/retrieve queries of every TenantModelViewSet on a seeded company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', required=True, help='Company id whose data is read')
+        parser.add_argument('--rows', type=int, default=20, help='Rows of the large list measurement')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+        except (Company.DoesNotExist, ValidationError):
+            raise CommandError(f"Company {options['company']} not found")
+        membership = CompanyUser.objects.filter(company=company, is_active=True).select_related('user').first()
+        user = membership.user if membership else None
+
+        failures = []
+        for viewset_class in _viewsets():
+            name = f'{viewset_class.__module__}.{viewset_class.__name__}'
+            single, count = querycount.measure(viewset_class, company, rows=1, user=user)
+            if not count:
+                self.stdout.write(f'{name}: no rows, skipped')
+                continue
+            many, count = querycount.measure(viewset_class, company, rows=options['rows'], user=user)
+            expected = querycount.expected_queries(viewset_class, 'list')
+            pk = viewset_class.model._default_manager.filter(
+                **{viewset_class.tenant_field: company}
+            ).values_list('pk', flat=True).first()
+            detail, _ = querycount.measure(viewset_class, company, action='retrieve', pk=pk, user=user)
+            detail_expected = querycount.expected_queries(viewset_class, 'retrieve')
+
+            line = f'{name}: list {single} (1 row) / {many} ({count} rows), expected {expected}; retrieve {detail}, expected {detail_expected}'
+            if many != single or many > expected or detail > detail_expected:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint(s) over their query budget: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All endpoints within their query budgets'))
@@ -1,51 +1,24 @@
 """
 Multi-tenancy middleware
-Extracts company_id from JWT token and sets request.tenant
+Sets request.tenant for session-authenticated requests (admin, browsable API)
 """
 from django.utils.deprecation import MiddlewareMixin
-from django.core.cache import cache
-from .models import Company, CompanyUser
+
+from . import tenancy
 
 
 class TenantMiddleware(MiddlewareMixin):
     """
     Middleware to handle multi-tenancy
-    Extracts company_id from JWT token and sets request.tenant
-    Caches the tenant information to reduce database hits
+    JWT requests are anonymous at this point; their tenant is resolved from the token
+    claims by core.authentication.TenantJWTAuthentication. Here request.tenant is
+    initialised and filled in for session users from the cached tenant context.
     """
-    
+
     def process_request(self, request):
-        """
-        Extract company_id from JWT token and set request.tenant
-        """
-        request.tenant = None
-        request.company_user = None
-        
-        # Try to get company_id from token
+        tenancy.attach(request, None)
+
         if hasattr(request, 'user') and request.user.is_authenticated:
-            user_id = str(request.user.id)
-            cache_key = f"user_{user_id}_tenant"
-            
-            try:
-                cached_data = cache.get(cache_key)
-            except Exception:
-                cached_data = None
-            if cached_data:
-                request.tenant = cached_data.get('tenant')
-                request.company_user = cached_data.get('company_user')
-            else:
-                # Get company from user's active company_user relationship
-                company_user = request.user.company_users.select_related('company').filter(is_active=True).first()
-                if company_user:
-                    request.tenant = company_user.company
-                    request.company_user = company_user
-                    
-                    try:
-                        cache.set(cache_key, {
-                            'tenant': request.tenant,
-                            'company_user': company_user
-                        }, 3600)
-                    except Exception:
-                        pass
-        
+            tenancy.attach(request, tenancy.resolve(request.user.pk))
+
         return None
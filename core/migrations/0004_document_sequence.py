@@ -0,0 +1,39 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_user_password_reset_otp_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document_type', models.CharField(max_length=50)),
+                ('fiscal_year', models.PositiveIntegerField(blank=True, null=True)),
+                ('scope', models.CharField(editable=False, max_length=64)),
+                ('prefix', models.CharField(blank=True, default='', max_length=30)),
+                ('padding', models.PositiveSmallIntegerField(default=6)),
+                ('next_value', models.BigIntegerField(default=1)),
+                ('block_size', models.PositiveIntegerField(default=50, help_text='Numbers reserved per worker at a time')),
+                ('gap_free', models.BooleanField(default=False, help_text="Allocate under a row lock in the document's transaction so no numbers are skipped")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='core.branch')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Document Sequence',
+                'verbose_name_plural': 'Document Sequences',
+                'db_table': 'document_sequences',
+                'unique_together': {('company', 'document_type', 'scope')},
+            },
+        ),
+    ]
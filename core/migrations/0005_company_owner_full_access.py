@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def grant_owner_full_access(apps, schema_editor):
+    # Permissions are enforced from now on; owners created before had an empty permission map
+    Role = apps.get_model('core', 'Role')
+    for role in Role.objects.filter(name='Company Owner'):
+        if not role.permissions:
+            role.permissions = {'*': '*'}
+            role.save(update_fields=['permissions'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_document_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(grant_owner_full_access, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_audit_log_event_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditArchive',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('source', models.CharField(choices=[('audit', 'Audit Log'), ('ai_audit', 'AI Audit Log')], max_length=20)),
+                ('month', models.DateField(help_text='First day of the archived month')),
+                ('path', models.CharField(help_text='Relative to AUDIT_ARCHIVE_DIR', max_length=500)),
+                ('record_count', models.PositiveIntegerField(default=0)),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='audit_archives', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Audit Archive',
+                'verbose_name_plural': 'Audit Archives',
+                'db_table': 'audit_archives',
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['source', 'company', 'month'], name='audit_archi_source_517e5a_idx')],
+            },
+        ),
+    ]
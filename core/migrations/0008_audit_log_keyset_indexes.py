@@ -0,0 +1,45 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_audit_archive'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='auditlog',
+            options={'ordering': ['-timestamp', '-id'], 'verbose_name': 'Audit Log', 'verbose_name_plural': 'Audit Logs'},
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_logs_user_id_88267f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_logs_company_b12e54_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_logs_entity__d4c2e5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_logs_timesta_423be6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['company', 'timestamp', 'id'], name='audit_logs_company_9bb628_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['company', 'user', 'timestamp', 'id'], name='audit_logs_company_f41378_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['entity_type', 'entity_id', 'timestamp', 'id'], name='audit_logs_entity__3c1cd8_idx'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 """
-Core models for Finory IA - Multi-tenancy, Users, Roles, Permissions, Audit
+Core models for Finory IA - Multi-tenancy, Users, Roles, Permissions, Audit, Document sequences
 """
 import uuid
 from django.db import models
@@ -295,20 +295,108 @@ class AuditLog(models.Model):
     request_path = models.CharField(max_length=500, null=True, blank=True)
     request_method = models.CharField(max_length=10, null=True, blank=True)
     
-    # Timestamp
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Timestamp (set when the change happens; rows are written later in batches by core.audit)
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'audit_logs'
         verbose_name = 'Audit Log'
         verbose_name_plural = 'Audit Logs'
+        # Keyset pages walk (timestamp, id) backwards within a company, user or entity
         indexes = [
-            models.Index(fields=['user', 'timestamp']),
-            models.Index(fields=['company', 'timestamp']),
-            models.Index(fields=['entity_type', 'entity_id']),
-            models.Index(fields=['timestamp']),
+            models.Index(fields=['company', 'timestamp', 'id']),
+            models.Index(fields=['company', 'user', 'timestamp', 'id']),
+            models.Index(fields=['entity_type', 'entity_id', 'timestamp', 'id']),
         ]
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
     
     def __str__(self):
         return f"{self.action} {self.entity_type} by {self.user.email if self.user else 'System'} at {self.timestamp}"
+
+
+class DocumentSequence(models.Model):
+    """
+    Number sequence for documents (journal entries, invoices, purchase orders)
+    One row per company, document type and optional branch / fiscal year scope.
+    Numbers are handed out by core.sequences; next_value is the first number not yet reserved.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='document_sequences')
+    document_type = models.CharField(max_length=50)
+    branch = models.ForeignKey(
+        Branch,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='document_sequences'
+    )
+    fiscal_year = models.PositiveIntegerField(null=True, blank=True)
+    # Scope key '<branch id or ->:<fiscal year or ->' so the unique constraint also covers unscoped rows
+    scope = models.CharField(max_length=64, editable=False)
+    
+    prefix = models.CharField(max_length=30, blank=True, default='')
+    padding = models.PositiveSmallIntegerField(default=6)
+    next_value = models.BigIntegerField(default=1)
+    block_size = models.PositiveIntegerField(default=50, help_text="Numbers reserved per worker at a time")
+    gap_free = models.BooleanField(
+        default=False,
+        help_text="Allocate under a row lock in the document's transaction so no numbers are skipped"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        verbose_name = 'Document Sequence'
+        verbose_name_plural = 'Document Sequences'
+        unique_together = [['company', 'document_type', 'scope']]
+    
+    def __str__(self):
+        return f"{self.document_type} {self.prefix} ({self.scope})"
+    
+    @staticmethod
+    def build_scope(branch_id=None, fiscal_year=None):
+        return f"{branch_id.hex if branch_id else '-'}:{fiscal_year or '-'}"
+    
+    def save(self, *args, **kwargs):
+        self.scope = self.build_scope(self.branch_id, self.fiscal_year)
+        super().save(*args, **kwargs)
+    
+    def format(self, value):
+        return f"{self.prefix}{value:0{self.padding}d}"
+
+
+class AuditArchive(models.Model):
+    """
+    Index of one cold audit file: gzip NDJSON rows of one source, company and month
+    that left the database after the company's retention window (see core.audit_archive)
+    """
+    SOURCES = [
+        ('audit', 'Audit Log'),
+        ('ai_audit', 'AI Audit Log'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, related_name='audit_archives')
+    source = models.CharField(max_length=20, choices=SOURCES)
+    month = models.DateField(help_text="First day of the archived month")
+    path = models.CharField(max_length=500, help_text="Relative to AUDIT_ARCHIVE_DIR")
+    record_count = models.PositiveIntegerField(default=0)
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    size_bytes = models.BigIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'audit_archives'
+        verbose_name = 'Audit Archive'
+        verbose_name_plural = 'Audit Archives'
+        indexes = [
+            models.Index(fields=['source', 'company', 'month']),
+        ]
+        ordering = ['-month']
+    
+    def __str__(self):
+        return f"{self.source} {self.month:%Y-%m} ({self.record_count})"
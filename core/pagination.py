@@ -0,0 +1,204 @@
+"""
+Pagination
+KeysetPagination pages high-volume lists by position instead of offset. The cursor
+holds the ordering values of the last row of a page, and the next page is a range
+scan from there, so page 1000 costs the same as page 1 when an index matches the
+ordering.
+
+The ordering is the client's ?ordering= (when every field is a non-null column),
+else view.cursor_ordering, else the model's Meta.ordering, always completed with the
+primary key so positions are unique. Totals are opt-in per request:
+?count=exact (COUNT(*)), ?count=estimate (planner estimate on PostgreSQL, exact
+elsewhere) or ?count=none; default_count applies when the parameter is absent.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def estimate_count(queryset):
+    """Planner row estimate on PostgreSQL; an exact count on other databases"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on the full (ordering..., pk) key; see module docstring"""
+
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering_query_param = api_settings.ORDERING_PARAM
+    default_count = 'exact'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def _is_keyset_field(self, model, name):
+        try:
+            field = model._meta.get_field(name.lstrip('-'))
+        except FieldDoesNotExist:
+            return False
+        return field.concrete and not field.null and not field.is_relation
+
+    def get_ordering(self, queryset, view):
+        model = queryset.model
+        ordering = list(queryset.query.order_by)
+        if not ordering or not all(isinstance(name, str) and self._is_keyset_field(model, name) for name in ordering):
+            ordering = list(getattr(view, 'cursor_ordering', None) or model._meta.ordering or ['-pk'])
+        pk_name = model._meta.pk.name
+        ordering = ['-' + pk_name if name == '-pk' else pk_name if name == 'pk' else name for name in ordering]
+        if not any(name.lstrip('-') == pk_name for name in ordering):
+            descending = ordering[-1].startswith('-')
+            ordering.append(('-' if descending else '') + pk_name)
+        return ordering
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+            return list(payload['p']), bool(payload.get('r'))
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, position, reverse=False):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _position(self, instance):
+        return [_encode_value(getattr(instance, name.lstrip('-'))) for name in self.ordering]
+
+    def _after(self, position, ordering):
+        """Rows strictly after position in ordering: (a, b) > (x, y) as a < x or (a = x and b < y) ..."""
+        condition = Q()
+        for index, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            term = Q(**{f'{field}__{lookup}': position[index]})
+            for previous in range(index):
+                term &= Q(**{ordering[previous].lstrip('-'): position[previous]})
+            condition |= term
+        return condition
+
+    def _count(self, request, queryset):
+        mode = request.query_params.get(self.count_query_param, self.default_count)
+        if mode not in COUNT_MODES:
+            mode = self.default_count
+        if mode == 'exact':
+            return queryset.count(), False
+        if mode == 'estimate':
+            return estimate_count(queryset), connections[queryset.db].vendor == 'postgresql'
+        return None, False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.count, self.count_estimated = self._count(request, queryset)
+        position, reverse = self.decode_cursor(request)
+        if position is not None and len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else '-' + name for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, ordering))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.page:
+            return remove_query_param(url, self.cursor_query_param)
+        cursor = self.encode_cursor(self._position(self.page[0]), reverse=True)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = OrderedDict()
+        if self.count is not None:
+            body['count'] = self.count
+            if self.count_estimated:
+                body['count_estimated'] = True
+        body['next'] = self.get_next_link()
+        body['previous'] = self.get_previous_link()
+        body['results'] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'count_estimated': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Position returned in next/previous', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': f'Rows per page (max {self.max_page_size})', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'description': 'Total count: exact, estimate or none', 'schema': {'type': 'string', 'enum': list(COUNT_MODES)}},
+        ]
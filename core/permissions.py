@@ -0,0 +1,41 @@
+"""
+DRF permission classes
+Authorize from the tenant context resolved out of the token claims (no queries)
+"""
+from rest_framework import permissions
+
+from . import rbac
+
+
+class IsTenantMember(permissions.BasePermission):
+    """Authenticated user acting for a company they are an active member of"""
+
+    message = 'No active company'
+
+    def has_permission(self, request, view):
+        return bool(
+            request.user and request.user.is_authenticated
+            and getattr(request, 'tenant_context', None) is not None
+        )
+
+
+class HasModulePermission(permissions.BasePermission):
+    """
+    RBAC check of the view's (module, action) against the compiled permissions of the
+    tenant context. Superusers pass; actions in view.rbac_exempt_actions only need an
+    authenticated user.
+    """
+
+    message = 'You do not have permission to perform this action'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if getattr(view, 'action', None) in getattr(view, 'rbac_exempt_actions', ()) or user.is_superuser:
+            return True
+        context = getattr(request, 'tenant_context', None)
+        if context is None:
+            self.message = 'No active company'
+            return False
+        return context.permissions.allows(rbac.view_module(view), rbac.view_action(view, request))
@@ -0,0 +1,67 @@
+"""
+Query counting
+Helpers that pin the number of SQL queries an endpoint runs, used by the
+check_query_counts command (and usable from any CI script) to catch N+1 regressions.
+
+measure() runs one action of a TenantModelViewSet the way a request would (queryset,
+filters, serializer) without authentication or middleware, so only the data queries
+are counted. A list is measured with 1 row and with many rows: an endpoint without
+N+1 queries runs the same number for both, and no more than its query plan implies.
+"""
+from contextlib import contextmanager
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+
+@contextmanager
+def assert_max_queries(limit, using=DEFAULT_DB_ALIAS):
+    """Raise AssertionError, listing the SQL, when the block runs more than limit queries"""
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > limit:
+        statements = '\n'.join(f"  {query['sql']}" for query in captured.captured_queries)
+        raise AssertionError(f"{len(captured)} queries executed, {limit} allowed:\n{statements}")
+
+
+def expected_queries(viewset_class, action='list'):
+    """Queries a query plan implies: the rows, plus one per prefetched relation level"""
+    budget = getattr(viewset_class, 'query_budgets', {}).get(action)
+    if budget is not None:
+        return budget
+    plans = viewset_class.query_plans
+    plan = plans.get(action) or plans.get('default') or {}
+    return 1 + sum(len(lookup.split('__')) for lookup in plan.get('prefetch_related') or ())
+
+
+def _view(viewset_class, action, company, user=None, kwargs=None):
+    http_request = RequestFactory().get('/')
+    http_request.tenant = company
+    request = Request(http_request)
+    request.user = user or AnonymousUser()
+    return viewset_class(
+        action=action, request=request, args=(), kwargs=kwargs or {}, format_kwarg=None, headers={}
+    )
+
+
+def measure(viewset_class, company, action='list', rows=20, pk=None, user=None):
+    """(queries, rows serialized) of one list (first rows rows) or retrieve (pk) call"""
+    if action == 'list':
+        view = _view(viewset_class, 'list', company, user)
+        queryset = view.filter_queryset(view.get_queryset())
+        with CaptureQueriesContext(connections[queryset.db]) as captured:
+            page = list(queryset[:rows])
+            view.get_serializer(page, many=True).data
+        return len(captured), len(page)
+
+    view = _view(viewset_class, action, company, user, kwargs={view_lookup(viewset_class): str(pk)})
+    with CaptureQueriesContext(connections[view.get_queryset().db]) as captured:
+        view.get_serializer(view.get_object()).data
+    return len(captured), 1
+
+
+def view_lookup(viewset_class):
+    return viewset_class.lookup_url_kwarg or viewset_class.lookup_field
@@ -0,0 +1,121 @@
+"""
+Role-based access control
+Compiles Role.permissions and CompanyUser.permissions into frozensets of
+'module.action' grants and denials, checked with a handful of set lookups.
+
+Permission JSON, for roles and membership overrides alike:
+    {
+        "sales": ["view", "create"],                  # listed actions of a module
+        "inventory": "*",                             # every action of a module
+        "accounting": {"view": true, "post": false},  # explicit grants and denials
+        "crm.update": true,                           # one dotted grant or denial
+        "*": ["view"]                                 # actions on every module
+    }
+{"*": "*"} grants everything. Denials win over grants; membership overrides are
+applied after the role, so an override can grant what the role denies and deny what
+the role grants (also through a wildcard).
+
+Modules are app names (accounting, sales, ...). Actions are view, create, update and
+delete for the standard viewset actions, and the action name (or view.rbac_actions
+mapping) for custom ones. The compiled permissions live in the cached tenant context,
+so they are built once per membership and role version (see core.tenancy).
+"""
+import hashlib
+
+from rest_framework import permissions
+
+WILDCARD = '*'
+FULL_ACCESS = {WILDCARD: WILDCARD}
+
+VIEWSET_ACTIONS = {
+    'list': 'view',
+    'retrieve': 'view',
+    'metadata': 'view',
+    'create': 'create',
+    'update': 'update',
+    'partial_update': 'update',
+    'destroy': 'delete',
+}
+METHOD_ACTIONS = {
+    'POST': 'create',
+    'PUT': 'update',
+    'PATCH': 'update',
+    'DELETE': 'delete',
+}
+
+
+class CompiledPermissions:
+    """Frozen grants and denials of one membership"""
+
+    __slots__ = ('grants', 'denials')
+
+    def __init__(self, grants=frozenset(), denials=frozenset()):
+        self.grants = frozenset(grants)
+        self.denials = frozenset(denials)
+
+    def __repr__(self):
+        return f"<CompiledPermissions grants={len(self.grants)} denials={len(self.denials)}>"
+
+    def allows(self, module, action):
+        key = f"{module}.{action}"
+        if key in self.denials or f"{module}.{WILDCARD}" in self.denials:
+            return False
+        grants = self.grants
+        return (
+            key in grants
+            or f"{module}.{WILDCARD}" in grants
+            or f"{WILDCARD}.{action}" in grants
+            or f"{WILDCARD}.{WILDCARD}" in grants
+        )
+
+    def digest(self):
+        """Short stable hash, used as the JWT permissions claim"""
+        encoded = '|'.join(sorted(self.grants)) + '#' + '|'.join(sorted(self.denials))
+        return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def _entries(permissions):
+    """Yield ('module.action', allowed) pairs from permission JSON; malformed values are ignored"""
+    for module, value in (permissions or {}).items():
+        if '.' in module:
+            yield module, bool(value)
+        elif value == WILDCARD or value is True:
+            yield f"{module}.{WILDCARD}", True
+        elif value is False:
+            yield f"{module}.{WILDCARD}", False
+        elif isinstance(value, (list, tuple)):
+            for action in value:
+                yield f"{module}.{action}", True
+        elif isinstance(value, dict):
+            for action, allowed in value.items():
+                yield f"{module}.{action}", bool(allowed)
+
+
+def compile_permissions(role_permissions, overrides=None):
+    """CompiledPermissions from a role's JSON and the membership's override JSON"""
+    grants, denials = set(), set()
+    for layer in (role_permissions, overrides):
+        for key, allowed in _entries(layer):
+            if allowed:
+                grants.add(key)
+                denials.discard(key)
+            else:
+                denials.add(key)
+                grants.discard(key)
+    return CompiledPermissions(grants, denials)
+
+
+def view_module(view):
+    """RBAC module of a view: view.rbac_module or the app the view is defined in"""
+    return getattr(view, 'rbac_module', None) or type(view).__module__.split('.')[0]
+
+
+def view_action(view, request):
+    """RBAC action of the current request"""
+    action = getattr(view, 'action', None)
+    if action is not None:
+        mapped = getattr(view, 'rbac_actions', {}).get(action) or VIEWSET_ACTIONS.get(action)
+        if mapped is not None:
+            return mapped
+        return 'view' if request.method in permissions.SAFE_METHODS else action
+    return METHOD_ACTIONS.get(request.method, 'view')
@@ -0,0 +1,180 @@
+"""
+Document number allocation
+Hands out journal entry, invoice and purchase order numbers from DocumentSequence rows.
+
+Default (block) mode: each worker process reserves a block of numbers with one short
+UPDATE and serves later requests from memory, so there is no row lock per document.
+Numbers stay unique but can be skipped (unused block remainders are lost on restart)
+and are not strictly ordered across workers.
+
+Gap-free mode: the sequence row is locked with SELECT ... FOR UPDATE inside the
+caller's transaction, so numbers are consecutive and a rolled-back document releases
+its number. This serializes document creation per sequence, as the rule requires.
+
+Per-company configuration lives in Company.settings['sequences'][document_type]:
+    prefix, padding, block_size, gap_free, per_branch, per_fiscal_year, start
+Settings are copied into the DocumentSequence row when it is first created; edit the
+row afterwards. Workers read a row's settings the first time they use it.
+"""
+import threading
+from collections import deque
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import DocumentSequence
+
+DOCUMENT_TYPES = {
+    'journal_entry': {'prefix': 'JE-'},
+    'invoice': {'prefix': 'INV-'},
+    'purchase_order': {'prefix': 'PO-'},
+}
+
+DEFAULT_CONFIG = {
+    'padding': 6,
+    'block_size': 50,
+    'gap_free': False,
+    'per_branch': False,
+    'per_fiscal_year': False,
+    'start': 1,
+}
+
+_lock = threading.Lock()
+# (company_id, document_type, scope) -> DocumentSequence snapshot (id, prefix, padding, block_size, gap_free)
+_sequences = {}
+# sequence id -> deque of reserved, unused values
+_pools = {}
+
+
+class SequenceError(Exception):
+    pass
+
+
+def _overrides(company, document_type):
+    return (company.settings or {}).get('sequences', {}).get(document_type, {})
+
+
+def get_config(company, document_type):
+    if document_type not in DOCUMENT_TYPES:
+        raise SequenceError(f'Unknown document type: {document_type}')
+    config = dict(DEFAULT_CONFIG, **DOCUMENT_TYPES[document_type])
+    config.update(_overrides(company, document_type))
+    return config
+
+
+def _initial_prefix(company, document_type, config, branch_id, fiscal_year):
+    prefix = config['prefix']
+    if document_type == 'journal_entry' and 'prefix' not in _overrides(company, document_type):
+        # JournalEntry.entry_number is unique across all companies
+        prefix = f"{prefix}{company.pk.hex[:8].upper()}-"
+    if branch_id:
+        prefix = f"{prefix}{branch_id.hex[:4].upper()}-"
+    if fiscal_year:
+        prefix = f"{prefix}{fiscal_year}-"
+    return prefix
+
+
+def get_sequence(company, document_type, branch=None, date=None):
+    """The DocumentSequence for this scope, created from the company settings on first use"""
+    config = get_config(company, document_type)
+    branch_id = branch.pk if (branch is not None and config['per_branch']) else None
+    fiscal_year = date.year if (date is not None and config['per_fiscal_year']) else None
+    key = (company.pk, document_type, DocumentSequence.build_scope(branch_id, fiscal_year))
+
+    with _lock:
+        sequence = _sequences.get(key)
+    if sequence is not None:
+        return sequence
+
+    sequence, _ = DocumentSequence.objects.get_or_create(
+        company=company,
+        document_type=document_type,
+        scope=key[2],
+        defaults={
+            'branch_id': branch_id,
+            'fiscal_year': fiscal_year,
+            'prefix': _initial_prefix(company, document_type, config, branch_id, fiscal_year),
+            'padding': config['padding'],
+            'block_size': config['block_size'],
+            'gap_free': config['gap_free'],
+            'next_value': config['start'],
+        },
+    )
+    # Only cache rows that are known to be committed
+    transaction.on_commit(lambda: _remember_sequence(key, sequence))
+    return sequence
+
+
+def _remember_sequence(key, sequence):
+    with _lock:
+        _sequences.setdefault(key, sequence)
+
+
+def _take_from_pool(sequence_id, count):
+    with _lock:
+        pool = _pools.get(sequence_id)
+        if not pool:
+            return []
+        return [pool.popleft() for _ in range(min(count, len(pool)))]
+
+
+def _return_to_pool(sequence_id, values):
+    with _lock:
+        _pools.setdefault(sequence_id, deque()).extend(values)
+
+
+def _reserve(sequence, size):
+    """Advance next_value by size and return the reserved range"""
+    with transaction.atomic():
+        DocumentSequence.objects.filter(pk=sequence.pk).update(next_value=F('next_value') + size)
+        end = DocumentSequence.objects.filter(pk=sequence.pk).values_list('next_value', flat=True).get()
+    return range(end - size, end)
+
+
+def _allocate_gap_free(sequence, count):
+    if not transaction.get_connection().in_atomic_block:
+        raise SequenceError(
+            'Gap-free sequences must be allocated inside transaction.atomic() together with the document'
+        )
+    locked = DocumentSequence.objects.select_for_update().get(pk=sequence.pk)
+    start = locked.next_value
+    locked.next_value = start + count
+    locked.save(update_fields=['next_value', 'updated_at'])
+    return list(range(start, start + count))
+
+
+def _allocate_block(sequence, count):
+    values = _take_from_pool(sequence.pk, count)
+    missing = count - len(values)
+    if missing:
+        reserved = _reserve(sequence, max(sequence.block_size, missing))
+        values.extend(reserved[:missing])
+        leftover = list(reserved[missing:])
+        if leftover:
+            # If the caller's transaction rolls back, the reservation rolls back with it,
+            # so the remainder only becomes available to others once it is committed
+            transaction.on_commit(lambda: _return_to_pool(sequence.pk, leftover))
+    return values
+
+
+def next_numbers(company, document_type, count=1, branch=None, date=None):
+    """Allocate count formatted document numbers"""
+    if count < 1:
+        return []
+    sequence = get_sequence(company, document_type, branch=branch, date=date)
+    if sequence.gap_free:
+        values = _allocate_gap_free(sequence, count)
+    else:
+        values = _allocate_block(sequence, count)
+    return [sequence.format(value) for value in values]
+
+
+def next_number(company, document_type, branch=None, date=None):
+    return next_numbers(company, document_type, 1, branch=branch, date=date)[0]
+
+
+def reset_cache():
+    """Forget cached sequence rows and reserved blocks (after editing a DocumentSequence)"""
+    with _lock:
+        _sequences.clear()
+        _pools.clear()
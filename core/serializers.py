@@ -5,6 +5,29 @@ from rest_framework import serializers
 from .models import Company, Branch, User, Role, CompanyUser
 
 
+class CurrentTenantDefault:
+    """Default of the read-only company field of tenant data: the request's active company"""
+    requires_context = True
+
+    def __call__(self, serializer_field):
+        return serializer_field.context['request'].tenant
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+
+# extra_kwargs of the company field of tenant data (listed in read_only_fields too): the
+# viewset saves the active company, and unique-together checks still see it
+TENANT_COMPANY = {'default': CurrentTenantDefault()}
+
+
+def tenant_company(serializer):
+    """Company of the row being validated: the instance's, else the request's active company"""
+    if serializer.instance is not None:
+        return serializer.instance.company
+    return getattr(serializer.context.get('request'), 'tenant', None)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -32,7 +55,8 @@ class BranchSerializer(serializers.ModelSerializer):
             'id', 'company', 'company_name', 'name', 'address', 'manager',
             'is_active', 'settings', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class RoleSerializer(serializers.ModelSerializer):
@@ -54,4 +78,31 @@ class CompanyUserSerializer(serializers.ModelSerializer):
             'role', 'role_name', 'branch', 'permissions', 'is_active',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
+
+
+class AuditLogSerializer(serializers.Serializer):
+    """Audit rows as returned by core.audit_archive.search (table or archive)"""
+    id = serializers.UUIDField()
+    timestamp = serializers.DateTimeField()
+    action = serializers.CharField()
+    entity_type = serializers.CharField()
+    entity_id = serializers.UUIDField(allow_null=True)
+    user = serializers.UUIDField(source='user_id', allow_null=True)
+    user_email = serializers.CharField(allow_null=True, default=None)
+    old_value = serializers.JSONField(allow_null=True)
+    new_value = serializers.JSONField(allow_null=True)
+    ip_address = serializers.CharField(allow_null=True)
+    request_path = serializers.CharField(allow_null=True)
+    request_method = serializers.CharField(allow_null=True)
+
+
+class AuditHistorySerializer(serializers.Serializer):
+    """One change of an entity with its field-level diff"""
+    id = serializers.UUIDField()
+    timestamp = serializers.DateTimeField()
+    action = serializers.CharField()
+    user = serializers.UUIDField(source='user_id', allow_null=True)
+    user_email = serializers.CharField(allow_null=True, default=None)
+    changes = serializers.ListField()
@@ -0,0 +1,46 @@
+"""
+Core module signals
+Bump the tenant context version tokens when companies, memberships or roles change,
+and capture model changes made by audited views (core.audit)
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import audit, tenancy
+from .models import Company, CompanyUser, Role
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_contexts(sender, instance, **kwargs):
+    transaction.on_commit(lambda: tenancy.bump_version('company', instance.pk))
+
+
+@receiver(post_save, sender=CompanyUser)
+@receiver(post_delete, sender=CompanyUser)
+def invalidate_user_contexts(sender, instance, **kwargs):
+    transaction.on_commit(lambda: tenancy.bump_version('user', instance.user_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_contexts(sender, instance, **kwargs):
+    transaction.on_commit(lambda: tenancy.bump_version(tenancy.ROLES_SCOPE))
+
+
+def connect_audit_receivers():
+    """
+    Capture changes of project models only; a sender-less receiver would make every
+    queryset.delete() (including audit log purges) load and signal each row
+    """
+    for model in apps.get_models():
+        if not audit.is_audited(model):
+            continue
+        label = model._meta.label
+        post_save.connect(audit.capture_save, sender=model, dispatch_uid=f'core_audit_save_{label}')
+        post_delete.connect(audit.capture_delete, sender=model, dispatch_uid=f'core_audit_delete_{label}')
+
+
+connect_audit_receivers()
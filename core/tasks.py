@@ -0,0 +1,18 @@
+"""
+Core module Celery tasks
+"""
+from celery import shared_task
+
+from . import audit, audit_archive
+
+
+@shared_task
+def flush_audit_buffer():
+    """Write buffered audit records (the Redis list when AUDIT_BUFFER_BACKEND is 'redis')"""
+    return audit.flush()
+
+
+@shared_task
+def archive_audit_logs():
+    """Move audit months past each company's retention window to cold files"""
+    return audit_archive.archive_expired()
@@ -0,0 +1,237 @@
+"""
+Tenant context
+Compact, cached description of the company a request acts for.
+
+resolve(user_id, company_id) returns a TenantContext with the membership ids, compiled
+role permissions (core.rbac), branch, currency and timezone, plus the company column values that
+rebuild request.tenant without a query. company_id normally comes from the JWT
+'company_id' claim; without it the user's first active membership is used.
+
+Access tokens carry company_id, company_user_id, role and a permissions hash
+(token_claims()). claims_match() compares them with the current context, so a token
+issued before a membership or role change is rejected and has to be refreshed.
+
+Cache keys embed three version tokens (company, user and roles) that core.signals bumps
+on Company, CompanyUser and Role changes, so stale contexts are never read and nothing
+has to be deleted. A per-process LRU sits in front of the shared cache: a warm request
+costs one get_many of the version tokens and no unpickling.
+"""
+import copy
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from . import rbac
+from .models import Company, CompanyUser
+
+COMPANY_CLAIM = 'company_id'
+COMPANY_USER_CLAIM = 'company_user_id'
+ROLE_CLAIM = 'role'
+PERMISSIONS_CLAIM = 'perm_hash'
+TENANT_CLAIMS = (COMPANY_CLAIM, COMPANY_USER_CLAIM, ROLE_CLAIM, PERMISSIONS_CLAIM)
+CONTEXT_CACHE_TIMEOUT = 3600
+ROLES_SCOPE = 'roles'
+COMPANY_FIELDS = [field.attname for field in Company._meta.concrete_fields]
+
+# Cached marker for "user has no active membership", distinct from a cache miss
+_NO_TENANT = 0
+_MISSING = object()
+
+
+class TenantContext:
+    """Immutable-by-convention tenant description shared between requests; do not mutate"""
+
+    __slots__ = (
+        'user_id', 'company_id', 'company_user_id', 'role_id', 'role_name', 'permissions',
+        'permissions_hash', 'branch_id', 'currency', 'timezone', 'company_values',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def __repr__(self):
+        return f"<TenantContext user={self.user_id} company={self.company_id} role={self.role_name}>"
+
+    def build_company(self):
+        """A fresh Company instance from the cached column values (no query)"""
+        values = copy.deepcopy(self.company_values)
+        return Company.from_db(Company.objects.db, COMPANY_FIELDS, [values[name] for name in COMPANY_FIELDS])
+
+
+class LocalLRU:
+    """Thread-safe per-process LRU; values must not be mutated by callers"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalLRU(getattr(settings, 'TENANT_CONTEXT_LRU_SIZE', 2048))
+
+
+def _version_key(scope, object_id=None):
+    return f"tenant_version_{scope}" if object_id is None else f"tenant_version_{scope}_{object_id}"
+
+
+def bump_version(scope, object_id=None):
+    try:
+        cache.set(_version_key(scope, object_id), uuid.uuid4().hex, None)
+    except Exception:
+        pass
+
+
+def _versions(keys):
+    """Current tokens for keys (one round trip), creating missing ones; None when the cache is down"""
+    try:
+        found = cache.get_many(keys)
+        missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+        if missing:
+            cache.set_many(missing, None)
+            found.update(missing)
+    except Exception:
+        return None
+    return [found[key] for key in keys]
+
+
+def _cached(key, loader):
+    """LRU -> shared cache -> loader(); None results are cached as well"""
+    value = local_cache.get(key, _MISSING)
+    if value is _MISSING:
+        try:
+            value = cache.get(key, _MISSING)
+        except Exception:
+            value = _MISSING
+        if value is _MISSING:
+            value = loader()
+            value = _NO_TENANT if value is None else value
+            try:
+                cache.set(key, value, CONTEXT_CACHE_TIMEOUT)
+            except Exception:
+                pass
+        local_cache.set(key, value)
+    return value or None
+
+
+def _memberships(user_id):
+    return CompanyUser.objects.filter(user_id=user_id, is_active=True).order_by('created_at')
+
+
+def _load_default_company(user_id):
+    return _memberships(user_id).values_list('company_id', flat=True).first()
+
+
+def _load_context(user_id, company_id):
+    membership = (
+        _memberships(user_id).filter(company_id=company_id)
+        .select_related('company', 'role')
+        .first()
+    )
+    if membership is None:
+        return None
+    company, role = membership.company, membership.role
+    permissions = rbac.compile_permissions(role.permissions if role is not None else None, membership.permissions)
+    return TenantContext(
+        user_id=membership.user_id,
+        company_id=company.pk,
+        company_user_id=membership.pk,
+        role_id=membership.role_id,
+        role_name=role.name if role is not None else None,
+        permissions=permissions,
+        permissions_hash=permissions.digest(),
+        branch_id=membership.branch_id,
+        currency=company.currency,
+        timezone=company.timezone,
+        company_values={name: getattr(company, name) for name in COMPANY_FIELDS},
+    )
+
+
+def default_company_id(user_id):
+    """Company of the user's first active membership (cached under the user version)"""
+    versions = _versions([_version_key('user', user_id)])
+    if versions is None:
+        return _load_default_company(user_id)
+    return _cached(f"tenant_default_{user_id}_{versions[0]}", lambda: _load_default_company(user_id))
+
+
+def resolve(user_id, company_id=None):
+    """TenantContext of user_id in company_id (or the default company), or None"""
+    if company_id is None:
+        company_id = default_company_id(user_id)
+        if company_id is None:
+            return None
+    try:
+        company_id = uuid.UUID(str(company_id))
+    except ValueError:
+        return None
+    versions = _versions([
+        _version_key('company', company_id), _version_key('user', user_id), _version_key(ROLES_SCOPE),
+    ])
+    if versions is None:
+        return _load_context(user_id, company_id)
+    key = f"tenant_context_{user_id}_{company_id.hex}_{'_'.join(versions)}"
+    return _cached(key, lambda: _load_context(user_id, company_id))
+
+
+def token_claims(context):
+    """Claims describing context, for access and refresh tokens"""
+    return {
+        COMPANY_CLAIM: str(context.company_id),
+        COMPANY_USER_CLAIM: str(context.company_user_id),
+        ROLE_CLAIM: str(context.role_id) if context.role_id else None,
+        PERMISSIONS_CLAIM: context.permissions_hash,
+    }
+
+
+def set_claims(token, context):
+    """Write (or, without a context, remove) the tenant claims of a token"""
+    claims = token_claims(context) if context is not None else {}
+    for claim in TENANT_CLAIMS:
+        if claims.get(claim) is None:
+            token.payload.pop(claim, None)
+        else:
+            token[claim] = claims[claim]
+
+
+def claims_match(context, token):
+    """Whether the token's tenant claims still describe context"""
+    return context is not None and all(
+        token.get(claim) == value for claim, value in token_claims(context).items()
+    )
+
+
+def attach(request, context):
+    """Set request.tenant_context, request.tenant and (lazily) request.company_user"""
+    request.tenant_context = context
+    if context is None:
+        request.tenant = None
+        request.company_user = None
+        return
+    request.tenant = context.build_company()
+    request.company_user = SimpleLazyObject(
+        lambda: CompanyUser.objects.select_related('role', 'branch').get(pk=context.company_user_id)
+    )
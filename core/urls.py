@@ -11,5 +11,6 @@ router.register(r'users', views.UserViewSet, basename='user')
 router.register(r'branches', views.BranchViewSet, basename='branch')
 router.register(r'roles', views.RoleViewSet, basename='role')
 router.register(r'company-users', views.CompanyUserViewSet, basename='company-user')
+router.register(r'audit-logs', views.AuditLogViewSet, basename='audit-log')
 
 urlpatterns = router.urls
@@ -1,33 +1,62 @@
 """
 Core module views
 """
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
+from . import audit_archive
 from .models import Company, Branch, User, Role, CompanyUser
+from .audit import AuditMixin, field_changes
+from .permissions import HasModulePermission
+from .rbac import FULL_ACCESS
+from .viewsets import SparseFieldsMixin, TenantModelViewSet
 from .serializers import (
     CompanySerializer, BranchSerializer, UserSerializer,
-    RoleSerializer, CompanyUserSerializer
+    RoleSerializer, CompanyUserSerializer, AuditLogSerializer, AuditHistorySerializer
 )
 
+AUDIT_PAGE_SIZE = 50
+AUDIT_MAX_PAGE_SIZE = 500
+# Actions that change an entity, shown by the history endpoint
+CHANGE_ACTIONS = ['create', 'update', 'delete']
+
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(SparseFieldsMixin, AuditMixin, viewsets.ModelViewSet):
     """
     Company ViewSet
     """
     serializer_class = CompanySerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    # Creating a company needs no membership (the creator becomes its owner) and members
+    # may always see their own companies
+    rbac_exempt_actions = ('create', 'list', 'retrieve')
     
     def get_queryset(self):
-        # Filter by user's companies
-        user = self.request.user
-        company_ids = CompanyUser.objects.filter(user=user, is_active=True).values_list('company_id', flat=True)
-        return Company.objects.filter(id__in=company_ids)
+        # Every company the user is an active member of
+        companies = Company.objects.filter(
+            company_users__user=self.request.user, company_users__is_active=True
+        ).distinct().order_by('name')
+        if self.action in ('list', 'retrieve'):
+            return companies
+        # Changes are authorized by the role in the active company, so only it can be changed;
+        # other companies are reached via auth/switch-company/
+        context = getattr(self.request, 'tenant_context', None)
+        if context is not None:
+            return companies.filter(id=context.company_id)
+        return Company.objects.none()
     
     def perform_create(self, serializer):
         company = serializer.save(legal_representative=self.request.user)
         # Create CompanyUser relationship
-        owner_role, _ = Role.objects.get_or_create(name='Company Owner', defaults={'is_system_role': True})
+        owner_role, _ = Role.objects.get_or_create(
+            name='Company Owner', defaults={'is_system_role': True, 'permissions': FULL_ACCESS}
+        )
         CompanyUser.objects.create(
             company=company,
             user=self.request.user,
@@ -36,33 +65,29 @@ class CompanyViewSet(viewsets.ModelViewSet):
         )
 
 
-class BranchViewSet(viewsets.ModelViewSet):
+class BranchViewSet(TenantModelViewSet):
     """
     Branch ViewSet
     """
+    model = Branch
     serializer_class = BranchSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        # Filter by user's companies
-        user = self.request.user
-        company_ids = CompanyUser.objects.filter(user=user, is_active=True).values_list('company_id', flat=True)
-        return Branch.objects.filter(company_id__in=company_ids)
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    query_plans = {'default': {'select_related': ['company']}}
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """
     User ViewSet
     """
     serializer_class = UserSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     
     def get_queryset(self):
-        # Filter by user's companies
-        user = self.request.user
-        company_ids = CompanyUser.objects.filter(user=user, is_active=True).values_list('company_id', flat=True)
-        user_ids = CompanyUser.objects.filter(company_id__in=company_ids).values_list('user_id', flat=True)
-        return User.objects.filter(id__in=user_ids)
+        # Members of the active company
+        context = getattr(self.request, 'tenant_context', None)
+        if context is not None:
+            return User.objects.filter(company_users__company_id=context.company_id)
+        return User.objects.none()
 
     @action(detail=False, methods=['get', 'put', 'patch'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
@@ -90,24 +115,177 @@ class UserViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(SparseFieldsMixin, AuditMixin, viewsets.ModelViewSet):
     """
     Role ViewSet
     """
     serializer_class = RoleSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     queryset = Role.objects.all()
+    # The permission JSON is what a role is; keep it in lists
+    summary_exclude = ()
 
+    def _check_writable(self, role=None, data=None):
+        """
+        Roles are shared by every company, so only staff may create or change system roles
+        or change a role that members of another company hold
+        """
+        if self.request.user.is_staff:
+            return
+        if data is not None and data.get('is_system_role'):
+            raise PermissionDenied('Only staff can manage system roles')
+        if role is None:
+            return
+        if role.is_system_role:
+            raise PermissionDenied('Only staff can manage system roles')
+        context = getattr(self.request, 'tenant_context', None)
+        holders = CompanyUser.objects.filter(role=role)
+        if context is not None:
+            holders = holders.exclude(company_id=context.company_id)
+        if holders.exists():
+            raise PermissionDenied('This role is used by other companies')
+
+    def perform_create(self, serializer):
+        self._check_writable(data=serializer.validated_data)
+        serializer.save()
 
-class CompanyUserViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        self._check_writable(serializer.instance, serializer.validated_data)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        self._check_writable(instance)
+        instance.delete()
+
+
+class CompanyUserViewSet(TenantModelViewSet):
     """
     CompanyUser ViewSet
     """
+    model = CompanyUser
     serializer_class = CompanyUserSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        # Filter by user's companies
-        user = self.request.user
-        company_ids = CompanyUser.objects.filter(user=user, is_active=True).values_list('company_id', flat=True)
-        return CompanyUser.objects.filter(company_id__in=company_ids)
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    query_plans = {'default': {'select_related': ['user', 'company', 'role']}}
+
+
+def _uuid_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be a UUID'})
+
+
+def _time_param(request, name, end=False):
+    """
+    ISO datetime or YYYY-MM-DD query parameter as an aware datetime; a date used as
+    the (exclusive) end of a range covers that whole day
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is not None:
+                parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Use an ISO datetime or YYYY-MM-DD'})
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class AuditLogViewSet(viewsets.ViewSet):
+    """
+    Audit trail of the active company, newest first.
+    Pages are keyset pages on (timestamp, id): pass next_cursor back as ?cursor= to
+    continue. Archived months are included with include_archived=true.
+    """
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    rbac_module = 'audit'
+
+    def _company_id(self):
+        context = getattr(self.request, 'tenant_context', None)
+        if context is None:
+            raise ValidationError('No active company')
+        return context.company_id
+
+    def _page(self, filters, date_from=None, date_to=None):
+        """One page of rows plus the cursor of the next page (None on the last page)"""
+        params = self.request.query_params
+        try:
+            page_size = min(int(params.get('page_size', AUDIT_PAGE_SIZE)), AUDIT_MAX_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({'page_size': 'Must be an integer'})
+        if page_size < 1:
+            raise ValidationError({'page_size': 'Must be positive'})
+        before = None
+        if params.get('cursor'):
+            try:
+                before = audit_archive.decode_cursor(params['cursor'])
+            except ValueError:
+                raise ValidationError({'cursor': 'Invalid cursor'})
+
+        rows = list(audit_archive.search(
+            company_id=self._company_id(),
+            date_from=date_from,
+            date_to=date_to,
+            filters=filters,
+            before=before,
+            include_archived=params.get('include_archived') == 'true',
+            limit=page_size + 1,
+        ))
+        next_cursor = audit_archive.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        rows = rows[:page_size]
+
+        # One query for the e-mails of the page's users
+        user_ids = {row['user_id'] for row in rows if row['user_id']}
+        emails = {str(pk): email for pk, email in User.objects.filter(pk__in=user_ids).values_list('id', 'email')}
+        for row in rows:
+            row['user_email'] = emails.get(str(row['user_id']))
+        return rows, next_cursor
+
+    def list(self, request):
+        """Filter by user, entity_type, entity_id, action, date_from and date_to"""
+        filters = {}
+        for name in ('user', 'entity_id'):
+            value = _uuid_param(request, name)
+            if value is not None:
+                filters[f'{name}_id' if name == 'user' else name] = value
+        for name in ('entity_type', 'action'):
+            if request.query_params.get(name):
+                filters[name] = request.query_params[name]
+        rows, next_cursor = self._page(
+            filters,
+            date_from=_time_param(request, 'date_from'),
+            date_to=_time_param(request, 'date_to', end=True),
+        )
+        return Response({
+            'success': True,
+            'data': AuditLogSerializer(rows, many=True).data,
+            'next_cursor': next_cursor,
+        })
+
+    @action(detail=False, methods=['get'], url_path=r'history/(?P<entity_type>\w+)/(?P<entity_id>[0-9a-fA-F-]{32,36})')
+    def history(self, request, entity_type=None, entity_id=None):
+        """Creates, updates and deletes of one entity with field-level diffs"""
+        try:
+            entity_id = uuid.UUID(entity_id)
+        except ValueError:
+            raise ValidationError({'entity_id': 'Must be a UUID'})
+        rows, next_cursor = self._page({
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'action': CHANGE_ACTIONS,
+        })
+        for row in rows:
+            row['changes'] = field_changes(row)
+        return Response({
+            'success': True,
+            'data': AuditHistorySerializer(rows, many=True).data,
+            'next_cursor': next_cursor,
+        })
@@ -0,0 +1,191 @@
+"""
+Tenant-scoped viewset base
+TenantModelViewSet filters a model by the request's company and applies a query
+plan per action, so nested serializers and related-name fields are loaded with a
+fixed number of queries instead of one (or more) per row.
+
+    class InvoiceViewSet(TenantModelViewSet):
+        model = Invoice
+        query_plans = {
+            'default': {'prefetch_related': ['items']},
+            'list': {'select_related': ['customer'], 'prefetch_related': ['items']},
+        }
+
+Writes are bound to the active company too: with tenant_field 'company' rows are
+saved with company=request.tenant (serializers list company as read-only with
+core.serializers.TENANT_COMPANY), so a client cannot create or move rows into
+another company. Models reached through a relation (tenant_field 'product__company')
+are checked by their own services.
+
+A plan may list select_related, prefetch_related and only; the action's plan is used
+when present, else 'default'. List and retrieve views without an explicit only get
+one derived from the serializer: the columns its fields read, when every field maps
+onto a column, a select_related path or a prefetched relation (anything else could
+read a deferred column per row, so no only() is applied then).
+
+Responses to GET requests can be trimmed (SparseFieldsMixin):
+- ?fields=id,total returns only those fields, ?exclude=items drops fields;
+- lists default to a summary without the model's JSON columns (summary_exclude
+  overrides the choice); ?representation=full returns every field.
+Relations of fields left out are not joined or prefetched, and their columns are not
+loaded.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import permissions, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+from .audit import AuditMixin
+from .permissions import HasModulePermission
+
+SUMMARY_ACTIONS = ('list',)
+SPARSE_METHODS = ('GET', 'HEAD')
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class SparseFieldsMixin:
+    """?fields= / ?exclude= sparse fieldsets and a summary representation for lists"""
+
+    # Fields left out of list rows unless requested; None means the model's JSON columns
+    summary_exclude = None
+
+    def get_summary_exclude(self):
+        if self.summary_exclude is not None:
+            return set(self.summary_exclude)
+        model = getattr(getattr(self.get_serializer_class(), 'Meta', None), 'model', None)
+        if model is None:
+            return set()
+        return {field.name for field in model._meta.concrete_fields if isinstance(field, models.JSONField)}
+
+    def get_field_names(self, available):
+        """Serializer fields to render, or None for all of them"""
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SPARSE_METHODS:
+            return None
+        params = request.query_params
+        requested, excluded = _names(params.get('fields')), _names(params.get('exclude'))
+        unknown = [name for name in requested + excluded if name not in available]
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+
+        if requested:
+            names = set(requested) | ({'id'} & set(available))
+        elif params.get('representation') == 'full' or self.action not in SUMMARY_ACTIONS:
+            names = set(available)
+        else:
+            names = set(available) - self.get_summary_exclude()
+        names -= set(excluded)
+        return None if names >= set(available) else names
+
+    def sparse_field_names(self):
+        if not hasattr(self, '_sparse_field_names'):
+            available = list(super().get_serializer().fields)
+            self._sparse_field_names = self.get_field_names(available)
+        return self._sparse_field_names
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.sparse_field_names()
+        if names is not None:
+            fields = (serializer.child if isinstance(serializer, ListSerializer) else serializer).fields
+            for name in list(fields):
+                if name not in names:
+                    fields.pop(name)
+        return serializer
+
+
+class TenantModelViewSet(SparseFieldsMixin, AuditMixin, viewsets.ModelViewSet):
+    """ModelViewSet over model rows of the active company, with per-action query plans"""
+
+    model = None
+    # Lookup from the model to the company, e.g. 'product__company'
+    tenant_field = 'company'
+    query_plans = {}
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+
+    def tenant_values(self):
+        """Field values binding a saved row to the active company"""
+        if self.tenant_field == 'company':
+            return {'company': self.request.tenant}
+        return {}
+
+    def perform_create(self, serializer):
+        serializer.save(**self.tenant_values())
+
+    def perform_update(self, serializer):
+        serializer.save(**self.tenant_values())
+
+    def get_query_plan(self):
+        return self.query_plans.get(self.action) or self.query_plans.get('default') or {}
+
+    def get_queryset(self):
+        tenant = getattr(self.request, 'tenant', None)
+        manager = self.model._default_manager
+        if not tenant:
+            return manager.none()
+        return self.apply_query_plan(manager.filter(**{self.tenant_field: tenant}))
+
+    def apply_query_plan(self, queryset):
+        plan = self.get_query_plan()
+        select_related = plan.get('select_related') or []
+        prefetch_related = plan.get('prefetch_related') or []
+        if self.sparse_field_names() is not None:
+            # Skip relations only the left-out fields read
+            roots = {field.source.split('.')[0] for field in self.get_serializer().fields.values()}
+            select_related = [path for path in select_related if path.split('__')[0] in roots]
+            prefetch_related = [path for path in prefetch_related if path.split('__')[0] in roots]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        only = plan.get('only')
+        if only is None and self.action in ('list', 'retrieve') and self.request.method in SPARSE_METHODS:
+            only = self.serializer_columns(select_related, prefetch_related)
+        if only:
+            queryset = queryset.only(*only)
+        return queryset
+
+    def ordering_columns(self):
+        """Columns the ordering (and so cursor pagination) reads from every row"""
+        names = list(self.model._meta.ordering) + list(getattr(self, 'cursor_ordering', None) or [])
+        names += _names(self.request.query_params.get('ordering'))
+        return {name.lstrip('-') for name in names if isinstance(name, str)}
+
+    def serializer_columns(self, select_related, prefetch_related):
+        """only() paths read by the serializer's fields, or None when they cannot be known"""
+        model = self.model
+        selected = set(select_related)
+        prefetched = {lookup.split('__')[0] for lookup in prefetch_related}
+        columns = {model._meta.pk.name}
+        for field in self.get_serializer().fields.values():
+            if field.source == '*':
+                return None
+            path = field.source.split('.')
+            try:
+                model_field = model._meta.get_field(path[0])
+            except FieldDoesNotExist:
+                return None
+            if model_field.is_relation and (
+                model_field.many_to_many or model_field.one_to_many or model_field.auto_created
+            ):
+                if path[0] not in prefetched:
+                    return None
+                continue
+            if len(path) > 1:
+                if '__'.join(path[:-1]) not in selected:
+                    return None
+                columns.add(path[0])
+            columns.add('__'.join(path))
+        for name in self.ordering_columns():
+            try:
+                if model._meta.get_field(name).concrete:
+                    columns.add(name)
+            except FieldDoesNotExist:
+                continue
+        if all(field.name in columns for field in model._meta.concrete_fields):
+            return None
+        return sorted(columns)
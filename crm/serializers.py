@@ -2,6 +2,9 @@
 CRM module serializers
 """
 from rest_framework import serializers
+
+from core.serializers import TENANT_COMPANY
+
 from .models import Lead, Opportunity
 
 
@@ -9,11 +12,13 @@ class LeadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lead
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class OpportunitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Opportunity
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
@@ -1,26 +1,20 @@
 """
 CRM module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import Lead, Opportunity
 from .serializers import LeadSerializer, OpportunitySerializer
 
 
-class LeadViewSet(viewsets.ModelViewSet):
+class LeadViewSet(TenantModelViewSet):
+    model = Lead
     serializer_class = LeadSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Lead.objects.filter(company=self.request.tenant)
-        return Lead.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class OpportunityViewSet(viewsets.ModelViewSet):
+class OpportunityViewSet(TenantModelViewSet):
+    model = Opportunity
     serializer_class = OpportunitySerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Opportunity.objects.filter(company=self.request.tenant)
-        return Opportunity.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
@@ -2,6 +2,9 @@
 Documents module serializers
 """
 from rest_framework import serializers
+
+from core.serializers import TENANT_COMPANY
+
 from .models import Document, VoiceCommand
 
 
@@ -9,11 +12,13 @@ class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class VoiceCommandSerializer(serializers.ModelSerializer):
     class Meta:
         model = VoiceCommand
         fields = '__all__'
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'company', 'created_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
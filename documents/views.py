@@ -1,26 +1,20 @@
 """
 Documents module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import Document, VoiceCommand
 from .serializers import DocumentSerializer, VoiceCommandSerializer
 
 
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(TenantModelViewSet):
+    model = Document
     serializer_class = DocumentSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Document.objects.filter(company=self.request.tenant)
-        return Document.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class VoiceCommandViewSet(viewsets.ModelViewSet):
+class VoiceCommandViewSet(TenantModelViewSet):
+    model = VoiceCommand
     serializer_class = VoiceCommandSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return VoiceCommand.objects.filter(company=self.request.tenant)
-        return VoiceCommand.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
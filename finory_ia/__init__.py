@@ -14,3 +14,8 @@ if sys.version_info >= (3, 14):
         return duplicate
 
     BaseContext.__copy__ = _base_context_copy
+
+# Load the Celery app so @shared_task binds to it when Django starts
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -0,0 +1,14 @@
+"""
+Celery application for finory_ia
+Workers: celery -A finory_ia worker -l info
+Periodic tasks: celery -A finory_ia beat -l info
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finory_ia.settings')
+
+app = Celery('finory_ia')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -6,6 +6,7 @@ from pathlib import Path
 from datetime import timedelta
 import os
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -147,7 +148,7 @@ AUTH_USER_MODEL = 'core.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.TenantJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -158,11 +159,12 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
+    # orjson-backed when installed; DRF's JSONRenderer / JSONParser are drop-in replacements
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
     ),
     'DEFAULT_PARSER_CLASSES': (
-        'rest_framework.parsers.JSONParser',
+        'api.parsers.FastJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ),
@@ -170,6 +172,9 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Unserialized Decimals in API responses: 'string' ("12.50") or 'number' (12.50, exact)
+API_JSON_DECIMAL = config('API_JSON_DECIMAL', default='string')
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -184,6 +189,26 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# Per-process LRU in front of the shared cache for resolved tenant contexts (core.tenancy)
+TENANT_CONTEXT_LRU_SIZE = config('TENANT_CONTEXT_LRU_SIZE', default=2048, cast=int)
+
+# Audit trail buffering (core.audit): 'memory' (in-process writer thread) or 'redis'
+AUDIT_BUFFER_BACKEND = config('AUDIT_BUFFER_BACKEND', default='memory')
+AUDIT_BATCH_SIZE = config('AUDIT_BATCH_SIZE', default=500, cast=int)
+AUDIT_FLUSH_INTERVAL = config('AUDIT_FLUSH_INTERVAL', default=2.0, cast=float)  # seconds
+AUDIT_BUFFER_MAX = config('AUDIT_BUFFER_MAX', default=10000, cast=int)
+# Redis batches claimed longer ago than this are assumed lost with their flusher and requeued
+AUDIT_CLAIM_TIMEOUT = config('AUDIT_CLAIM_TIMEOUT', default=300, cast=int)  # seconds
+# Months older than the retention window (Company.settings['audit_retention_days'] or this
+# default) move from the database to gzip NDJSON files under AUDIT_ARCHIVE_DIR (core.audit_archive)
+AUDIT_RETENTION_DAYS = config('AUDIT_RETENTION_DAYS', default=365, cast=int)
+AUDIT_ARCHIVE_DIR = Path(config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'audit_archive')))
+
+# Stock snapshots (inventory.snapshots): daily ones older than this are purged, monthly ones kept
+INVENTORY_DAILY_SNAPSHOT_DAYS = config('INVENTORY_DAILY_SNAPSHOT_DAYS', default=90, cast=int)
+# Stock reservations (inventory.reservations) expire after this many seconds unless a ttl is given
+INVENTORY_RESERVATION_TTL = config('INVENTORY_RESERVATION_TTL', default=900, cast=int)
+
 # drf-spectacular settings for OpenAPI schema and Swagger UI
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Finory IA API',
@@ -313,6 +338,33 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'post-source-documents': {
+        'task': 'accounting.tasks.post_source_documents',
+        'schedule': config('LEDGER_POSTING_INTERVAL', default=300, cast=int),  # seconds
+    },
+    'revalue-currencies': {
+        'task': 'accounting.tasks.revalue_currencies',
+        'schedule': crontab(day_of_month=1, hour=1, minute=0),  # previous month end
+    },
+}
+CELERY_BEAT_SCHEDULE['archive-audit-logs'] = {
+    'task': 'core.tasks.archive_audit_logs',
+    'schedule': crontab(hour=2, minute=30),
+}
+CELERY_BEAT_SCHEDULE['take-stock-snapshots'] = {
+    'task': 'inventory.tasks.take_stock_snapshots',
+    'schedule': crontab(hour=0, minute=30),
+}
+CELERY_BEAT_SCHEDULE['expire-stock-reservations'] = {
+    'task': 'inventory.tasks.expire_stock_reservations',
+    'schedule': config('INVENTORY_RESERVATION_EXPIRY_INTERVAL', default=60, cast=int),  # seconds
+}
+if AUDIT_BUFFER_BACKEND == 'redis':
+    CELERY_BEAT_SCHEDULE['flush-audit-buffer'] = {
+        'task': 'core.tasks.flush_audit_buffer',
+        'schedule': AUDIT_FLUSH_INTERVAL,
+    }
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
@@ -5,6 +5,7 @@ from .models import Employee, Payroll, Contract
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
     list_display = ['employee_number', 'first_name', 'last_name', 'email', 'position', 'company', 'branch', 'is_active', 'hire_date', 'created_at']
+    list_select_related = ['company', 'branch__company']
     list_filter = ['is_active', 'position', 'department', 'company', 'hire_date', 'created_at']
     search_fields = ['employee_number', 'first_name', 'last_name', 'email', 'company__name']
     readonly_fields = ['id', 'created_at', 'updated_at']
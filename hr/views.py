@@ -1,36 +1,26 @@
 """
 HR module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import Employee, Payroll, Contract
 from .serializers import EmployeeSerializer, PayrollSerializer, ContractSerializer
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(TenantModelViewSet):
+    model = Employee
     serializer_class = EmployeeSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Employee.objects.filter(company=self.request.tenant)
-        return Employee.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class PayrollViewSet(viewsets.ModelViewSet):
+class PayrollViewSet(TenantModelViewSet):
+    model = Payroll
     serializer_class = PayrollSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Payroll.objects.filter(company=self.request.tenant)
-        return Payroll.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class ContractViewSet(viewsets.ModelViewSet):
+class ContractViewSet(TenantModelViewSet):
+    model = Contract
     serializer_class = ContractSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Contract.objects.filter(company=self.request.tenant)
-        return Contract.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
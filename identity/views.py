@@ -2,11 +2,12 @@
 Identity module views
 """
 from rest_framework import viewsets, permissions
+from core.viewsets import SparseFieldsMixin
 from .models import Identity, FaceVerification
 from .serializers import IdentitySerializer, FaceVerificationSerializer
 
 
-class IdentityViewSet(viewsets.ModelViewSet):
+class IdentityViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = IdentitySerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -17,7 +18,7 @@ class IdentityViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class FaceVerificationViewSet(viewsets.ModelViewSet):
+class FaceVerificationViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = FaceVerificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     
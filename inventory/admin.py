@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ProductCategory, Product, Warehouse, Stock, StockMovement
+from .models import ProductCategory, Product, Warehouse, Stock, StockMovement, CostLayer, StockSnapshot, StockReservation
 
 
 @admin.register(ProductCategory)
@@ -23,6 +23,7 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Warehouse)
 class WarehouseAdmin(admin.ModelAdmin):
     list_display = ['name', 'company', 'branch', 'is_active', 'created_at']
+    list_select_related = ['company', 'branch__company']
     list_filter = ['is_active', 'company', 'created_at']
     search_fields = ['name', 'company__name', 'location']
     readonly_fields = ['id', 'created_at', 'updated_at']
@@ -32,17 +33,57 @@ class WarehouseAdmin(admin.ModelAdmin):
 @admin.register(Stock)
 class StockAdmin(admin.ModelAdmin):
     list_display = ['product', 'warehouse', 'quantity', 'reserved_quantity', 'available_quantity', 'last_movement_date']
+    list_select_related = ['product', 'warehouse__company']
     list_filter = ['warehouse__company', 'warehouse']
     search_fields = ['product__name', 'product__sku', 'warehouse__name']
-    readonly_fields = ['id', 'available_quantity']
+    # Levels change only through stock movements (inventory.ledger)
+    readonly_fields = [
+        'id', 'quantity', 'reserved_quantity', 'available_quantity', 'last_movement_date',
+        'received_quantity', 'issued_quantity', 'average_cost',
+    ]
     raw_id_fields = ['product', 'warehouse']
 
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
-    list_display = ['product', 'warehouse', 'movement_type', 'quantity', 'unit_cost', 'date', 'user', 'created_at']
-    list_filter = ['movement_type', 'reference_type', 'date', 'warehouse__company', 'created_at']
+    list_display = ['product', 'warehouse', 'movement_type', 'direction', 'quantity', 'unit_cost', 'cost_amount', 'date', 'user', 'created_at']
+    list_select_related = ['product', 'warehouse__company', 'user']
+    list_filter = ['movement_type', 'direction', 'reference_type', 'date', 'warehouse__company', 'created_at']
     search_fields = ['product__name', 'product__sku', 'warehouse__name']
     readonly_fields = ['id', 'created_at']
     raw_id_fields = ['product', 'warehouse', 'user']
     date_hierarchy = 'date'
+
+
+@admin.register(CostLayer)
+class CostLayerAdmin(admin.ModelAdmin):
+    list_display = ['product', 'warehouse', 'start', 'quantity', 'unit_cost', 'remaining']
+    list_select_related = ['product', 'warehouse__company']
+    list_filter = ['warehouse__company', 'warehouse']
+    search_fields = ['product__name', 'product__sku', 'warehouse__name']
+    # Maintained by inventory.costing
+    readonly_fields = ['id', 'movement', 'product', 'warehouse', 'start', 'quantity', 'unit_cost', 'remaining']
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['product', 'warehouse', 'period', 'as_of', 'quantity', 'value']
+    list_select_related = ['product', 'warehouse__company']
+    list_filter = ['period', 'warehouse__company', 'warehouse']
+    search_fields = ['product__name', 'product__sku', 'warehouse__name']
+    date_hierarchy = 'as_of'
+    # Maintained by inventory.snapshots
+    readonly_fields = ['id', 'product', 'warehouse', 'period', 'as_of', 'quantity', 'value', 'created_at']
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['product', 'warehouse', 'quantity', 'status', 'reference_type', 'reference_id', 'expires_at']
+    list_select_related = ['product', 'warehouse__company']
+    list_filter = ['status', 'warehouse__company', 'warehouse']
+    search_fields = ['product__name', 'product__sku', 'reference_id']
+    # Maintained by inventory.reservations
+    readonly_fields = [
+        'id', 'product', 'warehouse', 'quantity', 'status', 'reference_type', 'reference_id', 'expires_at', 'user',
+        'created_at', 'updated_at',
+    ]
@@ -0,0 +1,256 @@
+"""
+Inventory costing
+FIFO cost layers: every inbound movement of a FIFO product opens a CostLayer at its
+unit cost, outbound movements consume the oldest layers and carry their cost of goods
+sold in StockMovement.cost_amount.
+
+Layers sit at positions on the cumulative quantity received into the product+warehouse
+(start), outbound movements on the cumulative quantity issued, in movement date order;
+what an outbound movement consumes is the overlap of its range with the layers'. A
+movement dated in the past therefore only needs the movements dated on or after it
+(the suffix) replayed: the positions where the suffix begins are the Stock row's
+received_quantity/issued_quantity minus the suffix's own quantities, and of the
+earlier layers only those still open at that point are read. replay() does this for
+any number of product+warehouse pairs with a fixed number of queries.
+
+Average cost: products with cost_method='average' keep a moving weighted-average unit
+cost on their Stock rows. apply_average() blends each inbound movement into it and
+costs outbound movements at it, on the rows the ledger has locked and in the same
+UPDATE as the quantities, so the average never needs the movement history.
+
+valuation() sums remaining x unit cost over open FIFO layers and quantity x average
+cost over average-cost stock, one grouped query each.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum
+
+from .models import CostLayer, Stock, StockMovement
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+AVERAGE_PLACES = Decimal('0.0001')
+BATCH_SIZE = 1000
+
+
+def pairs(keys, conditions=None):
+    """Q matching the (product_id, warehouse_id) keys, each with its extra lookups from conditions"""
+    condition = Q()
+    for key in keys:
+        condition |= Q(product_id=key[0], warehouse_id=key[1], **(conditions or {}).get(key, {}))
+    return condition
+
+
+def load_suffix(since):
+    """{key: [movement, ...]} in date order for movements dated on or after since[key] (None: all)"""
+    conditions = {key: {'date__gte': date} for key, date in since.items() if date is not None}
+    movements = (
+        StockMovement.objects.filter(pairs(since, conditions))
+        .only('id', 'product_id', 'warehouse_id', 'direction', 'quantity', 'unit_cost', 'cost_amount', 'date')
+        .order_by('date', 'created_at', 'id')
+    )
+    suffix = defaultdict(list)
+    for movement in movements:
+        suffix[(movement.product_id, movement.warehouse_id)].append(movement)
+    return suffix
+
+
+def _cost(layers, begin, end, index, fallback):
+    """
+    Cost of the issued range [begin, end) and the first layer it touched.
+    Stock issued before it was received (a back-dated issue) takes the layers received
+    after it, in order; a range past the last layer is costed at the last layer's unit
+    cost, or fallback when there is none.
+    """
+    while index < len(layers) and layers[index].start + layers[index].quantity <= begin:
+        index += 1
+    cost, covered, position = ZERO, ZERO, index
+    while position < len(layers) and layers[position].start < end:
+        layer = layers[position]
+        overlap = min(end, layer.start + layer.quantity) - max(begin, layer.start)
+        if overlap > 0:
+            cost += overlap * layer.unit_cost
+            covered += overlap
+        position += 1
+    if covered < end - begin:
+        unit_cost = layers[position - 1].unit_cost if position else (layers[-1].unit_cost if layers else fallback)
+        cost += (end - begin - covered) * unit_cost
+    return cost.quantize(CENT), index
+
+
+def replay(stock, since, movements=()):
+    """
+    Recompute FIFO layers and cost of goods sold from since[key] onwards.
+    stock: {key: Stock} locked rows with up-to-date received/issued quantities;
+    since: {key: datetime, or None to replay the whole history}; movements: instances
+    already in memory (e.g. just created) that should receive their cost_amount.
+    """
+    if not since:
+        return
+    suffix = load_suffix(since)
+    known = {movement.pk: movement for movement in movements}
+    begins = {}
+    for key, rows in suffix.items():
+        rows[:] = [known.get(movement.pk, movement) for movement in rows]
+        if since[key] is None:
+            begins[key] = (ZERO, ZERO)
+        else:
+            received = sum((movement.quantity for movement in rows if movement.direction > 0), ZERO)
+            issued = sum((movement.quantity for movement in rows if movement.direction < 0), ZERO)
+            begins[key] = (stock[key].received_quantity - received, stock[key].issued_quantity - issued)
+    if not suffix:
+        return
+
+    # Earlier layers still open where the suffix begins
+    open_layers = defaultdict(list)
+    conditions = {key: {'start__lt': begins[key][0], 'end__gt': begins[key][1]} for key in suffix}
+    for layer in (
+        CostLayer.objects.annotate(end=F('start') + F('quantity'))
+        .filter(pairs(suffix, conditions))
+        .order_by('start')
+    ):
+        open_layers[(layer.product_id, layer.warehouse_id)].append(layer)
+    inbound_ids = [movement.pk for rows in suffix.values() for movement in rows if movement.direction > 0]
+    existing = {layer.movement_id: layer for layer in CostLayer.objects.filter(movement_id__in=inbound_ids)}
+
+    created, layers_changed, movements_changed = [], [], []
+    for key, rows in suffix.items():
+        received, issued = begins[key]
+        layers, issues = list(open_layers[key]), []
+        for movement in rows:
+            if movement.direction > 0:
+                layer = existing.get(movement.pk)
+                if layer is None:
+                    layer = CostLayer(movement_id=movement.pk, product_id=key[0], warehouse_id=key[1])
+                    created.append(layer)
+                layer.start, layer.quantity, layer.unit_cost = received, movement.quantity, movement.unit_cost
+                layers.append(layer)
+                received += movement.quantity
+                cost_amount = (movement.quantity * movement.unit_cost).quantize(CENT)
+            else:
+                issues.append((movement, issued))
+                issued += movement.quantity
+                continue
+            if movement.cost_amount != cost_amount:
+                movement.cost_amount = cost_amount
+                movements_changed.append(movement)
+
+        index = 0
+        for movement, begin in issues:
+            cost_amount, index = _cost(layers, begin, begin + movement.quantity, index, movement.unit_cost)
+            if movement.cost_amount != cost_amount:
+                movement.cost_amount = cost_amount
+                movements_changed.append(movement)
+        for layer in layers:
+            layer.remaining = layer.quantity - min(max(issued - layer.start, ZERO), layer.quantity)
+            if not layer._state.adding:
+                layers_changed.append(layer)
+
+    CostLayer.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    CostLayer.objects.bulk_update(layers_changed, ['start', 'quantity', 'unit_cost', 'remaining'], batch_size=BATCH_SIZE)
+    StockMovement.objects.bulk_update(movements_changed, ['cost_amount'], batch_size=BATCH_SIZE)
+
+
+def blend(quantity, average_cost, received, unit_cost):
+    """Average unit cost after receiving received units at unit_cost onto quantity on hand"""
+    total = quantity + received
+    if quantity <= 0 or total <= 0:
+        return Decimal(unit_cost).quantize(AVERAGE_PLACES)
+    return ((quantity * average_cost + received * unit_cost) / total).quantize(AVERAGE_PLACES)
+
+
+def apply_average(stock, movements):
+    """
+    Blend inbound movements into the locked rows' average_cost and set cost_amount of
+    outbound movements, in date order, starting from the rows' quantities before the
+    movements are added. Nothing is saved; the ledger writes rows and movements.
+    """
+    levels = {}
+    for movement in sorted(movements, key=lambda movement: movement.date):
+        key = (movement.product_id, movement.warehouse_id)
+        row = stock[key]
+        quantity = levels.get(key, row.quantity)
+        if movement.direction > 0:
+            row.average_cost = blend(quantity, row.average_cost, movement.quantity, movement.unit_cost)
+            levels[key] = quantity + movement.quantity
+        else:
+            movement.cost_amount = (movement.quantity * row.average_cost).quantize(CENT)
+            levels[key] = quantity - movement.quantity
+
+
+def current_costs(company, skus, warehouse=None):
+    """
+    Quantity and unit cost of many products at once, two queries:
+    [{'sku', 'product_id', 'warehouse_id', 'cost_method', 'quantity', 'available_quantity', 'unit_cost', 'value'}]
+    FIFO products report the value of their open layers, average-cost products their
+    moving average; standard-cost products have no unit cost here.
+    """
+    stock = Stock.objects.filter(product__company=company, product__sku__in=skus)
+    if warehouse is not None:
+        stock = stock.filter(warehouse=warehouse)
+    rows = list(
+        stock.values(
+            'product_id', 'warehouse_id', 'quantity', 'reserved_quantity', 'average_cost',
+            sku=F('product__sku'), cost_method=F('product__cost_method'),
+        ).order_by('product__sku', 'warehouse_id')
+    )
+    fifo_keys = [(row['product_id'], row['warehouse_id']) for row in rows if row['cost_method'] == 'fifo']
+    layers = {}
+    if fifo_keys:
+        layers = {
+            (row['product_id'], row['warehouse_id']): row['value']
+            for row in CostLayer.objects.filter(pairs(fifo_keys), remaining__gt=0)
+            .values('product_id', 'warehouse_id')
+            .annotate(value=Sum(F('remaining') * F('unit_cost')))
+            .order_by()
+        }
+    result = []
+    for row in rows:
+        quantity, method = row['quantity'], row['cost_method']
+        if method == 'fifo':
+            value = layers.get((row['product_id'], row['warehouse_id']), ZERO).quantize(CENT)
+            unit_cost = (value / quantity).quantize(AVERAGE_PLACES) if quantity > 0 else None
+        elif method == 'average':
+            unit_cost = row['average_cost']
+            value = (quantity * unit_cost).quantize(CENT)
+        else:
+            unit_cost = value = None
+        result.append({
+            'sku': row['sku'],
+            'product_id': row['product_id'],
+            'warehouse_id': row['warehouse_id'],
+            'cost_method': method,
+            'quantity': quantity,
+            'available_quantity': quantity - row['reserved_quantity'],
+            'unit_cost': unit_cost,
+            'value': value,
+        })
+    return result
+
+
+def valuation(company, warehouse=None, by_product=False):
+    """
+    Inventory value of FIFO products (open layers) and average-cost products
+    (quantity x average cost), one grouped query each:
+    [{'warehouse_id', ('product_id',) 'quantity', 'value'}]
+    """
+    layers = CostLayer.objects.filter(warehouse__company=company, remaining__gt=0)
+    averaged = Stock.objects.filter(product__company=company, product__cost_method='average', quantity__gt=0)
+    if warehouse is not None:
+        layers, averaged = layers.filter(warehouse=warehouse), averaged.filter(warehouse=warehouse)
+    fields = ['warehouse_id', 'product_id'] if by_product else ['warehouse_id']
+    totals = {}
+    for queryset, quantity, value in (
+        (layers, Sum('remaining'), Sum(F('remaining') * F('unit_cost'))),
+        (averaged, Sum('quantity'), Sum(F('quantity') * F('average_cost'))),
+    ):
+        for row in queryset.values(*fields).annotate(total_quantity=quantity, total_value=value).order_by():
+            key = tuple(row[field] for field in fields)
+            total = totals.setdefault(key, [ZERO, ZERO])
+            total[0] += row['total_quantity']
+            total[1] += row['total_value']
+    return [
+        dict(zip(fields, key), quantity=total[0].quantize(CENT), value=total[1].quantize(CENT))
+        for key, total in sorted(totals.items(), key=lambda item: tuple(str(part) for part in item[0]))
+    ]
@@ -0,0 +1,297 @@
+"""
+Stock ledger
+post_movements() is the writer of stock levels: it records StockMovement (Kardex) rows
+and applies them to Stock in the same transaction, so on-hand quantities always equal
+the sum of the movements.
+
+A batch (e.g. every line of one invoice) runs a fixed number of queries however many
+lines it has. Lines are netted per (product, warehouse); the Stock rows are locked with
+one SELECT ... FOR UPDATE in primary-key order, so concurrent batches queue instead of
+deadlocking, and missing rows are created with one bulk insert. The movements are then
+bulk inserted and the levels incremented with one UPDATE of F() expressions. A batch
+that would issue stock held by reservations (inventory.reservations), or take any level
+below zero, is rejected as a whole. Movements are costed in
+the same transaction (inventory.costing): FIFO products through their cost layers,
+average-cost products through the average cost kept on their Stock rows. Stock
+snapshots dated after a back-dated movement are retaken (inventory.snapshots), two
+more queries per stale snapshot date for the pairs the batch touches.
+
+'in' lines add stock and 'out' lines remove it; 'adjustment' and 'transfer' lines give
+their direction ('in'/'out' or 1/-1), which is stored on the movement.
+"""
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from core import audit
+
+from . import costing, snapshots
+from .models import Product, Stock, StockMovement, Warehouse
+
+ZERO = Decimal('0.00')
+BATCH_SIZE = 1000
+
+TYPE_DIRECTIONS = {'in': 1, 'out': -1}
+DIRECTIONS = {'in': 1, 'out': -1, 1: 1, -1: -1}
+
+
+class StockError(ValidationError):
+    pass
+
+
+class InsufficientStockError(StockError):
+    pass
+
+
+def _pk(value):
+    """A product or warehouse id as a UUID, given an instance, a UUID or its string"""
+    value = getattr(value, 'pk', value)
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise StockError(f"Invalid product or warehouse id '{value}'")
+
+
+def _direction(line):
+    movement_type = line.get('movement_type')
+    if movement_type in TYPE_DIRECTIONS:
+        return TYPE_DIRECTIONS[movement_type]
+    if movement_type not in dict(StockMovement.MOVEMENT_TYPES):
+        raise StockError(f"Unknown movement type '{movement_type}'")
+    direction = DIRECTIONS.get(line.get('direction'))
+    if direction is None:
+        raise StockError(f"'{movement_type}' lines need direction 'in' or 'out'")
+    return direction
+
+
+def build_movements(lines, user=None, reference_type=None, reference_id=None, date=None):
+    """
+    Unsaved StockMovements for the lines and the quantities they move
+    {(product_id, warehouse_id): [received, issued]}
+    """
+    date = date or timezone.now()
+    movements, moved = [], defaultdict(lambda: [ZERO, ZERO])
+    for line in lines:
+        quantity = Decimal(str(line['quantity']))
+        if quantity <= 0:
+            raise StockError('Movement quantities must be positive')
+        direction = _direction(line)
+        key = (_pk(line['product']), _pk(line['warehouse']))
+        moved[key][0 if direction > 0 else 1] += quantity
+        unit_cost = Decimal(str(line.get('unit_cost') or ZERO))
+        movements.append(StockMovement(
+            product_id=key[0],
+            warehouse_id=key[1],
+            movement_type=line['movement_type'],
+            direction=direction,
+            quantity=quantity,
+            unit_cost=unit_cost,
+            cost_amount=(quantity * unit_cost).quantize(costing.CENT) if direction > 0 else None,
+            reference_type=line.get('reference_type') or reference_type,
+            reference_id=line.get('reference_id') or reference_id,
+            date=line.get('date') or date,
+            user=user,
+        ))
+    return movements, moved
+
+
+def check_tenant(company, keys):
+    """
+    Raise StockError unless every product and warehouse belongs to the company (two queries).
+    Returns {product_id: cost_method}.
+    """
+    product_ids = {product_id for product_id, _ in keys}
+    warehouse_ids = {warehouse_id for _, warehouse_id in keys}
+    products = dict(Product.objects.filter(company=company, pk__in=product_ids).values_list('pk', 'cost_method'))
+    warehouses = set(Warehouse.objects.filter(company=company, pk__in=warehouse_ids).values_list('pk', flat=True))
+    unknown = [str(pk) for pk in product_ids if pk not in products]
+    unknown += [str(pk) for pk in warehouse_ids if pk not in warehouses]
+    if unknown:
+        raise StockError(f"Unknown product or warehouse: {', '.join(sorted(unknown))}")
+    return products
+
+
+def lock_stock(keys):
+    """
+    {(product_id, warehouse_id): Stock} locked for update, creating missing rows.
+    Must run inside a transaction.
+    """
+    def locked():
+        rows = Stock.objects.select_for_update().filter(costing.pairs(keys)).order_by('pk')
+        return {(row.product_id, row.warehouse_id): row for row in rows}
+
+    stock = locked()
+    missing = [key for key in keys if key not in stock]
+    if missing:
+        # Another transaction may insert the same rows; the unique (product, warehouse) keeps one
+        Stock.objects.bulk_create(
+            [Stock(product_id=product_id, warehouse_id=warehouse_id) for product_id, warehouse_id in missing],
+            ignore_conflicts=True,
+        )
+        stock = locked()
+    return stock
+
+
+def apply_moved(stock, moved, dates):
+    """
+    Add {(product_id, warehouse_id): [received, issued]} to locked Stock rows with one UPDATE.
+    Raises InsufficientStockError, before writing, when a net issue would take a level
+    below its reserved quantity (below zero when nothing is reserved). Confirming a
+    reservation gives its quantity back before issuing it, so only other issues are held
+    off reserved stock.
+    """
+    short = [
+        f'{product_id} at {warehouse_id}: {stock[(product_id, warehouse_id)].quantity} on hand, '
+        f'{stock[(product_id, warehouse_id)].reserved_quantity} reserved, {issued - received} requested'
+        for (product_id, warehouse_id), (received, issued) in moved.items()
+        if issued > received
+        and stock[(product_id, warehouse_id)].quantity + received - issued
+        < max(stock[(product_id, warehouse_id)].reserved_quantity, ZERO)
+    ]
+    if short:
+        raise InsufficientStockError(['Insufficient stock'] + short)
+
+    rows, values = [], []
+    for key, (received, issued) in moved.items():
+        row = stock[key]
+        values.append((row.quantity + received - issued, row.received_quantity + received, row.issued_quantity + issued))
+        row.quantity = F('quantity') + (received - issued)
+        row.received_quantity = F('received_quantity') + received
+        row.issued_quantity = F('issued_quantity') + issued
+        if row.last_movement_date is None or dates[key] > row.last_movement_date:
+            row.last_movement_date = dates[key]
+        rows.append(row)
+    Stock.objects.bulk_update(
+        rows,
+        ['quantity', 'received_quantity', 'issued_quantity', 'average_cost', 'last_movement_date'],
+        batch_size=BATCH_SIZE,
+    )
+    for row, (quantity, received, issued) in zip(rows, values):
+        row.quantity, row.received_quantity, row.issued_quantity = quantity, received, issued
+
+
+def post_movements(company, lines, user=None, reference_type=None, reference_id=None, date=None):
+    """
+    Record stock movements and apply them to stock levels in one transaction.
+    lines: dicts with product, warehouse (instances or ids), movement_type, quantity and
+    optionally direction, unit_cost, reference_type, reference_id, date.
+    Returns the created movements. Raises StockError for invalid lines and
+    InsufficientStockError when a level would go negative; nothing is written then.
+    """
+    movements, moved = build_movements(
+        lines, user=user, reference_type=reference_type, reference_id=reference_id, date=date
+    )
+    if not movements:
+        return []
+    cost_methods = check_tenant(company, moved)
+    dates, earliest = {}, {}
+    for movement in movements:
+        key = (movement.product_id, movement.warehouse_id)
+        dates[key] = max(dates.get(key, movement.date), movement.date)
+        earliest[key] = min(earliest.get(key, movement.date), movement.date)
+
+    with transaction.atomic():
+        stock = lock_stock(moved)
+        costing.apply_average(stock, [movement for movement in movements if cost_methods[movement.product_id] == 'average'])
+        apply_moved(stock, moved, dates)
+        StockMovement.objects.bulk_create(movements, batch_size=BATCH_SIZE)
+        # Movements dated before the latest one already posted are back-dated: the replay from
+        # their date recosts everything after them
+        costing.replay(
+            stock,
+            {key: date for key, date in earliest.items() if cost_methods[key[0]] == 'fifo'},
+            movements,
+        )
+        # Snapshots taken after a back-dated movement no longer describe their moment
+        snapshots.refresh(earliest)
+        audit.capture_bulk_create(StockMovement, movements)
+    return movements
+
+
+def rebuild_costs(company=None, batch_size=500):
+    """
+    Recompute received/issued totals from the Kardex and replay FIFO costing over the
+    whole history, batch_size product+warehouse pairs per transaction.
+    Returns the number of pairs rebuilt.
+    """
+    stock = Stock.objects.filter(product__cost_method='fifo')
+    if company is not None:
+        stock = stock.filter(product__company=company)
+    keys = list(stock.values_list('product_id', 'warehouse_id').order_by('pk'))
+    for offset in range(0, len(keys), batch_size):
+        batch = keys[offset:offset + batch_size]
+        with transaction.atomic():
+            locked = lock_stock(batch)
+            totals = {
+                (row['product_id'], row['warehouse_id']): row
+                for row in StockMovement.objects.filter(costing.pairs(batch))
+                .values('product_id', 'warehouse_id')
+                .annotate(received=Sum('quantity', filter=Q(direction=1)), issued=Sum('quantity', filter=Q(direction=-1)))
+                .order_by()
+            }
+            for key, row in locked.items():
+                row.received_quantity = (totals.get(key) or {}).get('received') or ZERO
+                row.issued_quantity = (totals.get(key) or {}).get('issued') or ZERO
+            Stock.objects.bulk_update(list(locked.values()), ['received_quantity', 'issued_quantity'], batch_size=BATCH_SIZE)
+            costing.replay(locked, {key: None for key in batch})
+    return len(keys)
+
+
+def repair_average_costs(company=None, batch_size=500, check=False):
+    """
+    Recompute the average cost of average-cost products, and the cost of their outbound
+    movements, from the Kardex: one pass over the movements in date order per batch of
+    batch_size product+warehouse pairs. With check nothing is written.
+    Returns [(product_id, warehouse_id, stored, expected)] of the rows that differed.
+    """
+    stock = Stock.objects.filter(product__cost_method='average')
+    if company is not None:
+        stock = stock.filter(product__company=company)
+    keys = list(stock.values_list('product_id', 'warehouse_id').order_by('pk'))
+    differences = []
+    for offset in range(0, len(keys), batch_size):
+        batch = keys[offset:offset + batch_size]
+        with transaction.atomic():
+            if check:
+                rows = {(row.product_id, row.warehouse_id): row for row in Stock.objects.filter(costing.pairs(batch))}
+            else:
+                rows = lock_stock(batch)
+            levels, changed = {}, []
+            movements = (
+                StockMovement.objects.filter(costing.pairs(batch))
+                .only('id', 'product_id', 'warehouse_id', 'direction', 'quantity', 'unit_cost', 'cost_amount')
+                .order_by('product_id', 'warehouse_id', 'date', 'created_at', 'id')
+            )
+            for movement in movements.iterator(chunk_size=2000):
+                key = (movement.product_id, movement.warehouse_id)
+                quantity, average_cost = levels.get(key, (ZERO, ZERO))
+                if movement.direction > 0:
+                    levels[key] = (
+                        quantity + movement.quantity,
+                        costing.blend(quantity, average_cost, movement.quantity, movement.unit_cost),
+                    )
+                    continue
+                cost_amount = (movement.quantity * average_cost).quantize(costing.CENT)
+                levels[key] = (quantity - movement.quantity, average_cost)
+                if movement.cost_amount != cost_amount:
+                    movement.cost_amount = cost_amount
+                    changed.append(movement)
+
+            repaired = []
+            for key, row in rows.items():
+                expected = levels.get(key, (ZERO, ZERO))[1]
+                if row.average_cost != expected:
+                    differences.append((key[0], key[1], row.average_cost, expected))
+                    row.average_cost = expected
+                    repaired.append(row)
+            if not check:
+                StockMovement.objects.bulk_update(changed, ['cost_amount'], batch_size=BATCH_SIZE)
+                Stock.objects.bulk_update(repaired, ['average_cost'], batch_size=BATCH_SIZE)
+    return differences
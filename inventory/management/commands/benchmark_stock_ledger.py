@@ -0,0 +1,147 @@
+"""
+Measure stock ledger throughput under parallel writers and check that stock levels match the Kardex
+The generated company is deleted at the end.
+"""
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.db import OperationalError, connection, connections
+from django.db.models import F, Sum
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Company
+from inventory import ledger
+from inventory.models import Product, Stock, StockMovement, Warehouse
+
+RETRIES = 50
+
+
+class Command(BaseCommand):
+    help = 'Benchmark inventory.ledger.post_movements with parallel writers on shared products (nothing is kept)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Parallel threads')
+        parser.add_argument('--batches', type=int, default=20, help='Batches per writer')
+        parser.add_argument('--lines', type=int, default=200, help='Lines per batch')
+        parser.add_argument('--products', type=int, default=50, help='Products the writers share')
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also run unlocked per-line read-modify-write updates with the same load',
+        )
+
+    def handle(self, *args, **options):
+        company = Company.objects.create(name=f'Stock ledger benchmark {uuid.uuid4().hex[:8]}')
+        try:
+            self._run(company, options)
+        finally:
+            company.delete()
+
+    def _run(self, company, options):
+        warehouse = Warehouse.objects.create(company=company, name='Benchmark')
+        products = Product.objects.bulk_create([
+            Product(company=company, sku=f'B{index:05d}', name=f'Product {index}')
+            for index in range(options['products'])
+        ])
+        opening = Decimal(options['writers'] * options['batches'] * options['lines'])
+        ledger.post_movements(company, [
+            {'product': product, 'warehouse': warehouse, 'movement_type': 'in', 'quantity': opening}
+            for product in products
+        ])
+
+        def lines(seed):
+            rng = random.Random(seed)
+            return [
+                {
+                    'product': rng.choice(products).pk,
+                    'warehouse': warehouse.pk,
+                    'movement_type': rng.choice(['in', 'out', 'out']),
+                    'quantity': Decimal(rng.randint(1, 5)),
+                    'unit_cost': Decimal('10.00'),
+                }
+                for _ in range(options['lines'])
+            ]
+
+        with CaptureQueriesContext(connection) as captured:
+            ledger.post_movements(company, lines(0))
+        self.stdout.write(f"One batch of {options['lines']} lines: {len(captured)} queries")
+
+        def post_batch(batch):
+            ledger.post_movements(company, batch, reference_type='sale', reference_id=uuid.uuid4())
+
+        self._parallel('ledger', post_batch, lines, options)
+        self._verify(warehouse)
+
+        if options['compare']:
+            self._parallel('unlocked', self._post_unlocked, lines, options)
+            self._verify(warehouse)
+
+    def _parallel(self, name, post, lines, options):
+        failures, retries = [], []
+
+        def writer(index):
+            try:
+                for batch in range(options['batches']):
+                    batch_lines = lines((index + 1) * 10000 + batch)
+                    for attempt in range(RETRIES + 1):
+                        try:
+                            post(batch_lines)
+                            break
+                        except OperationalError as exc:
+                            # SQLite refuses a second writer instead of queueing it; the batch rolled back
+                            if attempt == RETRIES:
+                                failures.append(exc)
+                            else:
+                                retries.append(exc)
+                                time.sleep(random.uniform(0.001, 0.02))
+                        except Exception as exc:
+                            failures.append(exc)
+                            break
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(options['writers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        total = options['writers'] * options['batches'] * options['lines']
+        self.stdout.write(
+            f"{name}: {options['writers']} writers posted {total} lines in {elapsed:.2f}s "
+            f"({total / elapsed:,.0f} lines/s), {len(retries)} retries, {len(failures)} failed batches"
+        )
+        if failures:
+            self.stdout.write(f'  first failure: {failures[0]!r}')
+
+    def _post_unlocked(self, batch):
+        # Read-modify-write per line without a transaction, as separate viewset writes do
+        for line in batch:
+            sign = ledger.TYPE_DIRECTIONS[line['movement_type']]
+            stock = Stock.objects.get(product_id=line['product'], warehouse_id=line['warehouse'])
+            stock.quantity += line['quantity'] * sign
+            stock.save(update_fields=['quantity'])
+            StockMovement.objects.create(
+                product_id=line['product'], warehouse_id=line['warehouse'], movement_type=line['movement_type'],
+                direction=sign, quantity=line['quantity'], unit_cost=line['unit_cost'], date=timezone.now(),
+            )
+
+    def _verify(self, warehouse):
+        kardex = dict(
+            StockMovement.objects.filter(warehouse=warehouse)
+            .values('product_id')
+            .annotate(total=Sum(F('quantity') * F('direction')))
+            .values_list('product_id', 'total')
+        )
+        levels = Stock.objects.filter(warehouse=warehouse).values_list('product_id', 'quantity')
+        drifted = sum(1 for product_id, quantity in levels if kardex.get(product_id) != quantity)
+        if drifted:
+            self.stdout.write(self.style.ERROR(f'  {drifted} stock levels differ from the Kardex'))
+        else:
+            self.stdout.write(self.style.SUCCESS('  Stock levels match the Kardex'))
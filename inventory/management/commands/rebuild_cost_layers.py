@@ -0,0 +1,27 @@
+"""
+Rebuild FIFO cost layers and cost of goods sold from the Kardex
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from inventory import ledger
+
+
+class Command(BaseCommand):
+    help = 'Replay the stock movements of FIFO products into cost layers and cost of goods sold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Limit to one company id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Product+warehouse pairs per transaction')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except (Company.DoesNotExist, ValidationError):
+                raise CommandError(f"Company {options['company']} not found")
+
+        count = ledger.rebuild_costs(company, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt FIFO costs of {count} product/warehouse pair(s)'))
@@ -0,0 +1,39 @@
+"""
+Recompute or verify moving average costs from the Kardex
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from inventory import ledger
+
+
+class Command(BaseCommand):
+    help = 'Recompute average costs of average-cost products from their stock movements, or check them with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Limit to one company id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Product+warehouse pairs per transaction')
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Compare stored average costs against the Kardex without writing; exits non-zero on mismatch',
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except (Company.DoesNotExist, ValidationError):
+                raise CommandError(f"Company {options['company']} not found")
+
+        differences = ledger.repair_average_costs(company, batch_size=options['batch_size'], check=options['check'])
+        for product_id, warehouse_id, stored, expected in differences:
+            self.stdout.write(f'{product_id} at {warehouse_id}: stored {stored}, expected {expected}')
+        if options['check']:
+            if differences:
+                raise CommandError(f'{len(differences)} average cost(s) out of sync')
+            self.stdout.write(self.style.SUCCESS('Average costs match the Kardex'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Repaired {len(differences)} average cost(s)'))
@@ -0,0 +1,36 @@
+"""
+Take stock snapshots for one or every active company
+"""
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Company
+from inventory import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Store the quantity and value of every product+warehouse at the start of a date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Limit to one company id')
+        parser.add_argument('--date', help='ISO date whose start the snapshot describes (default: today)')
+        parser.add_argument('--period', choices=['day', 'month'], default='day')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.filter(is_active=True)
+        if options['company']:
+            try:
+                companies = [Company.objects.get(pk=options['company'])]
+            except (Company.DoesNotExist, ValidationError):
+                raise CommandError(f"Company {options['company']} not found")
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f"Invalid date {options['date']}")
+
+        moment = snapshots.day_start(day)
+        taken = sum(snapshots.take_snapshots(company, moment, options['period']) for company in companies)
+        self.stdout.write(self.style.SUCCESS(f"Stored {taken} {options['period']} snapshot(s) as of {moment.isoformat()}"))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['date', 'id'], name='stock_movem_date_0f9f1a_idx'),
+        ),
+    ]
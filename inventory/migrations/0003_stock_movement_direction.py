@@ -0,0 +1,25 @@
+# Generated by Django 4.2.27 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+def set_out_direction(apps, schema_editor):
+    # Existing 'out' movements removed stock; everything else is taken as inbound
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    StockMovement.objects.filter(movement_type='out').update(direction=-1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='direction',
+            field=models.SmallIntegerField(choices=[(1, 'In'), (-1, 'Out')], default=1),
+        ),
+        migrations.RunPython(set_out_direction, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.27 on 2026-10-17 21:05
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+import uuid
+
+
+def backfill_totals(apps, schema_editor):
+    # Positions start from the Kardex so far; rebuild_cost_layers opens the FIFO layers
+    Stock = apps.get_model('inventory', 'Stock')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+
+    def total(direction):
+        movements = StockMovement.objects.filter(
+            product_id=models.OuterRef('product_id'), warehouse_id=models.OuterRef('warehouse_id'), direction=direction
+        ).order_by().values('product_id').annotate(total=models.Sum('quantity')).values('total')
+        return Coalesce(models.Subquery(movements), Decimal('0.00'), output_field=models.DecimalField())
+
+    Stock.objects.update(received_quantity=total(1), issued_quantity=total(-1))
+    StockMovement.objects.filter(direction=1).update(cost_amount=models.F('quantity') * models.F('unit_cost'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stock_movement_direction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='issued_quantity',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='received_quantity',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='cost_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('start', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('remaining', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('movement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layer', to='inventory.stockmovement')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='inventory.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='inventory.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Cost Layer',
+                'verbose_name_plural': 'Cost Layers',
+                'db_table': 'cost_layers',
+                'ordering': ['product', 'warehouse', 'start'],
+                'indexes': [models.Index(fields=['product', 'warehouse', 'start'], name='cost_layers_product_f9bd46_idx'), models.Index(condition=models.Q(('remaining__gt', 0)), fields=['warehouse', 'product'], name='cost_layers_open_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.27 on 2026-10-17 21:08
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_average_costs(apps, schema_editor):
+    # Average cost (and the cost of outbound movements) of average-cost stock, replayed
+    # from the Kardex as ledger.repair_average_costs does
+    Stock = apps.get_model('inventory', 'Stock')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    cent, places, zero = Decimal('0.01'), Decimal('0.0001'), Decimal('0.00')
+
+    levels, changed = {}, []
+    movements = (
+        StockMovement.objects.filter(product__cost_method='average')
+        .only('id', 'product_id', 'warehouse_id', 'direction', 'quantity', 'unit_cost', 'cost_amount')
+        .order_by('product_id', 'warehouse_id', 'date', 'created_at', 'id')
+    )
+    for movement in movements.iterator(chunk_size=2000):
+        key = (movement.product_id, movement.warehouse_id)
+        quantity, average_cost = levels.get(key, (zero, zero))
+        if movement.direction > 0:
+            total = quantity + movement.quantity
+            if quantity <= 0 or total <= 0:
+                average_cost = Decimal(movement.unit_cost).quantize(places)
+            else:
+                average_cost = ((quantity * average_cost + movement.quantity * movement.unit_cost) / total).quantize(places)
+            levels[key] = (total, average_cost)
+            continue
+        levels[key] = (quantity - movement.quantity, average_cost)
+        cost_amount = (movement.quantity * average_cost).quantize(cent)
+        if movement.cost_amount != cost_amount:
+            movement.cost_amount = cost_amount
+            changed.append(movement)
+    StockMovement.objects.bulk_update(changed, ['cost_amount'], batch_size=1000)
+
+    rows = []
+    for row in Stock.objects.filter(product__cost_method='average').only('id', 'product_id', 'warehouse_id'):
+        key = (row.product_id, row.warehouse_id)
+        if key in levels:
+            row.average_cost = levels[key][1]
+            rows.append(row)
+    Stock.objects.bulk_update(rows, ['average_cost'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_fifo_cost_layers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=19),
+        ),
+        migrations.RunPython(backfill_average_costs, migrations.RunPython.noop),
+    ]
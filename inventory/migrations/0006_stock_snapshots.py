@@ -0,0 +1,36 @@
+# Generated by Django 4.2.27 on 2026-10-17 21:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stock_average_cost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period', models.CharField(choices=[('day', 'Daily'), ('month', 'Monthly')], max_length=10)),
+                ('as_of', models.DateTimeField()),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Snapshot',
+                'verbose_name_plural': 'Stock Snapshots',
+                'db_table': 'stock_snapshots',
+                'ordering': ['-as_of'],
+                'indexes': [models.Index(fields=['product', 'warehouse', 'as_of'], name='stock_snaps_product_786832_idx'), models.Index(fields=['period', 'as_of'], name='stock_snaps_period_203ba3_idx')],
+                'unique_together': {('product', 'warehouse', 'period', 'as_of')},
+            },
+        ),
+    ]
@@ -111,6 +111,11 @@ class Stock(models.Model):
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), validators=[MinValueValidator(0)])
     reserved_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), validators=[MinValueValidator(0)])
     last_movement_date = models.DateTimeField(null=True, blank=True)
+    # Cumulative quantities moved in and out through the stock ledger (FIFO positions)
+    received_quantity = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    issued_quantity = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    # Moving weighted-average unit cost (products with cost_method='average')
+    average_cost = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0.0000'))
     
     class Meta:
         db_table = 'stock'
@@ -141,6 +146,12 @@ class StockMovement(models.Model):
         ('transfer', 'Transfer'),
     ]
     
+    # Sign applied to quantity: 'in' movements add stock, 'out' movements remove it
+    DIRECTIONS = [
+        (1, 'In'),
+        (-1, 'Out'),
+    ]
+    
     REFERENCE_TYPES = [
         ('sale', 'Sale'),
         ('purchase', 'Purchase'),
@@ -152,8 +163,11 @@ class StockMovement(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='stock_movements')
     movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
+    direction = models.SmallIntegerField(choices=DIRECTIONS, default=1)
     quantity = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     unit_cost = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
+    # Inventory value moved: quantity x unit cost in, cost of goods sold out
+    cost_amount = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
     
     # Reference to source transaction
     reference_type = models.CharField(max_length=20, choices=REFERENCE_TYPES, null=True, blank=True)
@@ -170,9 +184,116 @@ class StockMovement(models.Model):
         verbose_name_plural = 'Stock Movements'
         indexes = [
             models.Index(fields=['product', 'warehouse', 'date']),
+            models.Index(fields=['date', 'id']),
             models.Index(fields=['reference_type', 'reference_id']),
         ]
         ordering = ['-date']
     
     def __str__(self):
         return f"{self.movement_type} - {self.product.name} - {self.quantity}"
+
+
+class CostLayer(models.Model):
+    """
+    FIFO cost layer - the quantity an inbound movement added at its unit cost.
+    start is the quantity received into the product+warehouse before it.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    movement = models.OneToOneField(StockMovement, on_delete=models.CASCADE, related_name='cost_layer')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cost_layers')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='cost_layers')
+    start = models.DecimalField(max_digits=18, decimal_places=2)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_cost = models.DecimalField(max_digits=15, decimal_places=2)
+    remaining = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        db_table = 'cost_layers'
+        verbose_name = 'Cost Layer'
+        verbose_name_plural = 'Cost Layers'
+        indexes = [
+            models.Index(fields=['product', 'warehouse', 'start']),
+            models.Index(fields=['warehouse', 'product'], condition=models.Q(remaining__gt=0), name='cost_layers_open_idx'),
+        ]
+        ordering = ['product', 'warehouse', 'start']
+    
+    def __str__(self):
+        return f"{self.product_id} @ {self.unit_cost}: {self.remaining}/{self.quantity}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Stock Snapshot - quantity and value of a product in a warehouse at as_of
+    (movements dated before as_of are included)
+    """
+    PERIODS = [
+        ('day', 'Daily'),
+        ('month', 'Monthly'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='stock_snapshots')
+    period = models.CharField(max_length=10, choices=PERIODS)
+    as_of = models.DateTimeField()
+    quantity = models.DecimalField(max_digits=18, decimal_places=2)
+    value = models.DecimalField(max_digits=18, decimal_places=2)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_snapshots'
+        verbose_name = 'Stock Snapshot'
+        verbose_name_plural = 'Stock Snapshots'
+        unique_together = [['product', 'warehouse', 'period', 'as_of']]
+        indexes = [
+            models.Index(fields=['product', 'warehouse', 'as_of']),
+            models.Index(fields=['period', 'as_of']),
+        ]
+        ordering = ['-as_of']
+    
+    def __str__(self):
+        return f"{self.product_id} at {self.warehouse_id} ({self.as_of:%Y-%m-%d}): {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """
+    Stock Reservation - quantity held for a draft document until it is confirmed
+    (issued through the stock ledger), released or expires
+    """
+    STATUSES = [
+        ('active', 'Active'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    status = models.CharField(max_length=20, choices=STATUSES, default='active')
+    
+    # Document holding the stock (e.g. a draft invoice)
+    reference_type = models.CharField(max_length=20, choices=StockMovement.REFERENCE_TYPES, null=True, blank=True)
+    reference_id = models.UUIDField(null=True, blank=True)
+    
+    expires_at = models.DateTimeField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='stock_reservations')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        indexes = [
+            models.Index(fields=['reference_type', 'reference_id']),
+            models.Index(fields=['product', 'warehouse', 'status']),
+            models.Index(fields=['expires_at'], condition=models.Q(status='active'), name='stock_reservations_due_idx'),
+        ]
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.product_id} at {self.warehouse_id}: {self.quantity} ({self.status})"
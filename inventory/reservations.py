@@ -0,0 +1,166 @@
+"""
+Stock reservations
+reserve() holds stock for a draft document (e.g. an invoice being rung up at a POS):
+Stock.reserved_quantity grows and one StockReservation per line records the hold until
+confirm() issues it through the stock ledger, release() gives it back, or expire() (a
+beat task) drops it once expires_at has passed.
+
+Availability is Stock.quantity - reserved_quantity, read without locking. Reserving does
+not lock the row and re-check it; each (product, warehouse) is one conditional UPDATE
+
+    SET reserved_quantity = reserved_quantity + q WHERE quantity >= reserved_quantity + q
+
+so the check and the increment are a single atomic statement. Many terminals reserving
+the same SKU queue only behind each other's UPDATE and commit, and a line that finds too
+little stock updates nothing, so there is no retry loop. Lines are applied in (product,
+warehouse) order so multi-line reservations cannot deadlock.
+
+Confirming, releasing and expiring give quantities back with one UPDATE of F()
+expressions per batch; expiry skips reservations another transaction holds locked.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import audit
+
+from . import costing, ledger
+from .models import Stock, StockReservation
+
+ZERO = Decimal('0.00')
+BATCH_SIZE = 1000
+DEFAULT_TTL = 900  # seconds
+
+
+def reserve(company, lines, user=None, reference_type=None, reference_id=None, ttl=None):
+    """
+    Hold stock for lines (dicts with product, warehouse (instances or ids) and quantity)
+    for ttl seconds (default INVENTORY_RESERVATION_TTL).
+    Returns the reservations. Raises StockError for invalid lines and
+    InsufficientStockError when any line exceeds the available quantity; nothing is
+    reserved then.
+    """
+    ttl = ttl or getattr(settings, 'INVENTORY_RESERVATION_TTL', DEFAULT_TTL)
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    reservations, totals = [], defaultdict(lambda: ZERO)
+    for line in lines:
+        quantity = Decimal(str(line['quantity']))
+        if quantity <= 0:
+            raise ledger.StockError('Reserved quantities must be positive')
+        key = (ledger._pk(line['product']), ledger._pk(line['warehouse']))
+        totals[key] += quantity
+        reservations.append(StockReservation(
+            product_id=key[0],
+            warehouse_id=key[1],
+            quantity=quantity,
+            reference_type=reference_type,
+            reference_id=reference_id,
+            expires_at=expires_at,
+            user=user,
+        ))
+    if not reservations:
+        return []
+    ledger.check_tenant(company, totals)
+
+    with transaction.atomic():
+        short = []
+        for key in sorted(totals):
+            held = Stock.objects.filter(
+                product_id=key[0], warehouse_id=key[1], quantity__gte=F('reserved_quantity') + totals[key]
+            ).update(reserved_quantity=F('reserved_quantity') + totals[key])
+            if not held:
+                short.append(key)
+        if short:
+            available = {
+                (row.product_id, row.warehouse_id): row.available_quantity
+                for row in Stock.objects.filter(costing.pairs(short))
+            }
+            raise ledger.InsufficientStockError(['Insufficient stock'] + [
+                f'{product_id} at {warehouse_id}: {available.get((product_id, warehouse_id), ZERO)} available, '
+                f'{totals[(product_id, warehouse_id)]} requested'
+                for product_id, warehouse_id in short
+            ])
+        StockReservation.objects.bulk_create(reservations, batch_size=BATCH_SIZE)
+        audit.capture_bulk_create(StockReservation, reservations)
+    return reservations
+
+
+def _lock(reservations):
+    """Active reservations of the queryset, locked for update; must run inside a transaction"""
+    # of=self: the tenant filter joins products and companies, which must not be locked
+    return list(reservations.select_for_update(of=('self',)).filter(status='active').order_by('pk'))
+
+
+def _settle(held, status):
+    """Give the locked reservations' quantities back to their Stock rows and mark them status"""
+    if not held:
+        return
+    totals = defaultdict(lambda: ZERO)
+    for reservation in held:
+        totals[(reservation.product_id, reservation.warehouse_id)] += reservation.quantity
+    rows = list(Stock.objects.filter(costing.pairs(totals)).only('id', 'product_id', 'warehouse_id').order_by('pk'))
+    for row in rows:
+        row.reserved_quantity = F('reserved_quantity') - totals[(row.product_id, row.warehouse_id)]
+    Stock.objects.bulk_update(rows, ['reserved_quantity'], batch_size=BATCH_SIZE)
+    StockReservation.objects.filter(pk__in=[reservation.pk for reservation in held]).update(
+        status=status, updated_at=timezone.now()
+    )
+    for reservation in held:
+        reservation.status = status
+
+
+def confirm(company, reservations, user=None, date=None):
+    """
+    Issue the active reservations of the queryset as 'out' movements through the stock
+    ledger, carrying their references. Returns (reservations, movements).
+    """
+    with transaction.atomic():
+        held = _lock(reservations)
+        _settle(held, 'confirmed')
+        movements = ledger.post_movements(
+            company,
+            [
+                {
+                    'product': reservation.product_id,
+                    'warehouse': reservation.warehouse_id,
+                    'movement_type': 'out',
+                    'quantity': reservation.quantity,
+                    'reference_type': reservation.reference_type,
+                    'reference_id': reservation.reference_id,
+                }
+                for reservation in held
+            ],
+            user=user,
+            date=date,
+        )
+    return held, movements
+
+
+def release(reservations):
+    """Give back the active reservations of the queryset. Returns the released reservations."""
+    with transaction.atomic():
+        held = _lock(reservations)
+        _settle(held, 'released')
+    return held
+
+
+def expire(now=None, batch_size=BATCH_SIZE):
+    """
+    Expire active reservations past their expires_at, batch_size per transaction,
+    skipping rows a confirm or release holds locked. Returns the number expired.
+    """
+    now = now or timezone.now()
+    due = StockReservation.objects.filter(status='active', expires_at__lte=now).order_by('expires_at')
+    expired = 0
+    while True:
+        with transaction.atomic():
+            held = list(due.select_for_update(skip_locked=True)[:batch_size])
+            _settle(held, 'expired')
+        expired += len(held)
+        if len(held) < batch_size:
+            return expired
@@ -1,32 +1,119 @@
 """
 Inventory module serializers
 """
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Product, Warehouse, Stock, StockMovement
+
+from core.serializers import TENANT_COMPANY
+
+from .models import Product, Warehouse, Stock, StockMovement, StockReservation
 
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class WarehouseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Warehouse
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class StockSerializer(serializers.ModelSerializer):
     class Meta:
         model = Stock
         fields = '__all__'
+        # Levels change only through stock movements (inventory.ledger)
+        read_only_fields = [
+            'id', 'quantity', 'reserved_quantity', 'last_movement_date', 'received_quantity', 'issued_quantity',
+            'average_cost',
+        ]
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockMovement
         fields = '__all__'
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'user', 'cost_amount', 'created_at']
+        # The ledger dates a movement now when none is given
+        extra_kwargs = {'date': {'required': False}}
+
+
+class StockMovementLineSerializer(serializers.Serializer):
+    # Plain ids: the ledger checks them against the company in one query per model
+    product = serializers.UUIDField()
+    warehouse = serializers.UUIDField()
+    movement_type = serializers.ChoiceField(choices=StockMovement.MOVEMENT_TYPES)
+    direction = serializers.ChoiceField(choices=['in', 'out'], required=False)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    unit_cost = serializers.DecimalField(max_digits=15, decimal_places=2, min_value=Decimal('0'), required=False)
+
+
+class StockMovementBatchSerializer(serializers.Serializer):
+    lines = StockMovementLineSerializer(many=True, allow_empty=False, max_length=5000)
+    reference_type = serializers.ChoiceField(choices=StockMovement.REFERENCE_TYPES, required=False)
+    reference_id = serializers.UUIDField(required=False)
+    date = serializers.DateTimeField(required=False)
+
+
+class StockCostsSerializer(serializers.Serializer):
+    skus = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False, max_length=1000)
+    warehouse = serializers.UUIDField(required=False)
+
+
+class StockAsOfSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    at = serializers.DateTimeField(required=False)
+    warehouse = serializers.UUIDField(required=False)
+    
+    def validate(self, attrs):
+        if ('date' in attrs) == ('at' in attrs):
+            raise serializers.ValidationError('Give either date (end of day) or at (moment)')
+        return attrs
+
+
+class KardexSerializer(serializers.Serializer):
+    product = serializers.UUIDField()
+    warehouse = serializers.UUIDField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    output = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = '__all__'
+        # Reservations change only through inventory.reservations
+        read_only_fields = ['id', 'status', 'expires_at', 'user', 'created_at', 'updated_at']
+
+
+class StockReservationLineSerializer(serializers.Serializer):
+    product = serializers.UUIDField()
+    warehouse = serializers.UUIDField()
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+
+
+class StockReservationRequestSerializer(serializers.Serializer):
+    lines = StockReservationLineSerializer(many=True, allow_empty=False, max_length=5000)
+    reference_type = serializers.ChoiceField(choices=StockMovement.REFERENCE_TYPES, required=False)
+    reference_id = serializers.UUIDField(required=False)
+    ttl = serializers.IntegerField(min_value=1, max_value=7 * 24 * 3600, required=False)  # seconds
+
+
+class StockReservationSettleSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=5000, required=False)
+    reference_type = serializers.ChoiceField(choices=StockMovement.REFERENCE_TYPES, required=False)
+    reference_id = serializers.UUIDField(required=False)
+    
+    def validate(self, attrs):
+        if 'ids' not in attrs and 'reference_id' not in attrs:
+            raise serializers.ValidationError('Give ids or reference_id')
+        return attrs
@@ -0,0 +1,245 @@
+"""
+Stock snapshots and point-in-time queries
+StockSnapshot rows hold the quantity and value of every product+warehouse at the start
+of a day or month (so a daily snapshot covers every movement of the days before it),
+and "what was on hand at warehouse X on date D" reads the nearest snapshot at or before
+D plus the movements after it instead of summing the Kardex.
+
+A snapshot describes the moment as_of: movements dated before it are included. Value
+is the movements' cost_amount, inbound minus outbound. stock_as_of() computes every
+requested pair in one statement (nearest snapshot plus the movements since, as
+correlated subqueries over the (product, warehouse, ...) indexes); take_snapshots()
+stores its result with one bulk insert.
+
+A back-dated movement makes the snapshots of its product+warehouse after its date
+stale; the stock ledger has refresh() retake them for that pair in the same
+transaction, oldest first, so each one starts from the already corrected one before it.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .costing import CENT, pairs
+from .models import Stock, StockMovement, StockSnapshot
+
+ZERO = Decimal('0.00')
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+BATCH_SIZE = 2000
+KARDEX_CHUNK_SIZE = 2000
+
+KARDEX_FIELDS = [
+    'warehouse_id', 'date', 'movement_id', 'movement_type', 'reference_type', 'reference_id',
+    'quantity_in', 'quantity_out', 'unit_cost', 'cost_amount', 'balance_quantity', 'balance_value',
+]
+
+
+def day_start(value):
+    """Aware start of the given date in the current time zone"""
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def end_of_day(value):
+    """as_of moment that includes every movement of the given date"""
+    return day_start(value + timedelta(days=1))
+
+
+def _amount(expression):
+    return Sum(expression, output_field=DecimalField(max_digits=18, decimal_places=2))
+
+
+def stock_as_of(stock, at):
+    """
+    Annotate a Stock queryset with quantity_as_of / value_as_of at the moment at
+    (movements dated before it), from the nearest snapshot at or before at plus the
+    movements from the snapshot on
+    """
+    nearest = StockSnapshot.objects.filter(
+        product_id=OuterRef('product_id'), warehouse_id=OuterRef('warehouse_id'), as_of__lte=at
+    ).order_by('-as_of')
+    since = StockMovement.objects.filter(
+        product_id=OuterRef('product_id'),
+        warehouse_id=OuterRef('warehouse_id'),
+        date__gte=OuterRef('snapshot_as_of'),
+        date__lt=at,
+    ).order_by().values('product_id')
+    decimal = DecimalField(max_digits=18, decimal_places=2)
+    return stock.annotate(
+        snapshot_as_of=Coalesce(Subquery(nearest.values('as_of')[:1]), Value(EPOCH)),
+        snapshot_quantity=Coalesce(Subquery(nearest.values('quantity')[:1]), Value(ZERO), output_field=decimal),
+        snapshot_value=Coalesce(Subquery(nearest.values('value')[:1]), Value(ZERO), output_field=decimal),
+        moved_quantity=Coalesce(
+            Subquery(since.annotate(total=_amount(F('quantity') * F('direction'))).values('total')),
+            Value(ZERO), output_field=decimal,
+        ),
+        moved_value=Coalesce(
+            Subquery(since.annotate(total=_amount(F('cost_amount') * F('direction'))).values('total')),
+            Value(ZERO), output_field=decimal,
+        ),
+    ).annotate(
+        quantity_as_of=F('snapshot_quantity') + F('moved_quantity'),
+        value_as_of=F('snapshot_value') + F('moved_value'),
+    )
+
+
+def on_hand(company, at, warehouse=None, products=None):
+    """
+    [{'product_id', 'warehouse_id', 'quantity', 'value'}] of the company's stock at the
+    moment at, leaving out pairs with neither quantity nor value
+    """
+    stock = Stock.objects.filter(product__company=company)
+    if warehouse is not None:
+        stock = stock.filter(warehouse=warehouse)
+    if products is not None:
+        stock = stock.filter(product__in=products)
+    rows = stock_as_of(stock, at).values('product_id', 'warehouse_id', 'quantity_as_of', 'value_as_of')
+    return [
+        {
+            'product_id': row['product_id'],
+            'warehouse_id': row['warehouse_id'],
+            'quantity': Decimal(row['quantity_as_of']).quantize(CENT),
+            'value': Decimal(row['value_as_of']).quantize(CENT),
+        }
+        for row in rows.order_by('warehouse_id', 'product_id')
+        if row['quantity_as_of'] or row['value_as_of']
+    ]
+
+
+def _store(stock, existing, as_of, period):
+    """Replace the existing snapshots at (period, as_of) with the stock queryset's levels"""
+    with transaction.atomic():
+        existing.filter(period=period, as_of=as_of).delete()
+        rows = stock_as_of(stock, as_of).values('product_id', 'warehouse_id', 'quantity_as_of', 'value_as_of')
+        snapshots = [
+            StockSnapshot(
+                product_id=row['product_id'],
+                warehouse_id=row['warehouse_id'],
+                period=period,
+                as_of=as_of,
+                quantity=row['quantity_as_of'],
+                value=row['value_as_of'],
+            )
+            for row in rows.iterator(chunk_size=BATCH_SIZE)
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=BATCH_SIZE)
+    return len(snapshots)
+
+
+def take_snapshots(company, as_of, period='day'):
+    """Store the quantity and value of every product+warehouse of the company at as_of"""
+    return _store(
+        Stock.objects.filter(product__company=company),
+        StockSnapshot.objects.filter(product__company=company),
+        as_of,
+        period,
+    )
+
+
+def refresh(since):
+    """
+    Retake the snapshots made stale by movements dated since[(product_id, warehouse_id)],
+    for those pairs only, oldest first. Must run inside the posting transaction, after the
+    movements are costed. Returns the number of snapshots retaken.
+    """
+    if not since:
+        return 0
+    stale = StockSnapshot.objects.filter(pairs(since, {key: {'as_of__gt': date} for key, date in since.items()}))
+    moments = defaultdict(set)
+    for product_id, warehouse_id, period, as_of in stale.values_list('product_id', 'warehouse_id', 'period', 'as_of'):
+        moments[(as_of, period)].add((product_id, warehouse_id))
+    if not moments:
+        return 0
+    # Without the stale rows every retake reads the nearest corrected snapshot before it
+    stale.delete()
+    retaken = 0
+    for (as_of, period), keys in sorted(moments.items()):
+        retaken += _store(Stock.objects.filter(pairs(keys)), StockSnapshot.objects.filter(pairs(keys)), as_of, period)
+    return retaken
+
+
+def purge_daily(company=None, keep_days=None):
+    """Delete daily snapshots older than keep_days (INVENTORY_DAILY_SNAPSHOT_DAYS); monthly ones are kept"""
+    keep_days = keep_days if keep_days is not None else getattr(settings, 'INVENTORY_DAILY_SNAPSHOT_DAYS', 90)
+    snapshots = StockSnapshot.objects.filter(period='day', as_of__lt=timezone.now() - timedelta(days=keep_days))
+    if company is not None:
+        snapshots = snapshots.filter(product__company=company)
+    return snapshots.delete()[0]
+
+
+def kardex(product, warehouse=None, date_from=None, date_to=None):
+    """
+    Yield the product's movements per warehouse in date order with running quantity and
+    value balances. With date_from each warehouse starts from its balance at that date
+    (stock_as_of), so only the movements in the range are read.
+    """
+    start = day_start(date_from) if date_from is not None else None
+    movements = StockMovement.objects.filter(product=product)
+    stock = Stock.objects.filter(product=product)
+    if warehouse is not None:
+        movements, stock = movements.filter(warehouse=warehouse), stock.filter(warehouse=warehouse)
+    openings = {}
+    if start is not None:
+        movements = movements.filter(date__gte=start)
+        openings = {
+            row['warehouse_id']: (row['quantity_as_of'], row['value_as_of'])
+            for row in stock_as_of(stock, start).values('warehouse_id', 'quantity_as_of', 'value_as_of')
+        }
+    if date_to is not None:
+        movements = movements.filter(date__lt=end_of_day(date_to))
+
+    # Warehouses with an opening balance, in id order, merged into the movement stream below
+    pending = iter(sorted(warehouse_id for warehouse_id, amounts in openings.items() if any(amounts)))
+    next_opening = next(pending, None)
+
+    current, quantity, value = None, ZERO, ZERO
+    for row in movements.values(
+        'id', 'warehouse_id', 'date', 'movement_type', 'direction', 'reference_type', 'reference_id',
+        'quantity', 'unit_cost', 'cost_amount',
+    ).order_by('warehouse_id', 'date', 'created_at', 'id').iterator(chunk_size=KARDEX_CHUNK_SIZE):
+        if row['warehouse_id'] != current:
+            current = row['warehouse_id']
+            # Warehouses that only have an opening balance come before this one
+            while next_opening is not None and next_opening < current:
+                yield _opening_row(next_opening, start, *openings[next_opening])
+                next_opening = next(pending, None)
+            if next_opening == current:
+                next_opening = next(pending, None)
+            quantity, value = (Decimal(amount) for amount in openings.get(current, (ZERO, ZERO)))
+            if start is not None:
+                yield _opening_row(current, start, quantity, value)
+        cost_amount = row['cost_amount'] or ZERO
+        quantity += row['quantity'] * row['direction']
+        value += cost_amount * row['direction']
+        yield {
+            'warehouse_id': str(row['warehouse_id']),
+            'date': row['date'].isoformat(),
+            'movement_id': str(row['id']),
+            'movement_type': row['movement_type'],
+            'reference_type': row['reference_type'] or '',
+            'reference_id': str(row['reference_id'] or ''),
+            'quantity_in': str(row['quantity']) if row['direction'] > 0 else '',
+            'quantity_out': str(row['quantity']) if row['direction'] < 0 else '',
+            'unit_cost': str(row['unit_cost']),
+            'cost_amount': str(row['cost_amount'] if row['cost_amount'] is not None else ''),
+            'balance_quantity': str(quantity.quantize(CENT)),
+            'balance_value': str(value.quantize(CENT)),
+        }
+    while next_opening is not None:
+        yield _opening_row(next_opening, start, *openings[next_opening])
+        next_opening = next(pending, None)
+
+
+def _opening_row(warehouse_id, start, quantity, value):
+    return dict(
+        dict.fromkeys(KARDEX_FIELDS, ''),
+        warehouse_id=str(warehouse_id),
+        date=start.isoformat(),
+        movement_type='opening',
+        balance_quantity=str(Decimal(quantity).quantize(CENT)),
+        balance_value=str(Decimal(value).quantize(CENT)),
+    )
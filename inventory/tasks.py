@@ -0,0 +1,35 @@
+"""
+Inventory background tasks
+"""
+from datetime import date
+
+from celery import shared_task
+from django.utils import timezone
+
+from core.models import Company
+
+from . import reservations, snapshots
+
+
+@shared_task
+def take_stock_snapshots(as_of=None):
+    """
+    Daily stock snapshot of every active company, plus the monthly one on the first of
+    the month, then purge expired daily snapshots.
+    as_of is an ISO date; the snapshot is taken at its start (defaults to today).
+    """
+    day = date.fromisoformat(as_of) if as_of else timezone.localdate()
+    moment = snapshots.day_start(day)
+    taken = 0
+    for company in Company.objects.filter(is_active=True):
+        taken += snapshots.take_snapshots(company, moment, 'day')
+        if day.day == 1:
+            taken += snapshots.take_snapshots(company, moment, 'month')
+    snapshots.purge_daily()
+    return taken
+
+
+@shared_task
+def expire_stock_reservations():
+    """Give back stock held by reservations past their expiry"""
+    return reservations.expire()
@@ -0,0 +1,144 @@
+"""
+Inventory tests: the stock ledger, FIFO recosting of back-dated movements and reservations
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Company
+
+from . import ledger, reservations
+from .models import Product, Stock, StockMovement, StockReservation, Warehouse
+
+
+def day(n):
+    return datetime(2026, 1, n, 12, tzinfo=dt_timezone.utc)
+
+
+class InventoryTestCase(TestCase):
+    cost_method = 'average'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Stock Co')
+        cls.product = Product.objects.create(company=cls.company, sku='SKU-1', name='Widget', cost_method=cls.cost_method)
+        cls.warehouse = Warehouse.objects.create(company=cls.company, name='Main')
+
+    def move(self, movement_type, quantity, unit_cost=None, date=None, product=None):
+        line = {
+            'product': product or self.product,
+            'warehouse': self.warehouse,
+            'movement_type': movement_type,
+            'quantity': quantity,
+        }
+        if unit_cost is not None:
+            line['unit_cost'] = unit_cost
+        return ledger.post_movements(self.company, [line], date=date)[0]
+
+    def stock(self):
+        return Stock.objects.get(product=self.product, warehouse=self.warehouse)
+
+
+class LedgerTests(InventoryTestCase):
+    def test_accepts_string_ids(self):
+        ledger.post_movements(self.company, [{
+            'product': str(self.product.pk), 'warehouse': str(self.warehouse.pk), 'movement_type': 'in', 'quantity': 3,
+        }])
+        self.assertEqual(self.stock().quantity, Decimal('3.00'))
+
+    def test_rejects_other_company_products(self):
+        other = Company.objects.create(name='Other Co')
+        foreign = Product.objects.create(company=other, sku='SKU-1', name='Widget')
+        with self.assertRaises(ledger.StockError):
+            self.move('in', 1, product=foreign)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_rejects_issue_below_zero(self):
+        self.move('in', 2, unit_cost=1)
+        with self.assertRaises(ledger.InsufficientStockError):
+            self.move('out', 3)
+        self.assertEqual(self.stock().quantity, Decimal('2.00'))
+
+
+class FifoRecostTests(InventoryTestCase):
+    cost_method = 'fifo'
+
+    def test_issue_consumes_oldest_layers(self):
+        self.move('in', 10, unit_cost=1, date=day(1))
+        self.move('in', 10, unit_cost=2, date=day(3))
+        issue = self.move('out', 15, date=day(5))
+        self.assertEqual(issue.cost_amount, Decimal('20.00'))
+
+    def test_back_dated_receipt_recosts_later_issues(self):
+        self.move('in', 10, unit_cost=2, date=day(3))
+        issue = self.move('out', 10, date=day(5))
+        self.assertEqual(issue.cost_amount, Decimal('20.00'))
+
+        self.move('in', 10, unit_cost=1, date=day(1))
+        issue.refresh_from_db()
+        self.assertEqual(issue.cost_amount, Decimal('10.00'))
+
+    def test_back_dated_issue_recosts_later_issues(self):
+        self.move('in', 10, unit_cost=1, date=day(1))
+        self.move('in', 10, unit_cost=2, date=day(3))
+        later = self.move('out', 10, date=day(5))
+        self.assertEqual(later.cost_amount, Decimal('10.00'))
+
+        earlier = self.move('out', 5, date=day(2))
+        later.refresh_from_db()
+        self.assertEqual(earlier.cost_amount, Decimal('5.00'))
+        self.assertEqual(later.cost_amount, Decimal('15.00'))
+
+
+class ReservationTests(InventoryTestCase):
+    def setUp(self):
+        self.move('in', 10, unit_cost=1)
+
+    def reserve(self, quantity, ttl=None):
+        return reservations.reserve(
+            self.company, [{'product': self.product, 'warehouse': self.warehouse, 'quantity': quantity}], ttl=ttl
+        )
+
+    def test_reserve_holds_available_stock(self):
+        self.reserve(6)
+        stock = self.stock()
+        self.assertEqual(stock.reserved_quantity, Decimal('6.00'))
+        with self.assertRaises(ledger.InsufficientStockError):
+            self.reserve(5)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_issues_cannot_take_reserved_stock(self):
+        self.reserve(6)
+        with self.assertRaises(ledger.InsufficientStockError):
+            self.move('out', 5)
+        self.move('out', 4)
+        self.assertEqual(self.stock().quantity, Decimal('6.00'))
+
+    def test_confirm_issues_reserved_stock(self):
+        held = self.reserve(6)
+        confirmed, movements = reservations.confirm(
+            self.company, StockReservation.objects.filter(pk__in=[reservation.pk for reservation in held])
+        )
+        self.assertEqual([reservation.status for reservation in confirmed], ['confirmed'])
+        self.assertEqual([movement.quantity for movement in movements], [Decimal('6.00')])
+        stock = self.stock()
+        self.assertEqual(stock.quantity, Decimal('4.00'))
+        self.assertEqual(stock.reserved_quantity, Decimal('0.00'))
+
+    def test_release_gives_stock_back(self):
+        self.reserve(6)
+        released = reservations.release(StockReservation.objects.all())
+        self.assertEqual([reservation.status for reservation in released], ['released'])
+        self.assertEqual(self.stock().reserved_quantity, Decimal('0.00'))
+        self.assertEqual(reservations.release(StockReservation.objects.all()), [])
+
+    def test_expire_drops_due_reservations(self):
+        self.reserve(3, ttl=60)
+        self.reserve(4, ttl=3600)
+        self.assertEqual(reservations.expire(now=timezone.now() + timedelta(minutes=5)), 1)
+        self.assertEqual(
+            sorted(StockReservation.objects.values_list('status', flat=True)), ['active', 'expired']
+        )
+        self.assertEqual(self.stock().reserved_quantity, Decimal('4.00'))
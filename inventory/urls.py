@@ -10,5 +10,6 @@ router.register(r'products', views.ProductViewSet, basename='product')
 router.register(r'warehouses', views.WarehouseViewSet, basename='warehouse')
 router.register(r'stock', views.StockViewSet, basename='stock')
 router.register(r'stock-movements', views.StockMovementViewSet, basename='stock-movement')
+router.register(r'stock-reservations', views.StockReservationViewSet, basename='stock-reservation')
 
 urlpatterns = router.urls
@@ -1,46 +1,303 @@
 """
 Inventory module views
 """
-from rest_framework import viewsets, permissions
-from .models import Product, Warehouse, Stock, StockMovement
-from .serializers import ProductSerializer, WarehouseSerializer, StockSerializer, StockMovementSerializer
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import MethodNotAllowed, NotFound
+from rest_framework.response import Response
+from core.pagination import KeysetPagination
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
+from accounting import reports
+from . import costing, ledger, reservations, snapshots
+from .models import Product, Warehouse, Stock, StockMovement, StockReservation
+from .serializers import (
+    ProductSerializer, WarehouseSerializer, StockSerializer, StockMovementSerializer, StockMovementBatchSerializer,
+    StockCostsSerializer, StockAsOfSerializer, KardexSerializer, StockReservationSerializer,
+    StockReservationRequestSerializer, StockReservationSettleSerializer,
+)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(TenantModelViewSet):
+    model = Product
     serializer_class = ProductSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Product.objects.filter(company=self.request.tenant)
-        return Product.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class WarehouseViewSet(viewsets.ModelViewSet):
+class WarehouseViewSet(TenantModelViewSet):
+    model = Warehouse
     serializer_class = WarehouseSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Warehouse.objects.filter(company=self.request.tenant)
-        return Warehouse.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(TenantModelViewSet):
+    """Stock levels: read-only, kept by inventory.ledger (POST is only for the costs lookup)"""
+    model = Stock
+    tenant_field = 'product__company'
     serializer_class = StockSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    http_method_names = ['get', 'post', 'head', 'options']
+    rbac_actions = {'valuation': 'view', 'costs': 'view', 'as_of': 'view'}
+    
+    def create(self, request, *args, **kwargs):
+        raise MethodNotAllowed(request.method)
+    
+    def _warehouse(self, request, warehouse_id):
+        if not warehouse_id:
+            return None
+        try:
+            return Warehouse.objects.get(company=request.tenant, pk=warehouse_id)
+        except (Warehouse.DoesNotExist, DjangoValidationError):
+            raise NotFound('Warehouse not found')
     
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Stock.objects.filter(product__company=self.request.tenant)
-        return Stock.objects.none()
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """
+        Inventory value of FIFO (open cost layers) and average-cost products
+        Optional filters: warehouse (id), by=product for one row per product and warehouse
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({'success': True, 'data': {'rows': [], 'quantity': 0, 'value': 0}})
+        
+        rows = costing.valuation(
+            request.tenant,
+            warehouse=self._warehouse(request, request.query_params.get('warehouse')),
+            by_product=request.query_params.get('by') == 'product',
+        )
+        return Response({
+            'success': True,
+            'data': {
+                'rows': rows,
+                'quantity': sum((row['quantity'] for row in rows), 0),
+                'value': sum((row['value'] for row in rows), 0),
+            }
+        })
+    
+    @action(detail=False, methods=['get', 'post'], serializer_class=StockCostsSerializer)
+    def costs(self, request):
+        """
+        Quantity and unit cost of many products at once
+        GET ?skus=A,B,C or POST {"skus": [...]} (up to 1000); optional warehouse (id)
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({'success': True, 'data': []})
+        
+        data = request.data
+        if request.method == 'GET':
+            data = {'skus': [sku for sku in request.query_params.get('skus', '').split(',') if sku]}
+            if request.query_params.get('warehouse'):
+                data['warehouse'] = request.query_params['warehouse']
+        params = StockCostsSerializer(data=data)
+        params.is_valid(raise_exception=True)
+        return Response({
+            'success': True,
+            'data': costing.current_costs(
+                request.tenant,
+                params.validated_data['skus'],
+                warehouse=self._warehouse(request, params.validated_data.get('warehouse')),
+            )
+        })
+    
+    @action(detail=False, methods=['get'], url_path='as-of', serializer_class=StockAsOfSerializer)
+    def as_of(self, request):
+        """
+        Quantity and value on hand at a past moment, from the nearest stock snapshot
+        date (YYYY-MM-DD, end of that day) or at (ISO datetime); optional warehouse (id)
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({'success': True, 'data': {'rows': [], 'quantity': 0, 'value': 0}})
+        
+        params = StockAsOfSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        at = params.validated_data.get('at')
+        if at is None:
+            at = snapshots.end_of_day(params.validated_data['date'])
+        rows = snapshots.on_hand(
+            request.tenant, at, warehouse=self._warehouse(request, params.validated_data.get('warehouse'))
+        )
+        return Response({
+            'success': True,
+            'data': {
+                'as_of': at,
+                'rows': rows,
+                'quantity': sum((row['quantity'] for row in rows), 0),
+                'value': sum((row['value'] for row in rows), 0),
+            }
+        })
 
 
-class StockMovementViewSet(viewsets.ModelViewSet):
+class StockMovementViewSet(TenantModelViewSet):
+    """Kardex: movements are posted through inventory.ledger and never edited or deleted"""
+    model = StockMovement
+    tenant_field = 'product__company'
     serializer_class = StockMovementSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    pagination_class = KeysetPagination
+    http_method_names = ['get', 'post', 'head', 'options']
+    rbac_actions = {'batch': 'create', 'kardex': 'view'}
+    audit_actions = {'kardex': 'export'}
+    
+    def perform_create(self, serializer):
+        serializer.instance = ledger.post_movements(
+            self.request.tenant, [serializer.validated_data], user=self.request.user
+        )[0]
+    
+    @action(detail=False, methods=['post'], serializer_class=StockMovementBatchSerializer)
+    def batch(self, request):
+        """
+        Post many movement lines (e.g. one invoice) in one transaction
+        Body: lines (product, warehouse, movement_type, quantity, direction, unit_cost),
+        reference_type, reference_id, date (optional). Rejected as a whole when stock runs short.
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        params = StockMovementBatchSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        movements = ledger.post_movements(
+            request.tenant,
+            params.validated_data['lines'],
+            user=request.user,
+            reference_type=params.validated_data.get('reference_type'),
+            reference_id=params.validated_data.get('reference_id'),
+            date=params.validated_data.get('date'),
+        )
+        return Response({
+            'success': True,
+            'data': StockMovementSerializer(movements, many=True).data
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get'], serializer_class=KardexSerializer)
+    def kardex(self, request):
+        """
+        A product's movements with running quantity and value balances per warehouse, streamed
+        Parameters: product (id), warehouse (id), date_from, date_to (YYYY-MM-DD),
+        output (csv or ndjson, default csv). With date_from each warehouse opens at its
+        balance on that date.
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        params = KardexSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        product = Product.objects.filter(company=request.tenant, pk=params.validated_data['product']).first()
+        if product is None:
+            raise NotFound('Product not found')
+        warehouse = None
+        if params.validated_data.get('warehouse'):
+            warehouse = Warehouse.objects.filter(company=request.tenant, pk=params.validated_data['warehouse']).first()
+            if warehouse is None:
+                raise NotFound('Warehouse not found')
+        
+        rows = snapshots.kardex(
+            product,
+            warehouse=warehouse,
+            date_from=params.validated_data.get('date_from'),
+            date_to=params.validated_data.get('date_to'),
+        )
+        output = params.validated_data['output']
+        writer, content_type = reports.STREAM_FORMATS[output]
+        if output == 'csv':
+            stream = writer(rows, fields=snapshots.KARDEX_FIELDS)
+        else:
+            stream = writer(rows)
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="kardex.{output}"'
+        return response
+
+
+class StockReservationViewSet(TenantModelViewSet):
+    """Stock held for draft documents: reserved, confirmed and released through inventory.reservations"""
+    model = StockReservation
+    tenant_field = 'product__company'
+    serializer_class = StockReservationSerializer
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    http_method_names = ['get', 'post', 'head', 'options']
+    rbac_actions = {'confirm': 'create', 'release': 'update'}
+    audit_actions = {'confirm': 'update', 'release': 'update'}
+    
+    def create(self, request, *args, **kwargs):
+        """
+        Reserve stock for a draft document
+        Body: lines (product, warehouse, quantity), reference_type, reference_id,
+        ttl (seconds, optional). Rejected as a whole when any line exceeds the available quantity.
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        params = StockReservationRequestSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        held = reservations.reserve(
+            request.tenant,
+            params.validated_data['lines'],
+            user=request.user,
+            reference_type=params.validated_data.get('reference_type'),
+            reference_id=params.validated_data.get('reference_id'),
+            ttl=params.validated_data.get('ttl'),
+        )
+        return Response({
+            'success': True,
+            'data': StockReservationSerializer(held, many=True).data
+        }, status=status.HTTP_201_CREATED)
+    
+    def _selected(self, request):
+        params = StockReservationSettleSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        queryset = self.get_queryset()
+        if 'ids' in params.validated_data:
+            queryset = queryset.filter(pk__in=params.validated_data['ids'])
+        if 'reference_id' in params.validated_data:
+            queryset = queryset.filter(reference_id=params.validated_data['reference_id'])
+            if params.validated_data.get('reference_type'):
+                queryset = queryset.filter(reference_type=params.validated_data['reference_type'])
+        return queryset
+    
+    @action(detail=False, methods=['post'], serializer_class=StockReservationSettleSerializer)
+    def confirm(self, request):
+        """
+        Issue active reservations as 'out' stock movements
+        Body: ids, or reference_type and reference_id of the document
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        held, movements = reservations.confirm(request.tenant, self._selected(request), user=request.user)
+        return Response({
+            'success': True,
+            'data': {
+                'reservations': StockReservationSerializer(held, many=True).data,
+                'movements': StockMovementSerializer(movements, many=True).data,
+            }
+        })
     
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return StockMovement.objects.filter(product__company=self.request.tenant)
-        return StockMovement.objects.none()
+    @action(detail=False, methods=['post'], serializer_class=StockReservationSettleSerializer)
+    def release(self, request):
+        """
+        Give back active reservations
+        Body: ids, or reference_type and reference_id of the document
+        """
+        if not getattr(request, 'tenant', None):
+            return Response({
+                'success': False,
+                'error': {'message': 'No active company'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        held = reservations.release(self._selected(request))
+        return Response({
+            'success': True,
+            'data': StockReservationSerializer(held, many=True).data
+        })
@@ -23,6 +23,7 @@ class IncidentAdmin(admin.ModelAdmin):
 @admin.register(IncidentEvidence)
 class IncidentEvidenceAdmin(admin.ModelAdmin):
     list_display = ['incident', 'evidence_type', 'created_at']
+    list_select_related = ['incident__company']
     list_filter = ['evidence_type', 'incident__category', 'created_at']
     search_fields = ['incident__description']
     readonly_fields = ['id', 'created_at']
@@ -32,6 +33,7 @@ class IncidentEvidenceAdmin(admin.ModelAdmin):
 @admin.register(LegalReport)
 class LegalReportAdmin(admin.ModelAdmin):
     list_display = ['report_number', 'incident', 'signed_by', 'sent_to_authority_type', 'sent_at', 'created_at']
+    list_select_related = ['incident__company', 'signed_by']
     list_filter = ['sent_to_authority_type', 'created_at']
     search_fields = ['report_number', 'qr_verification_code', 'incident__category']
     readonly_fields = ['id', 'created_at']
@@ -2,31 +2,27 @@
 Legal module views
 """
 from rest_framework import viewsets, permissions
+from core.audit import AuditMixin
+from core.permissions import HasModulePermission
+from core.viewsets import SparseFieldsMixin, TenantModelViewSet
 from .models import Incident, LegalReport, Blacklist
 from .serializers import IncidentSerializer, LegalReportSerializer, BlacklistSerializer
 
 
-class IncidentViewSet(viewsets.ModelViewSet):
+class IncidentViewSet(TenantModelViewSet):
+    model = Incident
     serializer_class = IncidentSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Incident.objects.filter(company=self.request.tenant)
-        return Incident.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class LegalReportViewSet(viewsets.ModelViewSet):
+class LegalReportViewSet(TenantModelViewSet):
+    model = LegalReport
+    tenant_field = 'incident__company'
     serializer_class = LegalReportSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return LegalReport.objects.filter(incident__company=self.request.tenant)
-        return LegalReport.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class BlacklistViewSet(viewsets.ModelViewSet):
+class BlacklistViewSet(SparseFieldsMixin, AuditMixin, viewsets.ModelViewSet):
     serializer_class = BlacklistSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     queryset = Blacklist.objects.all()
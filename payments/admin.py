@@ -14,6 +14,7 @@ class PaymentGatewayAdmin(admin.ModelAdmin):
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ['amount', 'currency', 'payment_method', 'status', 'company', 'customer', 'invoice', 'ai_fraud_score', 'created_at']
+    list_select_related = ['company', 'customer', 'invoice__customer']
     list_filter = ['status', 'payment_method', 'currency', 'company', 'created_at']
     search_fields = ['transaction_reference', 'company__name', 'customer__name', 'invoice__invoice_number']
     readonly_fields = ['id', 'created_at', 'updated_at']
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['company', 'created_at', 'id'], name='payments_company_1098b6_idx'),
+        ),
+    ]
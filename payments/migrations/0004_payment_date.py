@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-17 21:25
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+import django.utils.timezone
+
+
+def backfill_dates(apps, schema_editor):
+    # Existing payments are booked on the day they were recorded
+    Payment = apps.get_model('payments', 'Payment')
+    Payment.objects.update(date=TruncDate('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.RunPython(backfill_dates, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,7 @@ Payment Gateways, Payments, Transactions
 """
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from core.models import Company, User
@@ -66,6 +67,8 @@ class Payment(models.Model):
     
     amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
     currency = models.CharField(max_length=3, default='USD')
+    # Value date: the ledger books the payment on this date
+    date = models.DateField(default=timezone.localdate)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     gateway = models.ForeignKey(PaymentGateway, on_delete=models.SET_NULL, null=True, blank=True, related_name='payments')
     transaction_reference = models.CharField(max_length=255, null=True, blank=True)
@@ -86,6 +89,7 @@ class Payment(models.Model):
         verbose_name_plural = 'Payments'
         indexes = [
             models.Index(fields=['company', 'status']),
+            models.Index(fields=['company', 'created_at', 'id']),
             models.Index(fields=['invoice']),
             models.Index(fields=['customer']),
         ]
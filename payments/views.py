@@ -1,26 +1,23 @@
 """
 Payments module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from core.pagination import KeysetPagination
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import PaymentGateway, Payment
 from .serializers import PaymentGatewaySerializer, PaymentSerializer
 
 
-class PaymentGatewayViewSet(viewsets.ModelViewSet):
+class PaymentGatewayViewSet(TenantModelViewSet):
+    model = PaymentGateway
     serializer_class = PaymentGatewaySerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return PaymentGateway.objects.filter(company=self.request.tenant)
-        return PaymentGateway.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(TenantModelViewSet):
+    model = Payment
     serializer_class = PaymentSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Payment.objects.filter(company=self.request.tenant)
-        return Payment.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    pagination_class = KeysetPagination
+    cursor_ordering = ['-created_at']
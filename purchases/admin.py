@@ -32,6 +32,7 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
 @admin.register(PurchaseOrderItem)
 class PurchaseOrderItemAdmin(admin.ModelAdmin):
     list_display = ['purchase_order', 'product', 'quantity', 'unit_price', 'total']
+    list_select_related = ['purchase_order__supplier', 'product']
     list_filter = ['purchase_order__company', 'purchase_order__date']
     search_fields = ['purchase_order__order_number', 'product__name']
     raw_id_fields = ['purchase_order', 'product']
@@ -2,6 +2,9 @@
 Purchases module serializers
 """
 from rest_framework import serializers
+
+from core.serializers import TENANT_COMPANY, tenant_company
+
 from .models import Supplier, PurchaseOrder, PurchaseOrderItem
 
 
@@ -9,7 +12,8 @@ class SupplierSerializer(serializers.ModelSerializer):
     class Meta:
         model = Supplier
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class PurchaseOrderItemSerializer(serializers.ModelSerializer):
@@ -24,4 +28,21 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        # Allocated from the company's purchase_order sequence when omitted
+        extra_kwargs = {'company': TENANT_COMPANY, 'order_number': {'required': False}}
+    
+    def get_unique_together_validators(self):
+        # The default validator would make order_number required; uniqueness is checked in validate()
+        return []
+    
+    def validate(self, attrs):
+        company = tenant_company(self)
+        order_number = attrs.get('order_number')
+        if company is not None and order_number:
+            duplicates = PurchaseOrder.objects.filter(company=company, order_number=order_number)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError({'order_number': 'Order number already exists for this company'})
+        return attrs
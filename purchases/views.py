@@ -1,26 +1,31 @@
 """
 Purchases module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from django.db import transaction
+from core import sequences
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import Supplier, PurchaseOrder
 from .serializers import SupplierSerializer, PurchaseOrderSerializer
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(TenantModelViewSet):
+    model = Supplier
     serializer_class = SupplierSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Supplier.objects.filter(company=self.request.tenant)
-        return Supplier.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class PurchaseOrderViewSet(viewsets.ModelViewSet):
+class PurchaseOrderViewSet(TenantModelViewSet):
+    model = PurchaseOrder
     serializer_class = PurchaseOrderSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    query_plans = {'default': {'prefetch_related': ['items']}}
     
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return PurchaseOrder.objects.filter(company=self.request.tenant)
-        return PurchaseOrder.objects.none()
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        with transaction.atomic():
+            order_number = data.get('order_number') or sequences.next_number(
+                self.request.tenant, 'purchase_order', branch=data.get('branch'), date=data.get('date')
+            )
+            serializer.save(company=self.request.tenant, order_number=order_number)
@@ -32,6 +32,7 @@ class InvoiceAdmin(admin.ModelAdmin):
 @admin.register(InvoiceItem)
 class InvoiceItemAdmin(admin.ModelAdmin):
     list_display = ['invoice', 'product', 'description', 'quantity', 'unit_price', 'total']
+    list_select_related = ['invoice__customer', 'product']
     list_filter = ['invoice__company', 'invoice__date']
     search_fields = ['invoice__invoice_number', 'product__name', 'description']
     raw_id_fields = ['invoice', 'product']
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['company', 'date', 'created_at', 'id'], name='invoices_company_9e1739_idx'),
+        ),
+    ]
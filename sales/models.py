@@ -110,6 +110,7 @@ class Invoice(models.Model):
         unique_together = [['company', 'invoice_number']]
         indexes = [
             models.Index(fields=['company', 'invoice_number']),
+            models.Index(fields=['company', 'date', 'created_at', 'id']),
             models.Index(fields=['company', 'customer', 'date']),
             models.Index(fields=['status', 'due_date']),
         ]
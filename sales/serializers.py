@@ -2,6 +2,9 @@
 Sales module serializers
 """
 from rest_framework import serializers
+
+from core.serializers import TENANT_COMPANY, tenant_company
+
 from .models import Customer, Invoice, InvoiceItem
 
 
@@ -9,7 +12,8 @@ class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        extra_kwargs = {'company': TENANT_COMPANY}
 
 
 class InvoiceItemSerializer(serializers.ModelSerializer):
@@ -24,4 +28,21 @@ class InvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Invoice
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'company', 'created_at', 'updated_at']
+        # Allocated from the company's invoice sequence when omitted
+        extra_kwargs = {'company': TENANT_COMPANY, 'invoice_number': {'required': False}}
+    
+    def get_unique_together_validators(self):
+        # The default validator would make invoice_number required; uniqueness is checked in validate()
+        return []
+    
+    def validate(self, attrs):
+        company = tenant_company(self)
+        invoice_number = attrs.get('invoice_number')
+        if company is not None and invoice_number:
+            duplicates = Invoice.objects.filter(company=company, invoice_number=invoice_number)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError({'invoice_number': 'Invoice number already exists for this company'})
+        return attrs
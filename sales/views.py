@@ -1,26 +1,33 @@
 """
 Sales module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from django.db import transaction
+from core import sequences
+from core.pagination import KeysetPagination
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import Customer, Invoice
 from .serializers import CustomerSerializer, InvoiceSerializer
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(TenantModelViewSet):
+    model = Customer
     serializer_class = CustomerSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Customer.objects.filter(company=self.request.tenant)
-        return Customer.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(TenantModelViewSet):
+    model = Invoice
     serializer_class = InvoiceSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]
+    pagination_class = KeysetPagination
+    query_plans = {'default': {'prefetch_related': ['items']}}
     
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Invoice.objects.filter(company=self.request.tenant)
-        return Invoice.objects.none()
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        with transaction.atomic():
+            invoice_number = data.get('invoice_number') or sequences.next_number(
+                self.request.tenant, 'invoice', branch=data.get('branch'), date=data.get('date')
+            )
+            serializer.save(company=self.request.tenant, invoice_number=invoice_number)
@@ -1,16 +1,14 @@
 """
 Tasks module views
 """
-from rest_framework import viewsets, permissions
+from rest_framework import permissions
+from core.permissions import HasModulePermission
+from core.viewsets import TenantModelViewSet
 from .models import Task
 from .serializers import TaskSerializer
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(TenantModelViewSet):
+    model = Task
     serializer_class = TaskSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def get_queryset(self):
-        if hasattr(self.request, 'tenant') and self.request.tenant:
-            return Task.objects.filter(company=self.request.tenant)
-        return Task.objects.none()
+    permission_classes = [permissions.IsAuthenticated, HasModulePermission]